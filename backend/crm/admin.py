@@ -1,6 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
 
+from .cached_views import invalidate_lead_caches
 from .models import Lead
+from .rollups import FactDelta
+from .search import sync_search_tokens
 
 
 @admin.register(Lead)
@@ -16,3 +20,27 @@ class LeadAdmin(admin.ModelAdmin):
     )
     search_fields = ("enquiry_id", "dealer", "owner", "state", "city")
     list_filter = ("lead_status", "lead_stage", "state", "segment", "owner")
+
+    def save_model(self, request, obj, form, change):
+        facts = FactDelta()
+        if change:
+            facts.remove(Lead.objects.get(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        facts.add(obj)
+        facts.apply()
+        sync_search_tokens([obj])
+        transaction.on_commit(invalidate_lead_caches)
+
+    def delete_model(self, request, obj):
+        facts = FactDelta()
+        facts.remove(obj)
+        super().delete_model(request, obj)
+        facts.apply()
+        transaction.on_commit(invalidate_lead_caches)
+
+    def delete_queryset(self, request, queryset):
+        facts = FactDelta()
+        facts.remove_queryset(queryset)
+        super().delete_queryset(request, queryset)
+        facts.apply()
+        transaction.on_commit(invalidate_lead_caches)
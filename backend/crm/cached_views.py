@@ -1,133 +1,176 @@
 """
-Cached views using Django cache decorators.
+Result cache for the aggregate endpoints (/kpis/, /charts/, /insights/, /forecast/).
+
+Cache keys are built from the canonical (validated) LeadFilter parameters, so
+parameter order, whitespace and blank values never split an entry, plus a
+global "lead data version". Every lead write bumps that version through
+invalidate_lead_caches(), which makes all older entries unreachable in O(1);
+they simply expire.
+
+The version is kept where every process can see it. With a shared cache
+backend (django-redis) it is a cache counter bumped with incr(), so a
+repeat request never touches the database; the LeadDataVersion row is bumped
+alongside and seeds the counter whenever the cache loses it. On the
+per-process LocMemCache (no REDIS_URL) the row itself is the counter, and
+each process reuses what it read for LOCAL_VERSION_TTL seconds: writes in
+the same process are seen at once, writes by another gunicorn worker or the
+import worker within that many seconds.
 """
-from django.core.cache import cache
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
 
-from .services_optimized import compute_kpis, build_chart_payload, build_insights, compute_forecast
+import hashlib
+import json
+import logging
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+
+from .models import LeadDataVersion
+
+logger = logging.getLogger("crm")
+
+LEAD_DATA_VERSION_PK = 1
+LEAD_DATA_VERSION_KEY = "crm:lead-data-version"
+# Seconds a process reuses the version row when the cache is not shared
+LOCAL_VERSION_TTL = 2
+
+# (version, monotonic expiry) of the last row read by this process
+_local_version = None
+
+
+def _shared_cache() -> bool:
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
 
 
-class CachedKpiView(APIView):
+def _seed_version():
+    # Seed from the clock so a recreated row never reuses a version still in the cache
+    row, _ = LeadDataVersion.objects.get_or_create(
+        pk=LEAD_DATA_VERSION_PK, defaults={"version": time.time_ns() // 1000}
+    )
+    return row.version
+
+
+def _stored_version():
+    version = (
+        LeadDataVersion.objects.filter(pk=LEAD_DATA_VERSION_PK)
+        .values_list("version", flat=True)
+        .first()
+    )
+    if version is None:
+        version = _seed_version()
+    return version
+
+
+def lead_data_version():
+    """Return the current lead data version, initialising it if needed."""
+    global _local_version
+    if _shared_cache():
+        version = cache.get(LEAD_DATA_VERSION_KEY)
+        if version is None:
+            version = _stored_version()
+            # Another process may have seeded (and bumped) it meanwhile
+            cache.add(LEAD_DATA_VERSION_KEY, version, timeout=None)
+            version = cache.get(LEAD_DATA_VERSION_KEY, version)
+        return version
+
+    now = time.monotonic()
+    if _local_version is None or _local_version[1] <= now:
+        _local_version = (_stored_version(), now + LOCAL_VERSION_TTL)
+    return _local_version[0]
+
+
+def invalidate_lead_caches():
     """
-    KPI endpoint with caching.
-    Cache for 5 minutes to reduce database load.
+    Invalidate all lead-related caches when data changes.
+    Call this after create/update/delete operations, ideally via
+    transaction.on_commit so readers never cache uncommitted data.
     """
-    
-    @method_decorator(cache_page(60 * 5))  # 5 minutes
-    def get(self, request):
-        queryset = self.get_queryset(request)
-        kpis = compute_kpis(queryset)
-        return Response(kpis)
-    
-    def get_queryset(self, request):
-        from .models import Lead
-        from .views import apply_filters  # Import your filter logic
-        
-        queryset = Lead.objects.all()
-        queryset = apply_filters(queryset, request.query_params)
-        return queryset
-
-
-class CachedChartsView(APIView):
+    global _local_version
+    _local_version = None
+    try:
+        bumped = LeadDataVersion.objects.filter(pk=LEAD_DATA_VERSION_PK).update(
+            version=F("version") + 1
+        )
+        if not bumped:
+            # Never read yet: a fresh clock-seeded version is newer than any cached one
+            _seed_version()
+        if _shared_cache():
+            try:
+                cache.incr(LEAD_DATA_VERSION_KEY)
+            except ValueError:
+                # Not cached: store the bumped row so a reader that is seeding
+                # the counter from the old row cannot win
+                cache.set(LEAD_DATA_VERSION_KEY, _stored_version(), timeout=None)
+    except Exception as e:
+        # The application should still work, just with stale cache until entries expire
+        logger.warning(f"Failed to invalidate caches: {e}")
+
+
+def _canonical_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def canonical_filter_params(filterset, extra=None):
     """
-    Charts endpoint with caching.
-    Cache for 10 minutes.
+    Reduce a validated LeadFilter (plus endpoint-specific extras) to a sorted
+    list of (name, value) pairs with empty values dropped.
     """
-    
-    @method_decorator(cache_page(60 * 10))  # 10 minutes
-    def get(self, request):
-        queryset = self.get_queryset(request)
-        charts = build_chart_payload(queryset)
-        return Response(charts)
-    
-    def get_queryset(self, request):
-        from .models import Lead
-        from .views import apply_filters
-        
-        queryset = Lead.objects.all()
-        queryset = apply_filters(queryset, request.query_params)
-        return queryset
-
-
-# Manual caching for complex operations
-class ManualCacheExample(APIView):
+    params = {
+        name: _canonical_value(value)
+        for name, value in filterset.form.cleaned_data.items()
+        if value not in (None, "", False)
+    }
+    for name, value in (extra or {}).items():
+        if value not in (None, ""):
+            params[name] = value
+    return sorted(params.items())
+
+
+def lead_data_cache_key(prefix, params):
+    payload = json.dumps(params, separators=(",", ":"))
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"crm:{prefix}:v{lead_data_version()}:{digest}"
+
+
+def aggregate_cache_key(prefix, filterset, extra=None):
+    return lead_data_cache_key(prefix, canonical_filter_params(filterset, extra))
+
+
+def cached_aggregate(prefix, filterset, compute, extra=None, timeout=None):
     """
-    Example of manual cache key management.
-    Useful when you need fine-grained control.
+    Return ``compute()`` for this filter set, serving repeat requests from cache.
     """
-    
-    def get(self, request):
-        # Build cache key based on filters
-        filters = request.query_params.dict()
-        cache_key = f"kpis_{hash(frozenset(filters.items()))}"
-        
-        # Try to get from cache
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data)
-        
-        # Compute if not in cache
-        queryset = self.get_queryset(request)
-        kpis = compute_kpis(queryset)
-        
-        # Store in cache for 5 minutes
-        cache.set(cache_key, kpis, timeout=300)
-        
-        return Response(kpis)
-    
-    def get_queryset(self, request):
-        from .models import Lead
-        from .views import apply_filters
-        
-        queryset = Lead.objects.all()
-        queryset = apply_filters(queryset, request.query_params)
-        return queryset
-
-
-# Cache invalidation helper
-def invalidate_lead_caches():
+    return cached_lead_data(
+        prefix, canonical_filter_params(filterset, extra), compute, timeout
+    )
+
+
+def cached_lead_data(prefix, params, compute, timeout=None):
     """
-    Invalidate all lead-related caches when data changes.
-    Call this after create/update/delete operations.
-    
-    This function handles multiple cache backends:
-    - django-redis: Uses delete_pattern for efficient pattern-based deletion
-    - Default cache: Clears entire cache (less efficient but works)
-    - View-level caches: Cleared via cache.clear()
+    Return ``compute()``, cached under ``params`` (JSON-serialisable) until the
+    next lead write.
     """
+    if timeout is None:
+        timeout = getattr(settings, "CRM_AGGREGATE_CACHE_TIMEOUT", 300)
+    if not timeout:
+        return compute()
+
     try:
-        # Check if cache backend supports pattern deletion (django-redis)
-        if hasattr(cache, 'delete_pattern'):
-            # Pattern-based deletion (efficient for Redis)
-            cache_patterns = [
-                'kpis_*',
-                'charts_*',
-                'insights_*',
-                'forecast_*',
-            ]
-            
-            for pattern in cache_patterns:
-                try:
-                    cache.delete_pattern(pattern)
-                except Exception:
-                    # If pattern deletion fails, fall through to clear()
-                    pass
-        else:
-            # Default cache backend - clear entire cache
-            # This is less efficient but ensures all caches are cleared
-            cache.clear()
-            
+        key = lead_data_cache_key(prefix, params)
+        payload = cache.get(key)
     except Exception as e:
-        # If all else fails, try to clear entire cache
+        logger.warning(f"Aggregate cache unavailable: {e}")
+        return compute()
+
+    if payload is None:
+        payload = compute()
         try:
-            cache.clear()
-        except Exception:
-            # If cache.clear() also fails, log and continue
-            # The application should still work, just with stale cache
-            import logging
-            logger = logging.getLogger('crm')
-            logger.warning(f'Failed to invalidate caches: {e}')
+            cache.set(key, payload, timeout)
+        except Exception as e:
+            logger.warning(f"Failed to store {prefix} cache entry: {e}")
+    return payload
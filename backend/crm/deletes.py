@@ -0,0 +1,165 @@
+"""
+Background lead deletion in primary-key chunks.
+
+Deleting the leads of a large upload with one queryset.delete() makes
+Django's collector load every row first (Lead has cascading search tokens),
+holds the row locks of one huge DELETE for its whole duration and can
+outlast the gunicorn timeout. Instead the endpoints queue a DeleteJob with
+enqueue_delete(), and run_import_worker claims it with claim_next_delete_job()
+and applies it with run_delete_job():
+
+- The next DELETE_CHUNK_SIZE lead ids above ``last_id`` are locked, taken
+  out of the rollup and facets and deleted with one DELETE per table,
+  without the collector, in a transaction committed together with the
+  job's progress. The lead caches are invalidated after each chunk, so
+  dashboards never count leads the lists no longer show.
+- The upload batch is removed at the end.
+
+Every committed chunk has already adjusted the rollup, so a job resumed by
+another worker, or one that failed part way, needs no rebuild.
+
+start_delete() runs deletions of up to INLINE_DELETE_LIMIT leads, a single
+chunk, within the request instead of waiting for the worker.
+"""
+
+import bisect
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs
+from .cached_views import invalidate_lead_caches
+from .jobs import STALE_JOB_TIMEOUT, JobLost, heartbeat
+from .models import DeleteJob, Lead, LeadSearchToken
+from .rollups import FactDelta
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 2000
+# Deletions this small are one short chunk, so they run within the request
+INLINE_DELETE_LIMIT = DELETE_CHUNK_SIZE
+
+PROGRESS_FIELDS = ["deleted_count", "last_id", "heartbeat_at"]
+
+
+def enqueue_delete(user, description, upload_batch=None, lead_ids=()):
+    """Queue the deletion of an upload batch's leads or of explicit lead ids."""
+    lead_ids = sorted({int(lead_id) for lead_id in lead_ids})
+    job = DeleteJob(
+        user=user,
+        description=description[:255],
+        upload_batch=upload_batch,
+        lead_ids=lead_ids,
+    )
+    job.total_rows = _scope(job).count()
+    job.save()
+    return job
+
+
+def start_delete(user, description, upload_batch=None, lead_ids=()):
+    """
+    Delete up to INLINE_DELETE_LIMIT leads right away and queue larger
+    deletions for the worker; returns the job, finished or still queued.
+    """
+    job = enqueue_delete(
+        user, description, upload_batch=upload_batch, lead_ids=lead_ids
+    )
+    if job.total_rows <= INLINE_DELETE_LIMIT and jobs.claim_job(job):
+        job = run_delete_job(job)
+    return job
+
+
+def requeue_stale_delete_jobs(timeout=STALE_JOB_TIMEOUT):
+    """Requeue running deletions whose worker stopped reporting; returns how many."""
+    return jobs.requeue_stale_jobs(DeleteJob, timeout)
+
+
+def claim_next_delete_job():
+    """Mark the oldest queued deletion running and return it, or None if the queue is empty."""
+    return jobs.claim_next_job(DeleteJob)
+
+
+def _scope(job, ids=None):
+    """The job's leads, narrowed to ``ids`` when given."""
+    if job.upload_batch_id is None:
+        return Lead.objects.filter(id__in=job.lead_ids if ids is None else ids)
+    queryset = Lead.objects.filter(upload_batch_id=job.upload_batch_id)
+    return queryset if ids is None else queryset.filter(id__in=ids)
+
+
+def _next_chunk(job, chunk_size):
+    """The next lead ids to delete, in primary-key order after ``last_id``."""
+    if job.upload_batch_id is None:
+        start = bisect.bisect_right(job.lead_ids, job.last_id)
+        return job.lead_ids[start : start + chunk_size]
+    return list(
+        _scope(job)
+        .filter(id__gt=job.last_id)
+        .order_by("id")
+        .values_list("id", flat=True)[:chunk_size]
+    )
+
+
+def delete_leads(ids):
+    """
+    Delete the leads with ``ids`` with one DELETE per table. Lead's only
+    cascade is its search tokens, so those go first and the collector,
+    which would load every lead, is skipped.
+    """
+    LeadSearchToken.objects.filter(lead_id__in=ids).delete()
+    queryset = Lead.objects.filter(id__in=ids)
+    return queryset._raw_delete(queryset.db)
+
+
+def run_delete_job(job, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete the remaining leads of a claimed job, committing one chunk at a time."""
+    try:
+        while True:
+            ids = _next_chunk(job, chunk_size)
+            if not ids:
+                break
+            with transaction.atomic():
+                heartbeat(job)
+                # Lock the chunk so concurrent edits cannot change it between the rollup read and the delete
+                locked = list(
+                    _scope(job, ids).select_for_update().values_list("id", flat=True)
+                )
+                facts = FactDelta()
+                facts.remove_queryset(Lead.objects.filter(id__in=locked))
+                job.deleted_count += delete_leads(locked)
+                facts.apply()
+                job.last_id = ids[-1]
+                job.save(update_fields=PROGRESS_FIELDS)
+                transaction.on_commit(invalidate_lead_caches)
+    except JobLost:
+        logger.warning("Delete job %s was taken over by another worker", job.pk)
+        return job
+    except Exception as exc:
+        logger.exception("Delete job %s failed", job.pk)
+        # Committed chunks stay deleted, with the rollup already adjusted
+        return _finish(job, DeleteJob.FAILED, str(exc)[:500])
+
+    with transaction.atomic():
+        heartbeat(job)
+        if job.upload_batch_id is not None:
+            job.upload_batch.delete()
+            job.upload_batch = None
+        _finish(job, DeleteJob.SUCCEEDED)
+    return job
+
+
+def _finish(job, status, message=""):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=[
+            "status",
+            "message",
+            "finished_at",
+            "upload_batch",
+            "heartbeat_at",
+        ]
+    )
+    return job
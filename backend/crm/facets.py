@@ -0,0 +1,247 @@
+"""
+Field options ("facets") for dropdowns, typeahead and the filter bar.
+
+LeadFacetValue is a dictionary of every distinct non-empty value of the
+FACET_FIELDS with its lead count. FactDelta feeds a FacetDelta on every
+write path, so the dictionary is kept current without rescans; all field
+options are then a single read (cached by the views under the lead data
+version), and typeahead is a prefix lookup on (field, normalized).
+
+Options under the current filters are counted from crm_lead itself, with
+one GROUPING SETS query on PostgreSQL and one grouped query per field
+elsewhere.
+"""
+
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Lead, LeadFacetValue
+
+FACET_FIELDS = (
+    "lead_status",
+    "lead_stage",
+    "enquiry_type",
+    "dealer",
+    "customer_type",
+    "dg_ownership",
+    "state",
+    "city",
+    "district",
+    "tehsil",
+    "zone",
+    "segment",
+    "sub_segment",
+    "source",
+    "source_from",
+    "kva_range",
+    "owner",
+    "owner_code",
+    "phase",
+    "finance_company",
+    "area_office",
+    "branch",
+    "location",
+    "referred_by",
+    "owner_status",
+    "events",
+    "loss_reason",
+)
+# Dropdowns shown by the dashboard filter bar
+FILTER_BAR_FIELDS = ("city", "dealer", "owner", "segment", "kva_range")
+TYPEAHEAD_LIMIT = 20
+# Options returned per dropdown field
+FIELD_OPTIONS_LIMIT = 200
+BATCH_SIZE = 1000
+
+
+def _value(lead, field):
+    if isinstance(lead, dict):
+        return lead.get(field)
+    return getattr(lead, field)
+
+
+def parse_facet_fields(request, param="fields", default=FILTER_BAR_FIELDS):
+    """Validate a comma-separated ``?fields=`` list of facet fields."""
+    raw = request.query_params.get(param)
+    if not raw:
+        return tuple(default)
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(fields) - set(FACET_FIELDS))
+    if unknown:
+        raise ValidationError({param: f"Unknown fields: {', '.join(unknown)}"})
+    return tuple(dict.fromkeys(fields))
+
+
+class FacetDelta:
+    """Accumulates signed per-value lead counts and applies them in one merge."""
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+
+    def _merge(self, lead, sign):
+        for field in FACET_FIELDS:
+            value = _value(lead, field)
+            if value:
+                self._counts[(field, value)] += sign
+
+    def add(self, lead):
+        self._merge(lead, 1)
+
+    def remove(self, lead):
+        self._merge(lead, -1)
+
+    def remove_queryset(self, queryset):
+        """Subtract every lead in ``queryset`` (call before deleting it)."""
+        for field, value, count in value_counts(queryset, FACET_FIELDS):
+            self._counts[(field, value)] -= count
+
+    def apply(self):
+        """Merge the accumulated counts into LeadFacetValue."""
+        deltas = {key: delta for key, delta in self._counts.items() if delta}
+        self._counts.clear()
+        if not deltas:
+            return
+
+        by_field = defaultdict(set)
+        for field, value in deltas:
+            by_field[field].add(value)
+        condition = Q()
+        for field, values in by_field.items():
+            condition |= Q(field=field, value__in=values)
+
+        with transaction.atomic():
+            existing = set(
+                LeadFacetValue.objects.filter(condition).values_list("field", "value")
+            )
+            to_create = [
+                LeadFacetValue(
+                    field=field, value=value, normalized=value.lower(), lead_count=0
+                )
+                for (field, value), delta in deltas.items()
+                if delta > 0 and (field, value) not in existing
+            ]
+            if to_create:
+                # A concurrent writer may be adding the same new value: insert empty
+                # rows, skipping conflicts, so both end up incrementing one locked row
+                LeadFacetValue.objects.bulk_create(
+                    to_create, batch_size=BATCH_SIZE, ignore_conflicts=True
+                )
+
+            to_update, to_delete = [], []
+            for row in LeadFacetValue.objects.select_for_update().filter(condition):
+                row.lead_count += deltas.get((row.field, row.value), 0)
+                if row.lead_count <= 0:
+                    to_delete.append(row.pk)
+                else:
+                    to_update.append(row)
+
+            if to_update:
+                LeadFacetValue.objects.bulk_update(
+                    to_update, ["lead_count"], batch_size=BATCH_SIZE
+                )
+            if to_delete:
+                LeadFacetValue.objects.filter(pk__in=to_delete).delete()
+
+
+def value_counts(queryset, fields):
+    """
+    Yield (field, value, lead_count) for the non-empty values of ``fields``
+    in ``queryset``: one query on PostgreSQL, one per field elsewhere.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        yield from _grouping_sets_counts(queryset, fields, connection)
+        return
+
+    # Grouping by every field at once would return about one row per lead
+    for field in fields:
+        rows = (
+            queryset.exclude(**{field: ""})
+            .values_list(field)
+            .annotate(facet_count=Count("id"))
+        )
+        for value, count in rows.iterator(chunk_size=BATCH_SIZE):
+            if value:
+                yield field, value, count
+
+
+def _grouping_sets_counts(queryset, fields, connection):
+    quote = connection.ops.quote_name
+    columns = [quote(field) for field in fields]
+    inner_sql, params = queryset.values(*fields).query.sql_with_params()
+    sql = (
+        f"SELECT {', '.join(columns)}, {', '.join(f'GROUPING({column})' for column in columns)}, COUNT(*) "
+        f"FROM ({inner_sql}) AS facet_source "
+        f"GROUP BY GROUPING SETS ({', '.join(f'({column})' for column in columns)})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            values, grouping, count = row[: len(fields)], row[len(fields) : -1], row[-1]
+            index = grouping.index(0)
+            if values[index]:
+                yield fields[index], values[index], count
+
+
+def facet_counts(queryset, fields=FILTER_BAR_FIELDS):
+    """Options under the current filters: {field: [{"value", "count"}, ...]} sorted by value."""
+    result = {field: [] for field in fields}
+    for field, value, count in value_counts(queryset, fields):
+        result[field].append({"value": value, "count": count})
+    for options in result.values():
+        options.sort(key=lambda option: option["value"])
+    return result
+
+
+def field_options(fields=FACET_FIELDS, limit=None):
+    """All known values per field from the dictionary (the first ``limit`` of each), in one query."""
+    options = {field: [] for field in fields}
+    rows = LeadFacetValue.objects.filter(field__in=fields, lead_count__gt=0)
+    if limit is not None:
+        rows = rows.annotate(
+            position=Window(
+                RowNumber(), partition_by=F("field"), order_by=F("value").asc()
+            )
+        ).filter(position__lte=limit)
+    for field, value in rows.order_by("field", "value").values_list("field", "value"):
+        options[field].append(value)
+    return options
+
+
+def typeahead(field, prefix, limit=TYPEAHEAD_LIMIT):
+    """Values of ``field`` starting with ``prefix`` (case-insensitive), most used first."""
+    return list(
+        LeadFacetValue.objects.filter(
+            field=field, normalized__startswith=prefix.lower(), lead_count__gt=0
+        )
+        .order_by("-lead_count", "value")
+        .values_list("value", flat=True)[:limit]
+    )
+
+
+def rebuild_facets() -> int:
+    """Recompute the whole dictionary from crm_lead. Returns the number of values."""
+    rows = []
+    for field in FACET_FIELDS:
+        counts = (
+            Lead.objects.exclude(**{field: ""})
+            .order_by()
+            .values_list(field)
+            .annotate(lead_count=Count("id"))
+        )
+        rows.extend(
+            LeadFacetValue(
+                field=field, value=value, normalized=value.lower(), lead_count=count
+            )
+            for value, count in counts
+        )
+    with transaction.atomic():
+        LeadFacetValue.objects.all().delete()
+        LeadFacetValue.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
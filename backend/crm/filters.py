@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.utils import timezone
-from django_filters import rest_framework as filters
 
+from django_filters import rest_framework as filters
 from rest_framework.exceptions import ValidationError
 
 from .models import Lead
@@ -50,7 +50,9 @@ class LeadFilter(filters.FilterSet):
 
     def filter_high_value(self, queryset, name, value):
         if value:
-            queryset = queryset.filter(order_value__gte=settings.CRM_HIGH_VALUE_THRESHOLD)
+            queryset = queryset.filter(
+                order_value__gte=settings.CRM_HIGH_VALUE_THRESHOLD
+            )
         return queryset
 
     def filter_followup_due(self, queryset, name, value):
@@ -64,10 +66,16 @@ class LeadFilter(filters.FilterSet):
         return queryset
 
 
-def filter_queryset(request):
+def build_filterset(request):
+    """Validate the request's LeadFilter parameters, raising ValidationError on bad input."""
     queryset = Lead.objects.all()
-    filterset = LeadFilter(data=request.query_params, queryset=queryset, request=request)
+    filterset = LeadFilter(
+        data=request.query_params, queryset=queryset, request=request
+    )
     if not filterset.is_valid():
         raise ValidationError(filterset.errors)
-    return filterset.qs
+    return filterset
 
+
+def filter_queryset(request):
+    return build_filterset(request).qs
@@ -0,0 +1,432 @@
+"""
+Columnar counterpart of import_utils.map_row() for large imports.
+
+map_frame() maps a DataFrame chunk of raw upload rows in one pass per
+column instead of one map_row() call per row:
+
+- text columns are cleaned with vectorized string methods;
+- each date column's distinct values go through that column's
+  DateParser, so its learned format and memo carry over from chunk to
+  chunk;
+- KVA buckets come from np.digitize and order values from array
+  arithmetic;
+- every column is dictionary-encoded with factorize(), so stripping and
+  the scalar helpers that must build Decimal, date or datetime objects
+  (fy/month/week, updated_at, ...) run once per distinct value and are
+  broadcast back by the codes.
+
+The result equals map_row() row for row. Rows holding anything other than
+strings or None (NaN cells, numbers from JSON) are passed to map_row()
+itself, so its coercions and errors are reproduced exactly.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from decimal import Decimal
+
+from django.utils import timezone
+
+import numpy as np
+import pandas as pd
+
+from .import_utils import (
+    CLOSED_KEYWORDS,
+    DATE_PARSERS,
+    estimate_order_value,
+    format_fy,
+    format_month,
+    format_week,
+    map_row,
+    parse_decimal,
+    parse_int,
+)
+from .models import LeadStage, row_hash_for, stage_code_for
+
+# Raw columns read by map_row()
+SOURCE_COLUMNS = (
+    "Enquiry No",
+    "EnquiryID",
+    "Enquiry Date",
+    "Enquiry Closure Date",
+    "EO/PO Date",
+    "LastFollowupDate",
+    "Planned Followup Date",
+    "KVA",
+    "Qty",
+    "Quantity",
+    "Enquiry Stage",
+    "EnquiryStatus",
+    "EnquiryType",
+    "Dealer",
+    "Dealer Name",
+    "Corporate Name",
+    "Address",
+    "Area Office",
+    "Branch",
+    "Customer Type",
+    "DG Ownership",
+    "District",
+    "State",
+    "Location",
+    "City",
+    "Tehsil",
+    "Zone",
+    "Segment",
+    "SubSegment",
+    "Source",
+    "Source From",
+    "Events",
+    "Finance Company",
+    "Finance Required",
+    "Employee Name",
+    "Employee Code",
+    "Employee Status",
+    "Email",
+    "Phone Number",
+    "PAN NO.",
+    "Phase",
+    "PinCode",
+    "Remarks",
+    "No of Follow-ups",
+    "FollowupCount",
+    "Referred By",
+    "Uploaded by",
+    "Created By",
+    "Upload By",
+)
+# Lead field -> raw column, for fields that are just the stripped value
+TEXT_FIELDS = {
+    "enquiry_type": "EnquiryType",
+    "corporate_name": "Corporate Name",
+    "address": "Address",
+    "area_office": "Area Office",
+    "branch": "Branch",
+    "customer_type": "Customer Type",
+    "dg_ownership": "DG Ownership",
+    "district": "District",
+    "state": "State",
+    "tehsil": "Tehsil",
+    "zone": "Zone",
+    "segment": "Segment",
+    "sub_segment": "SubSegment",
+    "source": "Source",
+    "source_from": "Source From",
+    "events": "Events",
+    "finance_company": "Finance Company",
+    "owner": "Employee Name",
+    "owner_code": "Employee Code",
+    "owner_status": "Employee Status",
+    "email": "Email",
+    "phone_number": "Phone Number",
+    "pan_number": "PAN NO.",
+    "phase": "Phase",
+    "pincode": "PinCode",
+    "location": "Location",
+    "remarks": "Remarks",
+    "referred_by": "Referred By",
+    "uploaded_by": "Uploaded by",
+}
+# bucket_kva_range() boundaries and labels
+KVA_BINS = np.array([50, 100, 200, 300])
+KVA_LABELS = np.array(["0-50", "50-100", "100-200", "200-300", "300+"], dtype=object)
+TRUE_VALUES = ("yes", "y", "true", "1")
+
+_CLOSED_RE = "|".join(re.escape(keyword) for keyword in CLOSED_KEYWORDS)
+
+
+def map_rows(rows):
+    """Map a list of raw row dicts like map_row(); see map_frame()."""
+    columns = {
+        column: _object_array([row.get(column) for row in rows])
+        for column in SOURCE_COLUMNS
+    }
+    return _map(columns, len(rows), lambda position: rows[position])
+
+
+def map_frame(frame):
+    """
+    Map every row of ``frame`` like map_row(); NA cells count as missing.
+
+    Returns one entry per row, in order: the mapped dict, or the exception
+    map_row() raised for that row.
+    """
+    columns = {
+        column: (
+            frame[column].to_numpy(dtype=object, na_value=None)
+            if column in frame
+            else np.full(len(frame), None, dtype=object)
+        )
+        for column in SOURCE_COLUMNS
+    }
+    return _map(
+        columns,
+        len(frame),
+        lambda position: {
+            column: columns[column][position]
+            for column in SOURCE_COLUMNS
+            if column in frame
+        },
+    )
+
+
+def _object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class _Column:
+    """A dictionary-encoded column: row ``i`` holds ``values[codes[i]]``."""
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def rows(self):
+        return self.values[self.codes]
+
+    def map(self, func, failed):
+        """Apply a scalar function once per distinct value; rows it raised for are flagged in ``failed``."""
+        values = np.empty(len(self.values), dtype=object)
+        broken = []
+        for index, value in enumerate(self.values):
+            try:
+                values[index] = func(value)
+            except Exception:
+                broken.append(index)
+        if broken:
+            failed |= np.isin(self.codes, broken)
+        return _Column(self.codes, values)
+
+    def strip(self):
+        return _Column(
+            self.codes, _object_array([value.strip() for value in self.values])
+        )
+
+
+def _encode(values):
+    """
+    Dictionary-encode a raw column. Returns the column, with missing cells
+    as "" (``value or ""`` in map_row), and the mask of rows whose cell is
+    a str or None; other cells are left to map_row().
+    """
+    codes, uniques = pd.factorize(values)
+    is_text = np.fromiter(
+        (isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques)
+    )
+    missing = codes == -1
+    text_rows = np.ones(len(values), dtype=bool)
+    if missing.any():
+        # factorize() folds None, NaN and NA together; only None is a missing value for map_row
+        text_rows[missing] = np.equal(values[missing], None)
+    if not is_text.all():
+        text_rows &= missing | is_text[codes]
+    uniques = np.where(is_text, np.asarray(uniques, dtype=object), "")
+    codes = np.where(missing, len(uniques), codes)
+    return _Column(codes, np.append(uniques, "").astype(object)), text_rows
+
+
+def _map(columns, length, source_row):
+    encoded = {}
+    columnar = np.ones(length, dtype=bool)
+    for column, values in columns.items():
+        encoded[column], text_rows = _encode(values)
+        columnar &= text_rows
+    raw = {
+        column: _Column(values.codes[columnar], values.values)
+        for column, values in encoded.items()
+    }
+
+    failed = np.zeros(int(columnar.sum()), dtype=bool)
+    mapped = _map_columns(raw, failed) if failed.size else []
+
+    results = [None] * length
+    fallback = ~columnar
+    for position, row, row_failed in zip(np.flatnonzero(columnar), mapped, failed):
+        if row_failed:
+            fallback[position] = True
+        else:
+            results[position] = row
+    for position in np.flatnonzero(fallback):
+        try:
+            results[position] = map_row(source_row(position))
+        except Exception as exc:
+            results[position] = exc
+    return results
+
+
+def _per_value(values, func, failed):
+    """_Column.map() for a plain row array."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return _Column(codes, _object_array(list(uniques))).map(func, failed).rows()
+
+
+def _first_non_empty(first, second):
+    """``first or second`` over two row arrays of strings."""
+    return np.where(first != "", first, second)
+
+
+def _parse_dates(raw, column):
+    """parse_date() over a raw date column, once per distinct value, via map_row()'s DateParser."""
+    parser = DATE_PARSERS[column]
+    return _Column(
+        raw[column].codes,
+        _object_array([parser(value) for value in raw[column].values]),
+    )
+
+
+def _or_else(values, fallback):
+    """``values or fallback`` for row arrays of dates/None."""
+    return np.where(np.equal(values, None), fallback, values)
+
+
+def _kva_float(kva):
+    return float(kva) if kva is not None else np.nan
+
+
+def _order_value(bits):
+    # Keyed by bit pattern so -0.0 and 0.0 keep their own str(); rounding as estimate_order_value()
+    return Decimal(str(round(float(np.int64(bits).view(np.float64)), 2)))
+
+
+def _contains(column, pattern, regex=True):
+    """Row mask: lower-cased value contains ``pattern``."""
+    found = (
+        pd.Series(column.values, dtype=object)
+        .str.lower()
+        .str.contains(pattern, regex=regex)
+    )
+    return found.to_numpy(dtype=bool)[column.codes]
+
+
+def _map_columns(raw, failed):
+    text = {column: values.strip() for column, values in raw.items()}
+    today = timezone.now().date()
+
+    enquiry_date = _parse_dates(raw, "Enquiry Date")
+    eo_po_date = _parse_dates(raw, "EO/PO Date").rows()
+    close_date = _or_else(_parse_dates(raw, "Enquiry Closure Date").rows(), eo_po_date)
+    last_followup = _parse_dates(raw, "LastFollowupDate").rows()
+    next_followup = _parse_dates(raw, "Planned Followup Date").rows()
+    updated_source = _or_else(
+        _or_else(_or_else(eo_po_date, last_followup), enquiry_date.rows()), today
+    )
+
+    kva = raw["KVA"].map(parse_decimal, failed)
+    kva_float = kva.map(_kva_float, failed)
+    kva_missing = np.equal(kva.rows(), None)
+    kva_float = kva_float.values.astype(float)[kva_float.codes]
+    kva_range = np.where(kva_missing, "", KVA_LABELS[np.digitize(kva_float, KVA_BINS)])
+    qty = raw["Qty"].map(parse_int, failed).rows()
+    quantity = np.where(qty != 0, qty, raw["Quantity"].map(parse_int, failed).rows())
+    quantity = np.where(quantity != 0, quantity, 1)
+    order_qty = np.where(qty != 0, qty, 1).astype(float)
+    with np.errstate(over="ignore", invalid="ignore"):
+        order_amount = np.where(kva_missing, 0.0, kva_float) * order_qty * 35000
+    order_value = _per_value(order_amount.view(np.int64), _order_value, failed)
+    # estimate_order_value() multiplies the int 0 when KVA is missing
+    order_value = np.where(kva_missing, estimate_order_value(None, 1), order_value)
+
+    lead_stage = text["Enquiry Stage"]
+    stage_code = lead_stage.map(stage_code_for, failed).rows()
+    is_won = stage_code == LeadStage.WON
+    is_closed = _contains(text["EnquiryStatus"], _CLOSED_RE) | _contains(
+        lead_stage, _CLOSED_RE
+    )
+    followup_count = raw["No of Follow-ups"].map(parse_int, failed).rows()
+    followup_count = np.where(
+        followup_count != 0,
+        followup_count,
+        raw["FollowupCount"].map(parse_int, failed).rows(),
+    )
+    rows = {column: values.rows() for column, values in text.items()}
+
+    columns = {
+        "enquiry_id": _first_non_empty(rows["Enquiry No"], rows["EnquiryID"]),
+        "enquiry_date": enquiry_date.rows(),
+        "close_date": close_date,
+        "lead_stage": rows["Enquiry Stage"],
+        "stage_code": stage_code,
+        "is_won": is_won,
+        "lead_status": np.where(is_closed, "Closed", "Open"),
+        "enquiry_type": rows["EnquiryType"],
+        "dealer": _first_non_empty(rows["Dealer"], rows["Dealer Name"]),
+        **{
+            field: rows[TEXT_FIELDS[field]]
+            for field in (
+                "corporate_name",
+                "address",
+                "area_office",
+                "branch",
+                "customer_type",
+                "dg_ownership",
+                "district",
+                "state",
+            )
+        },
+        # (Location or City).strip(): a blank-but-present Location still wins
+        "city": np.where(raw["Location"].rows() != "", rows["Location"], rows["City"]),
+        **{
+            field: rows[TEXT_FIELDS[field]]
+            for field in (
+                "tehsil",
+                "zone",
+                "segment",
+                "sub_segment",
+                "source",
+                "source_from",
+                "events",
+                "finance_company",
+            )
+        },
+        "finance_required": text["Finance Required"]
+        .map(lambda value: value.lower() in TRUE_VALUES, failed)
+        .rows(),
+        **{
+            field: rows[TEXT_FIELDS[field]]
+            for field in (
+                "owner",
+                "owner_code",
+                "owner_status",
+                "email",
+                "phone_number",
+                "pan_number",
+                "phase",
+                "pincode",
+                "location",
+            )
+        },
+        "kva": kva.rows(),
+        "kva_range": kva_range,
+        "quantity": quantity,
+        "order_value": order_value,
+        "win_flag": is_won,
+        "loss_reason": np.where(
+            _contains(lead_stage, "lost", regex=False), rows["Remarks"], ""
+        ),
+        "remarks": rows["Remarks"],
+        "followup_count": followup_count,
+        "last_followup_date": last_followup,
+        "next_followup_date": next_followup,
+        "referred_by": rows["Referred By"],
+        "uploaded_by": rows["Uploaded by"],
+        "created_by": np.where(
+            raw["Created By"].rows() != "", rows["Created By"], rows["Upload By"]
+        ),
+        "updated_at": _per_value(
+            updated_source,
+            lambda day: timezone.make_aware(datetime.combine(day, datetime.min.time())),
+            failed,
+        ),
+        "fy": enquiry_date.map(format_fy, failed).rows(),
+        "month": enquiry_date.map(format_month, failed).rows(),
+        "week": enquiry_date.map(format_week, failed).rows(),
+    }
+    fields = list(columns)
+    arrays = [np.asarray(values, dtype=object).tolist() for values in columns.values()]
+    mapped_rows = [dict(zip(fields, values)) for values in zip(*arrays)]
+    for mapped in mapped_rows:
+        mapped["row_hash"] = row_hash_for(mapped)
+    return mapped_rows
@@ -1,57 +1,69 @@
 from __future__ import annotations
 
+import csv
+import io
+from collections import Counter
 from datetime import datetime
 from decimal import Decimal
+from functools import lru_cache
+from itertools import zip_longest
 from typing import Any
 
 from django.utils import timezone
 
+from .models import LeadStage, row_hash_for, stage_code_for
+
 
 def normalize_value(value: Any):
-  if value is None:
-    return ""
-  if str(value) == "NaT":  # Handle pandas NaT
-    return ""
-  if isinstance(value, float) and (value != value):  # NaN check
-    return ""
-  if isinstance(value, (datetime,)):
-    return value.strftime("%Y-%m-%d")
-  return str(value)
+    if value is None:
+        return ""
+    if str(value) == "NaT":  # Handle pandas NaT
+        return ""
+    if isinstance(value, float) and (value != value):  # NaN check
+        return ""
+    if isinstance(value, (datetime,)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
 
 
 def map_row(row: dict) -> dict:
-    enquiry_date = parse_date(row.get("Enquiry Date"))
-    
+    enquiry_date = DATE_PARSERS["Enquiry Date"](row.get("Enquiry Date"))
+    eo_po_date = DATE_PARSERS["EO/PO Date"](row.get("EO/PO Date"))
+
     # Try multiple fields for close date
-    close_date = parse_date(row.get("Enquiry Closure Date"))
+    close_date = DATE_PARSERS["Enquiry Closure Date"](row.get("Enquiry Closure Date"))
     if not close_date:
         # Fallback to EO/PO Date if available (usually for Won leads)
-        close_date = parse_date(row.get("EO/PO Date"))
-    
-    last_followup = parse_date(row.get("LastFollowupDate"))
-    next_followup = parse_date(row.get("Planned Followup Date"))
+        close_date = eo_po_date
+
+    last_followup = DATE_PARSERS["LastFollowupDate"](row.get("LastFollowupDate"))
+    next_followup = DATE_PARSERS["Planned Followup Date"](
+        row.get("Planned Followup Date")
+    )
     updated_source = (
-        parse_date(row.get("EO/PO Date"))
-        or last_followup
-        or enquiry_date
-        or timezone.now().date()
+        eo_po_date or last_followup or enquiry_date or timezone.now().date()
     )
 
     kva_value = parse_decimal(row.get("KVA"))
     quantity = parse_int(row.get("Qty"))
 
     lead_stage = (row.get("Enquiry Stage") or "").strip()
+    stage_code = stage_code_for(lead_stage)
     enquiry_status = (row.get("EnquiryStatus") or "").strip()
     normalized_status = normalize_status(enquiry_status, lead_stage)
 
     defaults = {
-        "enquiry_id": (row.get("Enquiry No") or "").strip() or (row.get("EnquiryID") or "").strip(),
+        "enquiry_id": (row.get("Enquiry No") or "").strip()
+        or (row.get("EnquiryID") or "").strip(),
         "enquiry_date": enquiry_date,
         "close_date": close_date,
         "lead_stage": lead_stage,
+        "stage_code": stage_code,
+        "is_won": stage_code == LeadStage.WON,
         "lead_status": normalized_status,
         "enquiry_type": (row.get("EnquiryType") or "").strip(),
-        "dealer": (row.get("Dealer") or "").strip() or (row.get("Dealer Name") or "").strip(),
+        "dealer": (row.get("Dealer") or "").strip()
+        or (row.get("Dealer Name") or "").strip(),
         "corporate_name": (row.get("Corporate Name") or "").strip(),
         "address": (row.get("Address") or "").strip(),
         "area_office": (row.get("Area Office") or "").strip(),
@@ -83,42 +95,129 @@ def map_row(row: dict) -> dict:
         "kva_range": bucket_kva_range(kva_value),
         "quantity": quantity or parse_int(row.get("Quantity")) or 1,
         "order_value": estimate_order_value(kva_value, quantity or 1),
-        "win_flag": infer_win_flag(lead_stage),
+        "win_flag": stage_code == LeadStage.WON,
         "loss_reason": infer_loss_reason(lead_stage, row.get("Remarks")),
         "remarks": (row.get("Remarks") or "").strip(),
-        "followup_count": parse_int(row.get("No of Follow-ups")) or parse_int(row.get("FollowupCount")),
+        "followup_count": parse_int(row.get("No of Follow-ups"))
+        or parse_int(row.get("FollowupCount")),
         "last_followup_date": last_followup,
         "next_followup_date": next_followup,
         "referred_by": (row.get("Referred By") or "").strip(),
         "uploaded_by": (row.get("Uploaded by") or "").strip(),
         "created_by": (row.get("Created By") or row.get("Upload By") or "").strip(),
-        "updated_at": timezone.make_aware(datetime.combine(updated_source, datetime.min.time())),
+        "updated_at": timezone.make_aware(
+            datetime.combine(updated_source, datetime.min.time())
+        ),
         "fy": format_fy(enquiry_date),
         "month": format_month(enquiry_date),
         "week": format_week(enquiry_date),
     }
+    defaults["row_hash"] = row_hash_for(defaults)
     return defaults
 
 
+# Tried in order; added %d %b %Y (e.g. 01 Apr 2024) and other common formats
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d %b %Y",
+    "%d-%b-%Y",
+    "%d %B %Y",
+    "%d-%B-%Y",
+)
+
+
+# Earlier DATE_FORMATS that can read a string matching the key differently
+_AMBIGUOUS_FORMATS = {"%m/%d/%Y": ("%d/%m/%Y",)}
+
+
+def _strptime(value: str, fmt: str):
+    try:
+        return datetime.strptime(value, fmt).date()
+    except ValueError:
+        return None
+
+
 def parse_date(value: str | None):
     if not value:
         return None
     value = str(value).strip()
     if not value or value.lower() == "nan":
         return None
-    # Added %d %b %Y (e.g. 01 Apr 2024) and other common formats
-    formats = (
-        "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y",
-        "%d %b %Y", "%d-%b-%Y", "%d %B %Y", "%d-%B-%Y"
-    )
-    for fmt in formats:
-        try:
-            return datetime.strptime(value, fmt).date()
-        except ValueError:
-            continue
+    for fmt in DATE_FORMATS:
+        parsed = _strptime(value, fmt)
+        if parsed:
+            return parsed
     return None
 
 
+class DateParser:
+    """
+    parse_date() for one import column, tuned to that column's format.
+
+    Raw strings are memoised in an LRU cache, since exports repeat the same
+    dates heavily. On a miss the column's learned format is tried first,
+    after any earlier format that could read the same string differently,
+    so the answer is always parse_date()'s; the full format list is the
+    fallback. The format is re-learned from every ``sample_size`` misses,
+    so one parser can serve files in different formats.
+    """
+
+    def __init__(self, sample_size=50, memo_size=4096):
+        self.sample_size = sample_size
+        self.format = None
+        self._winners = Counter()
+        self._parse = lru_cache(maxsize=memo_size)(self._parse_uncached)
+
+    def __call__(self, value):
+        if not value:
+            return None
+        if not isinstance(value, str):
+            return parse_date(value)
+        return self._parse(value)
+
+    def _parse_uncached(self, value):
+        value = value.strip()
+        if not value or value.lower() == "nan":
+            return None
+        if self.format is not None:
+            for fmt in (*_AMBIGUOUS_FORMATS.get(self.format, ()), self.format):
+                parsed = _strptime(value, fmt)
+                if parsed:
+                    self._learn(fmt)
+                    return parsed
+        for fmt in DATE_FORMATS:
+            parsed = _strptime(value, fmt)
+            if parsed:
+                self._learn(fmt)
+                return parsed
+        return None
+
+    def _learn(self, fmt):
+        self._winners[fmt] += 1
+        if self._winners.total() >= self.sample_size:
+            self.format = self._winners.most_common(1)[0][0]
+            self._winners.clear()
+
+    def cache_info(self):
+        return self._parse.cache_info()
+
+
+# One parser per date column, shared by map_row() and the columnar map_rows()
+DATE_PARSERS = {
+    column: DateParser()
+    for column in (
+        "Enquiry Date",
+        "Enquiry Closure Date",
+        "EO/PO Date",
+        "LastFollowupDate",
+        "Planned Followup Date",
+    )
+}
+
+
 def parse_int(value):
     try:
         if value in (None, ""):
@@ -141,20 +240,21 @@ def normalize_bool(value):
     return str(value).strip().lower() in {"yes", "y", "true", "1"}
 
 
+CLOSED_KEYWORDS = ("closed", "decline", "lost", "order booked", "order received", "won")
+
+
 def normalize_status(status: str, stage: str) -> str:
-    closed_keywords = {"closed", "decline", "lost", "order booked", "order received", "won"}
     status_val = (status or "").strip().lower()
     stage_val = (stage or "").strip().lower()
-    if any(keyword in status_val for keyword in closed_keywords):
+    if any(keyword in status_val for keyword in CLOSED_KEYWORDS):
         return "Closed"
-    if any(keyword in stage_val for keyword in closed_keywords):
+    if any(keyword in stage_val for keyword in CLOSED_KEYWORDS):
         return "Closed"
     return "Open"
 
 
 def infer_win_flag(stage: str) -> bool:
-    stage_val = (stage or "").lower()
-    return "won" in stage_val and "lost" not in stage_val
+    return stage_code_for(stage) == LeadStage.WON
 
 
 def infer_loss_reason(stage: str, remarks: str | None) -> str:
@@ -205,22 +305,88 @@ def format_week(date_value):
     return f"W{week_num}"
 
 
-def load_records_from_file(uploaded_file):
-    import pandas as pd  # local import to avoid hard dependency at import time
+UPLOAD_BATCH_SIZE = 500
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
+
+def _header_names(header):
+    return [
+        str(name) if name not in (None, "") else f"Unnamed: {idx}"
+        for idx, name in enumerate(header)
+    ]
+
+
+def _iter_csv_records(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = _header_names(next(reader, []))
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue  # blank line
+            yield {
+                name: normalize_value(value)
+                for name, value in zip_longest(header, values[: len(header)])
+            }
+    finally:
+        # Leave the upload's file object open for the caller
+        text.detach()
+
+
+def _iter_xlsx_records(fileobj):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _header_names(next(rows, ()))
+        for values in rows:
+            if all(value in (None, "") for value in values):
+                continue  # empty row
+            yield {
+                name: normalize_value(value)
+                for name, value in zip_longest(header, values[: len(header)])
+            }
+    finally:
+        workbook.close()
+
+
+def iter_records(uploaded_file):
+    """
+    Stream normalized row dicts (header -> string) from a CSV or Excel upload.
+
+    CSV is read with the csv module and Excel with openpyxl's read-only row
+    iterator, so memory stays flat regardless of file size. Blank rows are
+    skipped and missing cells become "".
+    """
     name = (uploaded_file.name or "").lower()
+    fileobj = getattr(uploaded_file, "file", uploaded_file)
+    fileobj.seek(0)
     if name.endswith(".xlsx") or name.endswith(".xls"):
-        df = pd.read_excel(uploaded_file)
+        yield from _iter_xlsx_records(fileobj)
     else:
-        df = pd.read_csv(uploaded_file)
-    df = df.fillna("")
-    records = []
-    for record in df.to_dict(orient="records"):
-        normalized = {}
-        for key, value in record.items():
-            normalized[key] = normalize_value(value)
-        records.append(normalized)
-    return records
+        yield from _iter_csv_records(fileobj)
+
+
+def iter_record_batches(uploaded_file, batch_size=UPLOAD_BATCH_SIZE):
+    """Yield lists of up to ``batch_size`` normalized rows (see iter_records)."""
+    yield from batched(iter_records(uploaded_file), batch_size)
+
+
+def load_records_from_file(uploaded_file):
+    """All rows of an upload as a list; prefer iter_record_batches for large files."""
+    return list(iter_records(uploaded_file))
 
 
 def serialize_for_preview(mapped: dict, row: dict):
@@ -240,4 +406,3 @@ def serialize_for_preview(mapped: dict, row: dict):
         "customer_type": mapped.get("customer_type"),
         "raw": row,
     }
-
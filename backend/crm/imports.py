@@ -0,0 +1,159 @@
+"""
+Background lead imports without a message broker.
+
+An ImportJob points at a StagedUpload. The enqueue endpoint creates it with
+enqueue_import(); the run_import_worker management command claims queued
+jobs with claim_next_job() and applies them with run_job(). Every batch of
+staged rows is written by UploadWriter and committed in its own transaction
+together with the job's counters, so an import never holds a web worker,
+progress is readable while it runs, and a crashed worker loses at most the
+batch in flight: requeue_stale_jobs() hands its job to the next worker,
+which resumes after the last committed row. The job's UploadBatch is
+created on its first run and finished with the job's counts.
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs
+from .admin_views import log_activity
+from .cached_views import invalidate_lead_caches
+from .import_utils import UPLOAD_BATCH_SIZE
+from .jobs import STALE_JOB_TIMEOUT, JobLost, heartbeat
+from .models import ImportJob, UploadBatch
+from .uploads import UploadWriter, staged_batches
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = [
+    "processed_rows",
+    "last_row_number",
+    "created_count",
+    "updated_count",
+    "unchanged_count",
+    "error_count",
+    "errors",
+    "heartbeat_at",
+]
+
+
+def enqueue_import(staged, skip=(), remarks=None):
+    """Queue a StagedUpload for the worker; its rows are kept until the job finishes."""
+    skip = list(skip)
+    skipped = staged.rows.filter(enquiry_id__in=skip).count() if skip else 0
+    return ImportJob.objects.create(
+        user=staged.user,
+        upload=staged,
+        filename=staged.filename,
+        skip_enquiry_ids=skip,
+        remarks=remarks or {},
+        total_rows=staged.row_count - skipped,
+    )
+
+
+def requeue_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """Requeue running imports whose worker stopped reporting; returns how many."""
+    return jobs.requeue_stale_jobs(ImportJob, timeout)
+
+
+def claim_next_job():
+    """Mark the oldest queued import running and return it, or None if the queue is empty."""
+    return jobs.claim_next_job(ImportJob)
+
+
+def run_job(job, batch_size=UPLOAD_BATCH_SIZE):
+    """Apply the remaining rows of a claimed job, committing one batch at a time."""
+    if job.upload_id is None:
+        return _finish(job, ImportJob.FAILED, "The staged upload no longer exists.")
+
+    if job.upload_batch_id is None:
+        # A resumed job keeps writing into the batch of its first run
+        job.upload_batch = UploadBatch.objects.create(
+            user=job.user,
+            filename=job.filename,
+            started_at=job.started_at or timezone.now(),
+        )
+        job.save(update_fields=["upload_batch"])
+    writer = UploadWriter(
+        source=job.filename, batch_size=batch_size, upload_batch=job.upload_batch
+    )
+    batches = staged_batches(
+        job.upload,
+        job.skip_enquiry_ids,
+        job.remarks,
+        batch_size,
+        after_row=job.last_row_number,
+    )
+    try:
+        for batch in batches:
+            with transaction.atomic():
+                heartbeat(job)
+                created, updated, unchanged = (
+                    writer.created,
+                    writer.updated,
+                    writer.unchanged,
+                )
+                errors = len(writer.errors)
+                writer.write_mapped(batch)
+                new_errors = writer.errors[errors:]
+                job.processed_rows += len(batch)
+                job.last_row_number = batch[-1][0]
+                job.created_count += writer.created - created
+                job.updated_count += writer.updated - updated
+                job.unchanged_count += writer.unchanged - unchanged
+                job.error_count += len(new_errors)
+                job.errors = (job.errors + new_errors)[: ImportJob.MAX_ERRORS]
+                job.save(update_fields=PROGRESS_FIELDS)
+                transaction.on_commit(invalidate_lead_caches)
+    except JobLost:
+        logger.warning("Import job %s was taken over by another worker", job.pk)
+        return job
+    except Exception as exc:
+        logger.exception("Import job %s failed", job.pk)
+        # Rows committed so far stay applied; the staged rows expire as usual
+        return _finish(job, ImportJob.FAILED, str(exc)[:500])
+
+    with transaction.atomic():
+        heartbeat(job)
+        job.upload.delete()
+        job.upload = None
+        _finish(job, ImportJob.SUCCEEDED)
+
+    log_activity(
+        job.user,
+        "bulk_create_leads",
+        f"Bulk created {job.created_count} and updated {job.updated_count} leads "
+        f"from file: {job.filename}",
+        None,
+        {
+            "filename": job.filename,
+            "import_job": job.pk,
+            "created": job.created_count,
+            "updated": job.updated_count,
+            "unchanged": job.unchanged_count,
+            "errors": job.error_count,
+            "upload_batch": job.upload_batch_id,
+        },
+    )
+    return job
+
+
+def _finish(job, status, message=""):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=["status", "message", "finished_at", "upload", "heartbeat_at"]
+    )
+    # Rows committed by a failed job stay applied, so its batch is finished too
+    if job.upload_batch_id is not None:
+        job.upload_batch.finish(
+            job.processed_rows,
+            job.created_count,
+            job.updated_count,
+            job.unchanged_count,
+            job.error_count,
+        )
+    return job
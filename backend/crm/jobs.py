@@ -0,0 +1,74 @@
+"""
+Queue operations shared by the background jobs (models.BackgroundJob).
+
+The job tables are the queues: a worker claims the oldest queued job with a
+conditional update, refreshes its heartbeat with every committed batch, and
+requeue_stale_jobs() hands the jobs of dead workers to the next one.
+"""
+
+from datetime import timedelta
+
+from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# A running job whose worker has not committed a batch for this long is requeued
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+
+class JobLost(Exception):
+    """The job was requeued and claimed by another worker."""
+
+
+def requeue_stale_jobs(model, timeout=STALE_JOB_TIMEOUT):
+    """Requeue running jobs whose worker stopped reporting; returns how many."""
+    return model.objects.filter(
+        status=model.RUNNING, heartbeat_at__lt=timezone.now() - timeout
+    ).update(status=model.QUEUED)
+
+
+def claim_job(job):
+    """Mark a queued job running; False if another worker claimed it first."""
+    now = timezone.now()
+    # Conditional update: of several workers racing for a job, exactly one wins
+    claimed = (
+        type(job)
+        .objects.filter(pk=job.pk, status=job.QUEUED)
+        .update(
+            status=job.RUNNING,
+            heartbeat_at=now,
+            started_at=Coalesce(
+                "started_at", models.Value(now, output_field=models.DateTimeField())
+            ),
+        )
+    )
+    if claimed:
+        job.refresh_from_db()
+    return bool(claimed)
+
+
+def claim_next_job(model):
+    """Mark the oldest queued job running and return it, or None if the queue is empty."""
+    while True:
+        job = (
+            model.objects.filter(status=model.QUEUED)
+            .order_by("created_at", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        if claim_job(job):
+            return job
+
+
+def heartbeat(job):
+    """Refresh the job's heartbeat, raising JobLost if another worker now owns it."""
+    now = timezone.now()
+    owned = (
+        type(job)
+        .objects.filter(pk=job.pk, status=job.RUNNING, heartbeat_at=job.heartbeat_at)
+        .update(heartbeat_at=now)
+    )
+    if not owned:
+        raise JobLost(job.pk)
+    job.heartbeat_at = now
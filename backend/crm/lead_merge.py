@@ -0,0 +1,205 @@
+"""
+Set-based loading of mapped lead rows for very large imports.
+
+LeadMerge stages map_row() dicts in a temporary table and merges them into
+crm_lead with one INSERT ... SELECT ... ON CONFLICT (enquiry_id) DO UPDATE,
+instead of building Lead objects for bulk_create/bulk_update (whose
+CASE WHEN per column dominates large updates):
+
+- PostgreSQL: each add() streams its rows into the temp table with one
+  COPY FROM STDIN (temp tables are not WAL-logged), and the merge counts
+  inserted and updated leads from RETURNING (xmax = 0).
+- SQLite: rows are staged with executemany and the same merge runs;
+  leads that already exist are counted just before it.
+
+The merge updates rows in place, so lead ids and the rows referencing them
+(search tokens) survive. The last staged row of a repeated enquiry_id wins,
+and existing leads with the same row_hash keep their content and source;
+like UploadWriter, the merge only moves them to the staged upload_batch_id.
+Daily facts, facets and search tokens are not maintained: callers rebuild
+them afterwards, as import_leads does.
+"""
+
+import io
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.transaction import TransactionManagementError
+
+from .models import Lead, LeadStage, close_time_days_for, row_hash_for, stage_code_for
+
+STAGING_TABLE = "crm_lead_merge_stage"
+# Fields whose Python values are written as they are
+TEXT_FIELDS = ("CharField", "TextField", "EmailField")
+
+
+def _copy_text(value):
+    """Format one value for COPY's text format."""
+    if value is None:
+        return "\\N"
+    if value is True or value is False:
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class LeadMerge:
+    """
+    Stage mapped lead rows with add(), then upsert them all with merge().
+
+    Must be used inside transaction.atomic(): on PostgreSQL the staging
+    table is dropped at commit.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        if not self.connection.in_atomic_block:
+            raise TransactionManagementError(
+                "LeadMerge must be used inside transaction.atomic()"
+            )
+        self.is_postgres = self.connection.vendor == "postgresql"
+        self.table = ("pg_temp." if self.is_postgres else "temp.") + STAGING_TABLE
+
+        self.fields = [
+            field for field in Lead._meta.concrete_fields if not field.primary_key
+        ]
+        # Rows are keyed by attname, so foreign keys are given as ids (upload_batch_id)
+        self.defaults = {field.attname: field.get_default() for field in self.fields}
+        self.preparers = [
+            (
+                None
+                if field.get_internal_type() in TEXT_FIELDS
+                else (
+                    lambda value, field=field: field.get_db_prep_save(
+                        value, self.connection
+                    )
+                )
+            )
+            for field in self.fields
+        ]
+        # Columns overwritten on existing leads: those the staged rows provide
+        self.update_fields = set(Lead.DERIVED_FIELDS)
+        self.upload_batch_ids = set()
+        self.staged = 0
+
+        columns = ", ".join(self.quote(field.column) for field in self.fields)
+        on_commit = " ON COMMIT DROP" if self.is_postgres else ""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {STAGING_TABLE}{on_commit} AS "
+                f"SELECT 0 AS _row, {columns} FROM {self.quote(Lead._meta.db_table)} WHERE 1 = 0"
+            )
+
+    def quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def add(self, rows):
+        """Stage an iterable of map_row() dicts."""
+        records = []
+        for mapped in rows:
+            self.update_fields.update(mapped)
+            values = {**self.defaults, **mapped}
+            stage_code = stage_code_for(values["lead_stage"])
+            values["stage_code"] = stage_code
+            values["is_won"] = stage_code == LeadStage.WON
+            values["close_time_days"] = close_time_days_for(
+                values["enquiry_date"], values["close_date"]
+            )
+            values["row_hash"] = mapped.get("row_hash") or row_hash_for(values)
+            self.upload_batch_ids.add(values["upload_batch_id"])
+            self.staged += 1
+            records.append(
+                (
+                    self.staged,
+                    *(
+                        (
+                            values[field.attname]
+                            if prepare is None
+                            else prepare(values[field.attname])
+                        )
+                        for field, prepare in zip(self.fields, self.preparers)
+                    ),
+                )
+            )
+        if not records:
+            return
+        with self.connection.cursor() as cursor:
+            if self.is_postgres:
+                self._copy(cursor, records)
+            else:
+                placeholders = ", ".join(["%s"] * (len(self.fields) + 1))
+                cursor.executemany(
+                    f"INSERT INTO {self.table} VALUES ({placeholders})", records
+                )
+
+    def _copy(self, cursor, records):
+        buffer = io.StringIO()
+        for record in records:
+            buffer.write("\t".join(_copy_text(value) for value in record))
+            buffer.write("\n")
+        sql = f"COPY {self.table} FROM STDIN"
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    def merge(self):
+        """Upsert the staged rows into crm_lead; returns (inserted, updated, unchanged)."""
+        lead_table = self.quote(Lead._meta.db_table)
+        enquiry_id = self.quote(Lead._meta.get_field("enquiry_id").column)
+        row_hash = self.quote(Lead._meta.get_field("row_hash").column)
+        upload_batch = self.quote(Lead._meta.get_field("upload_batch").column)
+        columns = ", ".join(self.quote(field.column) for field in self.fields)
+        updates = ", ".join(
+            f"{self.quote(field.column)} = excluded.{self.quote(field.column)}"
+            for field in self.fields
+            if field.attname in self.update_fields and field.attname != "enquiry_id"
+        )
+        last_rows = f"SELECT MAX(_row) FROM {self.table} GROUP BY {enquiry_id}"
+        # The first WHERE also keeps SQLite from reading ON CONFLICT as a join constraint
+        insert = (
+            f"INSERT INTO {lead_table} ({columns}) "
+            f"SELECT {columns} FROM {self.table} WHERE _row IN ({last_rows}) "
+            f"ON CONFLICT ({enquiry_id}) DO UPDATE SET {updates} "
+            f"WHERE {lead_table}.{row_hash} <> excluded.{row_hash}"
+        )
+        # Unchanged leads still belong to the upload that contained them last
+        reattribute = (
+            f"UPDATE {lead_table} SET {upload_batch} = %s "
+            f"WHERE {enquiry_id} IN (SELECT {enquiry_id} FROM {self.table} "
+            f"WHERE {upload_batch} = %s AND _row IN ({last_rows})) "
+            f"AND ({upload_batch} IS NULL OR {upload_batch} <> %s)"
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(DISTINCT {enquiry_id}) FROM {self.table}")
+            total = cursor.fetchone()[0]
+            if self.is_postgres:
+                # Rows the WHERE skipped are not returned
+                cursor.execute(
+                    f"WITH merged AS ({insert} RETURNING (xmax = 0) AS inserted) "
+                    f"SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) "
+                    f"FROM merged"
+                )
+                inserted, updated = cursor.fetchone()
+            else:
+                cursor.execute(
+                    f"SELECT COUNT(*), COUNT(CASE WHEN l.{row_hash} = s.{row_hash} THEN 1 END) "
+                    f"FROM {self.table} s JOIN {lead_table} l ON l.{enquiry_id} = s.{enquiry_id} "
+                    f"WHERE s._row IN ({last_rows})"
+                )
+                existing, same = cursor.fetchone()
+                cursor.execute(insert)
+                inserted, updated = total - existing, existing - same
+            for batch_id in sorted(self.upload_batch_ids - {None}):
+                cursor.execute(reattribute, [batch_id, batch_id, batch_id])
+            cursor.execute(f"DROP TABLE {self.table}")
+        return inserted, updated, total - inserted - updated
@@ -0,0 +1,144 @@
+"""
+Benchmark upload date parsing on the production path: map_rows() over an
+export read in chunks, with the date columns parsed by parse_date() per
+distinct value, by DateParsers rebuilt for every chunk, and by the
+DateParsers map_rows() keeps for the whole import.
+Usage: python manage.py benchmark_date_parsing [--rows 100000] [--batch-size 2000] [--repeat 3]
+
+A synthetic export is written to a temporary CSV and read back with the
+upload reader, so the timings cover the same strings an upload parses.
+Nothing touches the database.
+"""
+
+import csv
+import io
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from crm.import_columnar import map_rows
+from crm.import_utils import DATE_PARSERS, DateParser, batched, iter_records, parse_date
+
+# Date columns and the format a typical export writes them in
+DATE_COLUMNS = {
+    "Enquiry Date": "%d-%m-%Y",
+    "Enquiry Closure Date": "%m/%d/%Y",
+    "EO/PO Date": "%d %b %Y",
+    "LastFollowupDate": "%d-%b-%Y",
+    "Planned Followup Date": "%Y-%m-%d",
+}
+
+
+class Command(BaseCommand):
+    help = "Time map_rows with parse_date against per-column DateParsers on a synthetic export"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with tempfile.NamedTemporaryFile("w+b", suffix=".csv") as handle:
+            self.write_export(handle, options["rows"])
+            handle.seek(0)
+            chunks = list(batched(iter_records(handle), options["batch_size"]))
+
+        # The mapped date fields as map_row() with parse_date() would set them
+        expected = [
+            (
+                parse_date(row["Enquiry Date"]),
+                parse_date(row["Enquiry Closure Date"])
+                or parse_date(row["EO/PO Date"]),
+                parse_date(row["LastFollowupDate"]),
+                parse_date(row["Planned Followup Date"]),
+            )
+            for rows in chunks
+            for row in rows
+        ]
+        production = dict(DATE_PARSERS)
+
+        def use_parsers(make):
+            DATE_PARSERS.update({column: make() for column in production})
+
+        def run(per_chunk=None):
+            results = []
+            for rows in chunks:
+                if per_chunk:
+                    use_parsers(per_chunk)
+                results.extend(map_rows(rows))
+            return results
+
+        def fresh_import():
+            use_parsers(DateParser)
+            return run()
+
+        paths = [
+            ("parse_date", lambda: run(per_chunk=lambda: parse_date)),
+            ("DateParser per chunk", lambda: run(per_chunk=DateParser)),
+            ("DateParser per import", fresh_import),
+        ]
+        self.stdout.write(
+            f"\n{options['rows']} rows in chunks of {options['batch_size']}, "
+            f"{len(DATE_COLUMNS)} date columns (map_rows, best of {options['repeat']})"
+        )
+        try:
+            baseline = None
+            for label, path in paths:
+                best = min(self.time(path) for _ in range(options["repeat"]))
+                baseline = baseline or best
+                self.stdout.write(
+                    f"  {label:<22} {best * 1000:9.1f} ms  {baseline / best:5.1f}x"
+                )
+
+            dates = [
+                (
+                    row["enquiry_date"],
+                    row["close_date"],
+                    row["last_followup_date"],
+                    row["next_followup_date"],
+                )
+                for row in fresh_import()
+            ]
+            if dates != expected:
+                self.stderr.write("DateParser results differ from parse_date")
+            for column, parser in DATE_PARSERS.items():
+                info = parser.cache_info()
+                self.stdout.write(
+                    f"  {column:<22} format {parser.format or '-':<9} memo hits {info.hits}  misses {info.misses}"
+                )
+        finally:
+            DATE_PARSERS.update(production)
+
+    def write_export(self, handle, rows):
+        rng = random.Random(0)
+        start = date(2022, 4, 1)
+        text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(["Enquiry No", *DATE_COLUMNS])
+        for idx in range(rows):
+            # About three years of dates, as in a full CRM export
+            day = start + timedelta(days=rng.randrange(1100))
+            writer.writerow(
+                [
+                    f"ENQ{idx:07d}",
+                    *(
+                        (
+                            (day + timedelta(days=offset)).strftime(fmt)
+                            if rng.random() > 0.1
+                            else ""
+                        )
+                        for offset, fmt in enumerate(DATE_COLUMNS.values())
+                    ),
+                ]
+            )
+        text.flush()
+        text.detach()
+
+    @staticmethod
+    def time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
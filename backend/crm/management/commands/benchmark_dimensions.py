@@ -0,0 +1,210 @@
+"""
+Benchmark normalised (dimension table + integer key) storage for the
+high-repetition Lead string columns against the current wide layout.
+Usage: python manage.py benchmark_dimensions [--rows 50000] [--repeat 5]
+
+Both layouts are built as scratch tables from crm_lead (plus optional
+synthetic leads) inside a transaction that is rolled back, so the command
+is safe to run against a development or staging database. It reports the
+stored size of each layout (PostgreSQL relation sizes, SQLite dbstat) and
+the latency of typical dashboard GROUP BYs on each.
+"""
+
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from crm.models import Lead
+
+# High-repetition columns that would move to dimension tables
+DIMENSION_COLUMNS = (
+    "dealer",
+    "state",
+    "city",
+    "district",
+    "tehsil",
+    "segment",
+    "sub_segment",
+    "owner",
+    "area_office",
+    "branch",
+    "finance_company",
+)
+# Columns carried unchanged by both layouts
+BASE_COLUMNS = ("id", "enquiry_date", "close_date", "lead_status", "order_value")
+# Dashboard-style aggregates: group by each of these
+GROUP_BY_COLUMNS = ("dealer", "state", "segment", "owner")
+
+WIDE_TABLE = "bench_lead_wide"
+NARROW_TABLE = "bench_lead_normalized"
+
+
+def dim_table(column):
+    return f"bench_dim_{column}"
+
+
+class Command(BaseCommand):
+    help = "Compare table size and aggregate latency of wide vs dimension-keyed lead storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=0,
+            help="Synthetic leads to add before measuring (rolled back)",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["rows"]:
+                self.create_leads(options["rows"])
+            with connection.cursor() as cursor:
+                self.build_tables(cursor)
+                self.report_sizes(cursor)
+                self.report_latency(cursor, options["repeat"])
+            transaction.set_rollback(True)
+
+    def create_leads(self, count):
+        today = timezone.now().date()
+        leads = []
+        for idx in range(count):
+            lead = Lead(
+                enquiry_id=f"DIMBENCH{idx:07d}",
+                dealer=f"Dealer Power Solutions Pvt Ltd {idx % 300}",
+                state=("Punjab", "Haryana", "Delhi", "Uttar Pradesh", "Rajasthan")[
+                    idx % 5
+                ],
+                city=f"City {idx % 900}",
+                district=f"District {idx % 400}",
+                tehsil=f"Tehsil {idx % 1500}",
+                segment=("Retail", "Telecom", "Infra", "Healthcare")[idx % 4],
+                sub_segment=f"Sub Segment {idx % 30}",
+                owner=f"Sales Engineer {idx % 120}",
+                area_office=f"Area Office {idx % 20}",
+                branch=f"Branch {idx % 60}",
+                finance_company=("", "HDFC Bank", "ICICI Bank", "Bajaj Finance")[
+                    idx % 4
+                ],
+                lead_stage=("Follow Up", "Closed-Won", "Closed-Lost")[idx % 3],
+                lead_status=("Open", "Closed")[idx % 2],
+                enquiry_date=today - timedelta(days=idx % 700),
+                order_value=Decimal(idx % 5000) * 1000,
+            )
+            lead.refresh_derived_fields()
+            leads.append(lead)
+        Lead.objects.bulk_create(leads, batch_size=2000)
+
+    def build_tables(self, cursor):
+        quote = connection.ops.quote_name
+        lead_table = quote(Lead._meta.db_table)
+        for column in DIMENSION_COLUMNS:
+            # Dense integer keys, one row per distinct value
+            cursor.execute(
+                f"CREATE TABLE {dim_table(column)} AS "
+                f"SELECT ROW_NUMBER() OVER (ORDER BY {quote(column)}) AS id, {quote(column)} AS value "
+                f"FROM (SELECT DISTINCT {quote(column)} FROM {lead_table}) AS distinct_values"
+            )
+            cursor.execute(
+                f"CREATE UNIQUE INDEX {dim_table(column)}_value ON {dim_table(column)} (value)"
+            )
+
+        base = ", ".join(f"l.{quote(column)}" for column in BASE_COLUMNS)
+        wide = ", ".join(f"l.{quote(column)}" for column in DIMENSION_COLUMNS)
+        cursor.execute(
+            f"CREATE TABLE {WIDE_TABLE} AS SELECT {base}, {wide} FROM {lead_table} l"
+        )
+
+        keys = ", ".join(
+            f"{dim_table(column)}.id AS {column}_id" for column in DIMENSION_COLUMNS
+        )
+        joins = " ".join(
+            f"JOIN {dim_table(column)} ON {dim_table(column)}.value = l.{quote(column)}"
+            for column in DIMENSION_COLUMNS
+        )
+        cursor.execute(
+            f"CREATE TABLE {NARROW_TABLE} AS SELECT {base}, {keys} FROM {lead_table} l {joins}"
+        )
+
+        # Each layout gets the same single-column indexes on its group-by columns
+        for column in GROUP_BY_COLUMNS:
+            cursor.execute(
+                f"CREATE INDEX {WIDE_TABLE}_{column} ON {WIDE_TABLE} ({column})"
+            )
+            cursor.execute(
+                f"CREATE INDEX {NARROW_TABLE}_{column} ON {NARROW_TABLE} ({column}_id)"
+            )
+        if connection.vendor == "postgresql":
+            for table in (WIDE_TABLE, NARROW_TABLE, *map(dim_table, DIMENSION_COLUMNS)):
+                cursor.execute(f"ANALYZE {table}")
+
+    def table_size(self, cursor, table):
+        """Bytes used by a table and its indexes, or None when the backend can't tell."""
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == "sqlite":
+            try:
+                with transaction.atomic():
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                        [table],
+                    )
+            except Exception:
+                return None  # SQLite built without the dbstat virtual table
+            return cursor.fetchone()[0] or 0
+        return None
+
+    def report_sizes(self, cursor):
+        cursor.execute(f"SELECT COUNT(*) FROM {WIDE_TABLE}")
+        rows = cursor.fetchone()[0]
+        wide = self.table_size(cursor, WIDE_TABLE)
+        narrow = self.table_size(cursor, NARROW_TABLE)
+        dims = [
+            self.table_size(cursor, dim_table(column)) for column in DIMENSION_COLUMNS
+        ]
+
+        self.stdout.write(
+            f"\nStorage ({rows} leads, {len(DIMENSION_COLUMNS)} dimension columns)"
+        )
+        if wide is None or narrow is None or None in dims:
+            self.stdout.write(f"  table sizes are not available on {connection.vendor}")
+            return
+        normalized = narrow + sum(dims)
+        self.stdout.write(f"  wide layout           {wide / 1024:10.1f} KiB")
+        self.stdout.write(
+            f"  dimension-keyed       {normalized / 1024:10.1f} KiB"
+            f"  (leads {narrow / 1024:.1f} + dimensions {sum(dims) / 1024:.1f})"
+        )
+        if wide:
+            self.stdout.write(f"  ratio                 {normalized / wide:10.2f}x")
+
+    def report_latency(self, cursor, repeat):
+        self.stdout.write(f"\nGROUP BY latency (best of {repeat})")
+        for column in GROUP_BY_COLUMNS:
+            wide_sql = f"SELECT {column}, COUNT(*), SUM(order_value) FROM {WIDE_TABLE} GROUP BY {column}"
+            # Group on the integer key, then attach labels from the small dimension table
+            narrow_sql = (
+                f"SELECT d.value, t.n, t.total FROM "
+                f"(SELECT {column}_id AS key_id, COUNT(*) AS n, SUM(order_value) AS total "
+                f"FROM {NARROW_TABLE} GROUP BY {column}_id) t "
+                f"JOIN {dim_table(column)} d ON d.id = t.key_id"
+            )
+            wide = min(self.time(cursor, wide_sql) for _ in range(repeat))
+            narrow = min(self.time(cursor, narrow_sql) for _ in range(repeat))
+            self.stdout.write(
+                f"  {column:<10} wide {wide * 1000:8.2f} ms   keyed {narrow * 1000:8.2f} ms"
+                f"   {wide / narrow if narrow else 0:5.2f}x"
+            )
+
+    @staticmethod
+    def time(cursor, sql):
+        start = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        return time.perf_counter() - start
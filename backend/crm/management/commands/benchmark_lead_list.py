@@ -0,0 +1,106 @@
+"""
+Benchmark lead list serialization: LeadSerializer vs the values()-based
+FastLeadListSerializer, with and without a sparse fieldset.
+Usage: python manage.py benchmark_lead_list [--sizes 50 1000] [--repeat 5]
+
+Synthetic leads are created inside a transaction that is rolled back, so
+the command is safe to run against a development database.
+"""
+
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from crm.models import Lead
+from crm.serializers import FastLeadListSerializer, LeadSerializer
+
+# Columns shown by the leads table
+TABLE_FIELDS = [
+    "enquiry_id",
+    "enquiry_date",
+    "dealer",
+    "state",
+    "segment",
+    "lead_stage",
+    "lead_status",
+    "owner",
+    "order_value",
+    "updated_at",
+]
+
+
+class Command(BaseCommand):
+    help = "Time lead list serialization paths at several page sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[50, 1000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = options["sizes"]
+        with transaction.atomic():
+            self.create_leads(max(sizes))
+            for size in sizes:
+                self.report(size, options["repeat"])
+            transaction.set_rollback(True)
+
+    def create_leads(self, count):
+        today = timezone.now().date()
+        leads = []
+        for idx in range(count):
+            lead = Lead(
+                enquiry_id=f"BENCH{idx:06d}",
+                dealer=f"Dealer {idx % 40}",
+                state=("Punjab", "Haryana", "Delhi")[idx % 3],
+                segment=("Retail", "Telecom", "Infra")[idx % 3],
+                lead_stage=("Follow Up", "Closed-Won", "Closed-Lost")[idx % 3],
+                lead_status=("Open", "Closed")[idx % 2],
+                owner=f"Owner {idx % 25}",
+                enquiry_date=today - timedelta(days=idx % 400),
+                close_date=today - timedelta(days=idx % 50) if idx % 2 else None,
+                kva=Decimal(idx % 250),
+                order_value=Decimal(idx * 1000),
+                remarks="Synthetic benchmark lead",
+            )
+            lead.refresh_derived_fields()
+            leads.append(lead)
+        Lead.objects.bulk_create(leads, batch_size=1000)
+
+    def report(self, size, repeat):
+        queryset = Lead.objects.filter(enquiry_id__startswith="BENCH").order_by(
+            "-updated_at", "-id"
+        )
+        full = FastLeadListSerializer()
+        sparse = FastLeadListSerializer(TABLE_FIELDS)
+        paths = [
+            (
+                "LeadSerializer",
+                lambda: LeadSerializer(list(queryset[:size]), many=True).data,
+            ),
+            (
+                "values() fast path",
+                lambda: full.render(queryset.values(*full.db_fields)[:size]),
+            ),
+            (
+                "values() + ?fields=",
+                lambda: sparse.render(queryset.values(*sparse.db_fields)[:size]),
+            ),
+        ]
+        self.stdout.write(f"\nPage size {size} (best of {repeat}, query included)")
+        baseline = None
+        for label, run in paths:
+            best = min(self.time(run) for _ in range(repeat))
+            baseline = baseline or best
+            self.stdout.write(
+                f"  {label:<22} {best * 1000:8.2f} ms  {baseline / best:5.1f}x"
+            )
+
+    @staticmethod
+    def time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
@@ -0,0 +1,139 @@
+"""
+Benchmark loading mapped lead rows: bulk_create + bulk_update, the
+bulk_create(update_conflicts=True) upsert, and the staging-table merge.
+Usage: python manage.py benchmark_lead_loading [--rows 100000] [--batch-size 500]
+       [--paths bulk upsert merge]
+
+Rows are mapped once up front; each path then loads them twice, into an
+empty key range (all inserts) and again with changed values (all updates).
+Every path runs in a transaction that is rolled back, so the database is
+left as it was.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from crm.import_columnar import map_rows
+from crm.import_utils import UPLOAD_BATCH_SIZE, batched
+from crm.lead_merge import LeadMerge
+from crm.models import Lead
+from crm.uploads import UPDATE_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Time the ORM bulk paths against the staging-table merge for lead imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        # The upload path's batch size: bulk_update's CASE WHEN grows with it
+        parser.add_argument("--batch-size", type=int, default=UPLOAD_BATCH_SIZE)
+        # bulk_update is very slow on SQLite; leave it out of large runs there
+        parser.add_argument(
+            "--paths",
+            nargs="+",
+            choices=["bulk", "upsert", "merge"],
+            default=["bulk", "upsert", "merge"],
+        )
+
+    def handle(self, *args, **options):
+        rows, batch_size = options["rows"], options["batch_size"]
+        passes = [
+            ("insert", self.mapped_rows(rows, "Dealer")),
+            ("update", self.mapped_rows(rows, "Changed dealer")),
+        ]
+        paths = [
+            (label, load)
+            for key, label, load in [
+                ("bulk", "bulk_create+update", self.load_bulk),
+                ("upsert", "bulk_create upsert", self.load_upsert),
+                ("merge", "staged merge", self.load_merge),
+            ]
+            if key in options["paths"]
+        ]
+        self.stdout.write(
+            f"\n{rows} rows on {connection.vendor}, batches of {batch_size}"
+        )
+        baseline = {}
+        for label, load in paths:
+            timings = []
+            with transaction.atomic():
+                for name, mapped in passes:
+                    timings.append(self.time(lambda: load(mapped, batch_size)))
+                    baseline.setdefault(name, timings[-1])
+                count = Lead.objects.filter(enquiry_id__startswith="BENCH").count()
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"  {label:<22}"
+                + "".join(
+                    f" {name} {best * 1000:9.1f} ms {baseline[name] / best:5.1f}x "
+                    for (name, _), best in zip(passes, timings)
+                )
+                + f" ({count} leads)"
+            )
+
+    def mapped_rows(self, rows, dealer):
+        raw = [
+            {
+                "Enquiry No": f"BENCH{idx:08d}",
+                "Dealer": f"{dealer} {idx % 200}",
+                "State": "Punjab",
+                "KVA": str(25 * (idx % 12)),
+                "Enquiry Date": "05-01-2024",
+                "Enquiry Stage": ("Open", "Closed-Won", "Lost")[idx % 3],
+                "Remarks": "x" * 40,
+            }
+            for idx in range(rows)
+        ]
+        return [mapped for chunk in batched(raw, 5000) for mapped in map_rows(chunk)]
+
+    @staticmethod
+    def load_bulk(mapped_rows, batch_size):
+        for batch in batched(mapped_rows, batch_size):
+            existing = {
+                lead.enquiry_id: lead
+                for lead in Lead.objects.filter(
+                    enquiry_id__in=[mapped["enquiry_id"] for mapped in batch]
+                )
+            }
+            new, changed = [], []
+            for mapped in batch:
+                lead = existing.get(mapped["enquiry_id"])
+                if lead is None:
+                    lead = Lead(**mapped)
+                    new.append(lead)
+                else:
+                    for key, value in mapped.items():
+                        setattr(lead, key, value)
+                    changed.append(lead)
+                lead.refresh_derived_fields()
+            Lead.objects.bulk_create(new, batch_size=batch_size)
+            Lead.objects.bulk_update(changed, UPDATE_FIELDS, batch_size=batch_size)
+
+    @staticmethod
+    def load_upsert(mapped_rows, batch_size):
+        fields = [field for field in mapped_rows[0] if field != "enquiry_id"]
+        for batch in batched(mapped_rows, batch_size):
+            leads = [Lead(**mapped) for mapped in batch]
+            for lead in leads:
+                lead.refresh_derived_fields()
+            Lead.objects.bulk_create(
+                leads,
+                update_conflicts=True,
+                unique_fields=["enquiry_id"],
+                update_fields=[*fields, *Lead.DERIVED_FIELDS],
+            )
+
+    @staticmethod
+    def load_merge(mapped_rows, batch_size):
+        merge = LeadMerge()
+        for batch in batched(mapped_rows, batch_size):
+            merge.add(batch)
+        merge.merge()
+
+    @staticmethod
+    def time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
@@ -0,0 +1,49 @@
+"""
+Verify the LeadDailyFact rollup against crm_lead.
+Usage: python manage.py check_daily_facts [--fix]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.rollups import check_daily_facts, rebuild_daily_facts
+
+
+class Command(BaseCommand):
+    help = "Compare the LeadDailyFact rollup with a fresh aggregate of the lead table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Rebuild the rollup when mismatches are found",
+        )
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=10,
+            help="Number of mismatched keys to print",
+        )
+
+    def handle(self, *args, **options):
+        mismatches = check_daily_facts()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Daily fact rollup is consistent"))
+            return
+
+        for mismatch in mismatches[: options["show"]]:
+            self.stdout.write(
+                f"{mismatch['key']}: expected {mismatch['expected']} got {mismatch['actual']}"
+            )
+
+        if options["fix"]:
+            fact_rows = rebuild_daily_facts()
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Found {len(mismatches)} mismatched keys; rebuilt {fact_rows} fact rows"
+                )
+            )
+            return
+
+        raise CommandError(
+            f"Daily fact rollup has {len(mismatches)} mismatched keys (run with --fix)"
+        )
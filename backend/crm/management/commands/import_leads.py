@@ -1,13 +1,48 @@
+"""
+Import CRM leads from a CSV export.
+Usage: python manage.py import_leads export.csv [--truncate] [--batch-size 2000]
+       [--commit-every 20000] [--workers 1] [--merge]
+
+The CSV is read in chunks of --batch-size rows, mapped with the columnar
+map_rows() and written with one upsert per chunk (INSERT ... ON CONFLICT
+(enquiry_id) DO UPDATE via bulk_create(update_conflicts=True)). A repeated
+enquiry_id keeps its last row, and leads whose stored row_hash matches the
+row keep their content and source (see UploadWriter). A transaction is committed every
+--commit-every rows, and with --workers > 1 chunks are mapped in worker
+processes while the main process writes, in file order.
+
+With --merge, each transaction's rows are staged in a temporary table
+(COPY on PostgreSQL) and merged with one INSERT ... ON CONFLICT instead
+(see lead_merge.py), which suits reloads of hundreds of thousands of rows.
+Every lead of the file, unchanged ones included, points at the run's
+UploadBatch.
+"""
+
 from __future__ import annotations
 
 import csv
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import django
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
-from crm.import_utils import map_row
-from crm.models import Lead
+from crm.cached_views import invalidate_lead_caches
+from crm.facets import rebuild_facets
+from crm.import_columnar import map_rows
+from crm.import_utils import batched
+from crm.lead_merge import LeadMerge
+from crm.models import Lead, UploadBatch
+from crm.rollups import rebuild_daily_facts
+from crm.search import rebuild_search_index
+from crm.uploads import reattribute_unchanged
+
+# Row errors printed before the summary; the rest are only counted
+MAX_REPORTED_ERRORS = 10
 
 
 class Command(BaseCommand):
@@ -20,43 +55,179 @@ class Command(BaseCommand):
             action="store_true",
             help="Delete existing leads before import",
         )
+        parser.add_argument(
+            "--batch-size", type=int, default=2000, help="Rows per upsert"
+        )
+        parser.add_argument(
+            "--commit-every",
+            type=int,
+            default=20000,
+            help="Rows per transaction, rounded up to whole batches (0: one transaction)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes mapping CSV chunks while the main process writes",
+        )
+        parser.add_argument(
+            "--merge",
+            action="store_true",
+            help="Stage rows in a temporary table and merge them once per transaction",
+        )
 
     def handle(self, *args, **options):
         csv_path = Path(options["csv_path"])
         if not csv_path.exists():
             raise CommandError(f"File not found: {csv_path}")
+        batch_size = options["batch_size"]
+        if batch_size < 1 or options["workers"] < 1 or options["commit_every"] < 0:
+            raise CommandError(
+                "--batch-size and --workers must be positive, --commit-every not negative"
+            )
 
         if options["truncate"]:
             self.stdout.write("Truncating existing leads…")
             Lead.objects.all().delete()
 
+        self.row_count = self.created = self.updated = self.unchanged = self.skipped = 0
+        self.errors = []
+        self.upload_batch = UploadBatch.objects.create(filename=csv_path.name)
+        self.started = time.perf_counter()
         with csv_path.open("r", encoding="utf-8-sig", newline="") as handle:
-            reader = csv.DictReader(handle)
-            row_count = 0
-            created = 0
-            updated = 0
+            chunks = batched(csv.DictReader(handle), batch_size)
+            mapped_chunks = self.map_chunks(chunks, options["workers"])
+            self.write(mapped_chunks, options["commit_every"], options["merge"])
 
-            with transaction.atomic():
-                for row in reader:
-                    row_count += 1
-                    defaults = map_row(row)
-                    enquiry_id = defaults.get("enquiry_id")
-                    if not enquiry_id:
-                        continue
-
-                    _, is_created = Lead.objects.update_or_create(
-                        enquiry_id=enquiry_id,
-                        defaults=defaults,
-                    )
-
-                    if is_created:
-                        created += 1
-                    else:
-                        updated += 1
+        # A full reload touches most of the table, so rebuild rather than patch the rollup
+        fact_rows = rebuild_daily_facts()
+        rebuild_facets()
+        rebuild_search_index()
+        invalidate_lead_caches()
+        self.upload_batch.finish(
+            self.row_count,
+            self.created,
+            self.updated,
+            self.unchanged,
+            len(self.errors) + self.skipped,
+        )
 
+        for error in self.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(error)
+        elapsed = time.perf_counter() - self.started
         self.stdout.write(
             self.style.SUCCESS(
-                f"Processed {row_count} rows • created {created} • updated {updated}"
+                f"Processed {self.row_count} rows • created {self.created} • updated {self.updated}"
+                f" • unchanged {self.unchanged} • skipped {self.skipped} • {len(self.errors)} errors"
+                f" • {fact_rows} daily fact rows"
+                f" • {elapsed:.1f}s ({self.row_count / max(elapsed, 1e-9):.0f} rows/s)"
             )
         )
 
+    def map_chunks(self, chunks, workers):
+        """Yield (raw rows, map_rows() results) per chunk, in file order."""
+        if workers == 1:
+            for rows in chunks:
+                yield rows, map_rows(rows)
+            return
+        # Spawned rather than forked, so workers never inherit the open database connection
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=django.setup
+        ) as pool:
+            # Bounded read-ahead keeps memory at a few chunks per worker
+            pending = deque()
+            for rows in chunks:
+                pending.append((rows, pool.submit(map_rows, rows)))
+                if len(pending) >= workers * 2:
+                    rows, future = pending.popleft()
+                    yield rows, future.result()
+            while pending:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+
+    def write(self, mapped_chunks, commit_every, merge):
+        """Upsert every chunk, committing every ``commit_every`` rows."""
+        mapped_chunks = iter(mapped_chunks)
+        exhausted = False
+        while not exhausted:
+            exhausted = True
+            uncommitted = 0
+            with transaction.atomic():
+                staging = LeadMerge() if merge else None
+                for rows, results in mapped_chunks:
+                    leads = self.collect(results)
+                    if staging is not None:
+                        staging.add(leads.values())
+                    elif leads:
+                        self.upsert(leads)
+                    uncommitted += len(rows)
+                    if commit_every and uncommitted >= commit_every:
+                        exhausted = False
+                        break
+                if staging is not None:
+                    created, updated, unchanged = staging.merge()
+                    self.created += created
+                    self.updated += updated
+                    self.unchanged += unchanged
+            if uncommitted:
+                self.report_progress()
+
+    def collect(self, results):
+        """The chunk's valid rows by enquiry_id; errors and rows without one are counted."""
+        leads = {}
+        for mapped in results:
+            self.row_count += 1
+            if isinstance(mapped, Exception):
+                self.errors.append(f"Row {self.row_count}: {str(mapped)[:100]}")
+                continue
+            enquiry_id = mapped.get("enquiry_id")
+            if not enquiry_id:
+                self.skipped += 1
+                continue
+            mapped["upload_batch_id"] = self.upload_batch.pk
+            # One upsert cannot touch a row twice: the last row of a repeated enquiry_id wins
+            leads[enquiry_id] = mapped
+        return leads
+
+    def upsert(self, leads):
+        stored = dict(
+            Lead.objects.filter(enquiry_id__in=list(leads)).values_list(
+                "enquiry_id", "row_hash"
+            )
+        )
+        objs, unchanged = [], []
+        for enquiry_id, mapped in leads.items():
+            if stored.get(enquiry_id) == mapped["row_hash"]:
+                unchanged.append(enquiry_id)
+                continue
+            lead = Lead(**mapped)
+            lead.refresh_derived_fields()
+            objs.append(lead)
+        self.unchanged += len(unchanged)
+        if unchanged:
+            reattribute_unchanged(
+                Lead.objects.filter(enquiry_id__in=unchanged), self.upload_batch
+            )
+        if not objs:
+            return
+        # collect() gives every row the same keys, all of them Lead columns
+        fields = [
+            field for field in next(iter(leads.values())) if field != "enquiry_id"
+        ]
+        Lead.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["enquiry_id"],
+            update_fields=[*fields, *Lead.DERIVED_FIELDS],
+        )
+        created = sum(1 for lead in objs if lead.enquiry_id not in stored)
+        self.created += created
+        self.updated += len(objs) - created
+
+    def report_progress(self):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"  {self.row_count} rows • created {self.created} • updated {self.updated}"
+            f" • unchanged {self.unchanged} • {self.row_count / max(elapsed, 1e-9):.0f} rows/s"
+        )
@@ -0,0 +1,16 @@
+"""
+Rebuild the LeadDailyFact rollup from crm_lead.
+Usage: python manage.py rebuild_daily_facts
+"""
+
+from django.core.management.base import BaseCommand
+
+from crm.rollups import rebuild_daily_facts
+
+
+class Command(BaseCommand):
+    help = "Recompute the LeadDailyFact dashboard rollup from the lead table"
+
+    def handle(self, *args, **options):
+        fact_rows = rebuild_daily_facts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {fact_rows} daily fact rows"))
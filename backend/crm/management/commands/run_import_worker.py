@@ -0,0 +1,91 @@
+"""
+Process queued lead imports (ImportJob) and deletions (DeleteJob) outside
+the web workers.
+Usage: python manage.py run_import_worker [--once] [--poll-interval 2] [--batch-size 500]
+       [--delete-chunk-size 2000]
+
+The queues are the job tables, so no broker is needed; run one or more
+workers next to gunicorn (e.g. as a systemd service). Imports are taken
+before deletions. Each batch commits on its own, and a job whose worker
+died is picked up again after STALE_JOB_TIMEOUT and resumed where it stopped.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from crm.deletes import (
+    DELETE_CHUNK_SIZE,
+    claim_next_delete_job,
+    requeue_stale_delete_jobs,
+    run_delete_job,
+)
+from crm.import_utils import UPLOAD_BATCH_SIZE
+from crm.imports import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued lead import and delete jobs in batches with per-batch commits"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty"
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls of an empty queue",
+        )
+        parser.add_argument("--batch-size", type=int, default=UPLOAD_BATCH_SIZE)
+        parser.add_argument("--delete-chunk-size", type=int, default=DELETE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                # A long-lived process must drop connections the server has closed
+                close_old_connections()
+                requeued = requeue_stale_jobs() + requeue_stale_delete_jobs()
+                if requeued:
+                    self.stdout.write(
+                        self.style.WARNING(f"Requeued {requeued} stale job(s)")
+                    )
+                job = claim_next_job()
+                if job is not None:
+                    self.run(job, options["batch_size"])
+                    continue
+                job = claim_next_delete_job()
+                if job is not None:
+                    self.run_delete(job, options["delete_chunk_size"])
+                    continue
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            # The batch in flight was rolled back; the job resumes once requeued
+            self.stdout.write("Stopped")
+
+    def run(self, job, batch_size):
+        self.stdout.write(f"Import {job.pk}: {job.filename} ({job.total_rows} rows)")
+        job = run_job(job, batch_size)
+        summary = (
+            f"Import {job.pk} {job.status}: {job.processed_rows} rows, "
+            f"{job.created_count} created, {job.updated_count} updated, "
+            f"{job.unchanged_count} unchanged, "
+            f"{job.error_count} errors, {job.rows_per_second or 0} rows/s"
+        )
+        style = self.style.SUCCESS if job.status == job.SUCCEEDED else self.style.ERROR
+        self.stdout.write(style(summary))
+
+    def run_delete(self, job, chunk_size):
+        self.stdout.write(
+            f"Delete {job.pk}: {job.description} ({job.total_rows} leads)"
+        )
+        job = run_delete_job(job, chunk_size)
+        summary = (
+            f"Delete {job.pk} {job.status}: {job.deleted_count} leads deleted, "
+            f"{job.rows_per_second or 0} rows/s"
+        )
+        style = self.style.SUCCESS if job.status == job.SUCCEEDED else self.style.ERROR
+        self.stdout.write(style(summary))
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:49
+
+from django.db import migrations, models
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.db.models.functions import Lower, Trim
+from django.db.models.lookups import In
+
+
+def build_daily_facts(apps, schema_editor):
+    """Populate the rollup from existing leads"""
+    from crm.rollups import rebuild_daily_facts
+
+    # Lead.is_won does not exist yet at this point; derive it from lead_stage
+    won = Case(
+        When(
+            Q(In(Lower(Trim("lead_stage")), ("closed-won", "order booked"))),
+            then=Value(True),
+        ),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+    rebuild_daily_facts(
+        apps.get_model("crm", "Lead"), apps.get_model("crm", "LeadDailyFact"), won=won
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0007_rename_leads_uploaded_on_to_source"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="activitylog",
+            name="action",
+            field=models.CharField(
+                choices=[
+                    ("login", "User Login"),
+                    ("logout", "User Logout"),
+                    ("create_lead", "Created Lead"),
+                    ("update_lead", "Updated Lead"),
+                    ("delete_lead", "Deleted Lead"),
+                    ("bulk_delete_leads", "Bulk Deleted Leads"),
+                    ("bulk_create_leads", "Bulk Created Leads"),
+                    ("upload_file", "Uploaded File"),
+                    ("apply_filters", "Applied Filters"),
+                    ("export_data", "Exported Data"),
+                    ("view_page", "Viewed Page"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.CreateModel(
+            name="LeadDailyFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("enquiry_date", models.DateField(blank=True, null=True)),
+                ("state", models.CharField(blank=True, max_length=64)),
+                ("dealer", models.CharField(blank=True, max_length=128)),
+                ("segment", models.CharField(blank=True, max_length=64)),
+                ("kva_range", models.CharField(blank=True, max_length=32)),
+                ("owner", models.CharField(blank=True, max_length=64)),
+                ("source", models.CharField(blank=True, max_length=128)),
+                ("zone", models.CharField(blank=True, max_length=32)),
+                ("lead_status", models.CharField(blank=True, max_length=32)),
+                ("is_won", models.BooleanField(default=False)),
+                ("lead_count", models.IntegerField(default=0)),
+                (
+                    "order_value_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=18),
+                ),
+                ("close_days_sum", models.IntegerField(default=0)),
+                ("close_days_count", models.IntegerField(default=0)),
+                ("close_time_count", models.IntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["enquiry_date"], name="crm_leaddai_enquiry_303e9d_idx"
+                    ),
+                    models.Index(
+                        fields=["dealer", "enquiry_date"],
+                        name="crm_leaddai_dealer_9386b8_idx",
+                    ),
+                    models.Index(
+                        fields=["state", "enquiry_date"],
+                        name="crm_leaddai_state_363534_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(build_daily_facts, migrations.RunPython.noop),
+    ]
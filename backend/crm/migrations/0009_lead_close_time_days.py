@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def backfill_close_time_days(apps, schema_editor):
+    """Populate close_time_days for leads that have both dates"""
+    Lead = apps.get_model("crm", "Lead")
+    leads = Lead.objects.filter(
+        enquiry_date__isnull=False, close_date__isnull=False
+    ).only("id", "enquiry_date", "close_date")
+    batch = []
+    for lead in leads.iterator(chunk_size=BATCH_SIZE):
+        lead.close_time_days = max((lead.close_date - lead.enquiry_date).days, 0)
+        batch.append(lead)
+        if len(batch) >= BATCH_SIZE:
+            Lead.objects.bulk_update(batch, ["close_time_days"])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ["close_time_days"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0008_leaddailyfact"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="close_time_days",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_close_time_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+def backfill_stage_columns(apps, schema_editor):
+    """Derive stage_code/is_won with one UPDATE per distinct lead_stage value"""
+    from crm.models import LeadStage, stage_code_for
+
+    Lead = apps.get_model("crm", "Lead")
+    stages = Lead.objects.values_list("lead_stage", flat=True).distinct().order_by()
+    for stage in list(stages):
+        code = stage_code_for(stage)
+        if code == LeadStage.UNKNOWN:
+            continue  # matches the column defaults
+        Lead.objects.filter(lead_stage=stage).update(
+            stage_code=code, is_won=code == LeadStage.WON
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0009_lead_close_time_days"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="is_won",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="lead",
+            name="stage_code",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("won", "Won"),
+                    ("lost", "Lost"),
+                    ("open", "Open"),
+                    ("", "Unknown"),
+                ],
+                default="",
+                editable=False,
+                max_length=8,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["lead_status", "is_won"], name="crm_lead_lead_st_3d61a9_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["lead_status", "stage_code"], name="crm_lead_lead_st_db0133_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_stage_columns, migrations.RunPython.noop),
+    ]
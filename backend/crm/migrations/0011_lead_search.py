@@ -0,0 +1,88 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Columns searched by LeadViewSet/LeadSearchView (crm.search.SEARCH_FIELDS)
+SEARCH_FIELDS = ("enquiry_id", "dealer", "owner", "state", "city", "segment")
+BATCH_SIZE = 1000
+
+
+def create_search_index(apps, schema_editor):
+    """
+    PostgreSQL: pg_trgm GIN indexes matching icontains' UPPER(col::text).
+    Other backends: backfill LeadSearchToken.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS crm_lead_{field}_trgm "
+                f"ON crm_lead USING gin ((UPPER({field}::text)) gin_trgm_ops)"
+            )
+        return
+
+    from crm.search import lead_tokens
+
+    Lead = apps.get_model("crm", "Lead")
+    LeadSearchToken = apps.get_model("crm", "LeadSearchToken")
+    tokens = []
+    for row in Lead.objects.values("id", *SEARCH_FIELDS).iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        tokens.extend(
+            LeadSearchToken(lead_id=row["id"], token=token)
+            for token in lead_tokens(row)
+        )
+        if len(tokens) >= BATCH_SIZE:
+            LeadSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    if tokens:
+        LeadSearchToken.objects.bulk_create(tokens)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS crm_lead_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0010_lead_stage_code_is_won"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=128)),
+                (
+                    "lead",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="crm.lead",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["token", "lead"], name="crm_leadsea_token_8db73b_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
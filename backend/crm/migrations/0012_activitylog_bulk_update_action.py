@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0011_lead_search"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="activitylog",
+            name="action",
+            field=models.CharField(
+                choices=[
+                    ("login", "User Login"),
+                    ("logout", "User Logout"),
+                    ("create_lead", "Created Lead"),
+                    ("update_lead", "Updated Lead"),
+                    ("delete_lead", "Deleted Lead"),
+                    ("bulk_update_leads", "Bulk Updated Leads"),
+                    ("bulk_delete_leads", "Bulk Deleted Leads"),
+                    ("bulk_create_leads", "Bulk Created Leads"),
+                    ("upload_file", "Uploaded File"),
+                    ("apply_filters", "Applied Filters"),
+                    ("export_data", "Exported Data"),
+                    ("view_page", "Viewed Page"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_facets(apps, schema_editor):
+    """One GROUP BY per facet field"""
+    from crm.facets import FACET_FIELDS
+
+    Lead = apps.get_model("crm", "Lead")
+    LeadFacetValue = apps.get_model("crm", "LeadFacetValue")
+    rows = []
+    for field in FACET_FIELDS:
+        counts = (
+            Lead.objects.exclude(**{field: ""})
+            .order_by()
+            .values_list(field)
+            .annotate(n=Count("id"))
+        )
+        rows.extend(
+            LeadFacetValue(
+                field=field, value=value, normalized=value.lower(), lead_count=n
+            )
+            for value, n in counts
+        )
+    LeadFacetValue.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0012_activitylog_bulk_update_action"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadFacetValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("field", models.CharField(max_length=32)),
+                ("value", models.CharField(max_length=255)),
+                ("normalized", models.CharField(max_length=255)),
+                ("lead_count", models.IntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["field", "normalized"],
+                        name="crm_leadfac_field_d7f782_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("field", "value"), name="crm_facet_field_value_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
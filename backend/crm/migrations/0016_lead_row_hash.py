@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:31
+
+from django.db import migrations, models
+
+
+def backfill_row_hash(apps, schema_editor):
+    """Hash every lead's stored content, in keyset batches"""
+    from crm.models import Lead as CurrentLead
+    from crm.models import row_hash_for
+
+    Lead = apps.get_model("crm", "Lead")
+    last_id = 0
+    while True:
+        leads = list(
+            Lead.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", *CurrentLead.HASH_FIELDS)[:2000]
+        )
+        if not leads:
+            break
+        for lead in leads:
+            lead.row_hash = row_hash_for(
+                {name: getattr(lead, name) for name in CurrentLead.HASH_FIELDS}
+            )
+        Lead.objects.bulk_update(leads, ["row_hash"], batch_size=500)
+        last_id = leads[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0015_import_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="unchanged_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="lead",
+            name="row_hash",
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_row_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def backfill_upload_batches(apps, schema_editor):
+    """Register one batch per upload source already in the table, as the old history grouped them"""
+    Lead = apps.get_model("crm", "Lead")
+    UploadBatch = apps.get_model("crm", "UploadBatch")
+    sources = (
+        Lead.objects.exclude(source__in=["", "manual"])
+        .values("source")
+        .annotate(leads=Count("id"), first=Min("updated_at"), last=Max("updated_at"))
+    )
+    for row in sources:
+        upload_batch = UploadBatch.objects.create(
+            filename=row["source"][:255],
+            started_at=row["first"],
+            finished_at=row["last"],
+            total_rows=row["leads"],
+            created_count=row["leads"],
+        )
+        Lead.objects.filter(source=row["source"]).update(upload_batch=upload_batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0016_lead_row_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("filename", models.CharField(max_length=255)),
+                ("started_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("total_rows", models.IntegerField(default=0)),
+                ("created_count", models.IntegerField(default=0)),
+                ("updated_count", models.IntegerField(default=0)),
+                ("unchanged_count", models.IntegerField(default=0)),
+                ("error_count", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="upload_batches",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-started_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="upload_batch",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="import_jobs",
+                to="crm.uploadbatch",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lead",
+            name="upload_batch",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="leads",
+                to="crm.uploadbatch",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="uploadbatch",
+            index=models.Index(
+                fields=["-started_at"], name="crm_uploadb_started_f52906_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_upload_batches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:29
+
+from django.db import migrations, models
+
+
+def merge_duplicate_facts(apps, schema_editor):
+    """Merge rows that concurrent writers duplicated before the key was unique"""
+    from crm.rollups import rebuild_daily_facts
+
+    rebuild_daily_facts(
+        apps.get_model("crm", "Lead"), apps.get_model("crm", "LeadDailyFact")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("crm", "0019_lead_data_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_facts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="leaddailyfact",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("enquiry_date__isnull", False)),
+                fields=(
+                    "enquiry_date",
+                    "state",
+                    "dealer",
+                    "segment",
+                    "kva_range",
+                    "owner",
+                    "source",
+                    "zone",
+                    "lead_status",
+                    "is_won",
+                ),
+                name="crm_daily_fact_key_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="leaddailyfact",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("enquiry_date__isnull", True)),
+                fields=(
+                    "state",
+                    "dealer",
+                    "segment",
+                    "kva_range",
+                    "owner",
+                    "source",
+                    "zone",
+                    "lead_status",
+                    "is_won",
+                ),
+                name="crm_daily_fact_undated_key_uniq",
+            ),
+        ),
+    ]
@@ -1,13 +1,114 @@
+import hashlib
+import json
+import uuid
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
+# Raw lead_stage values (stripped, lower-cased) that count as won
+WON_STAGES = ("closed-won", "order booked")
+
+
+class LeadStage(models.TextChoices):
+    """Canonical stage derived from the free-text lead_stage."""
+
+    WON = "won", "Won"
+    LOST = "lost", "Lost"
+    OPEN = "open", "Open"
+    UNKNOWN = "", "Unknown"
+
+
+def stage_code_for(stage) -> str:
+    """Map a raw lead_stage to its LeadStage code."""
+    stage_val = (stage or "").strip().lower()
+    if not stage_val:
+        return LeadStage.UNKNOWN
+    if stage_val in WON_STAGES:
+        return LeadStage.WON
+    if "lost" in stage_val:
+        return LeadStage.LOST
+    return LeadStage.OPEN
+
+
+def close_time_days_for(enquiry_date, close_date) -> int | None:
+    """Days from enquiry to close, or None unless both dates are known."""
+    if enquiry_date and close_date:
+        return max((close_date - enquiry_date).days, 0)
+    return None
+
 
 class Lead(models.Model):
+    # Columns maintained by refresh_derived_fields()
+    DERIVED_FIELDS = ("close_time_days", "stage_code", "is_won", "row_hash")
+    # Uploaded content covered by row_hash. source and updated_at record the
+    # write itself, and the other derived columns follow from lead_stage.
+    HASH_FIELDS = (
+        "enquiry_date",
+        "close_date",
+        "lead_stage",
+        "lead_status",
+        "enquiry_type",
+        "dealer",
+        "corporate_name",
+        "address",
+        "area_office",
+        "branch",
+        "customer_type",
+        "dg_ownership",
+        "district",
+        "state",
+        "city",
+        "tehsil",
+        "zone",
+        "segment",
+        "sub_segment",
+        "source_from",
+        "events",
+        "finance_company",
+        "finance_required",
+        "owner",
+        "owner_code",
+        "owner_status",
+        "email",
+        "phone_number",
+        "pan_number",
+        "phase",
+        "pincode",
+        "location",
+        "kva",
+        "kva_range",
+        "quantity",
+        "order_value",
+        "win_flag",
+        "loss_reason",
+        "remarks",
+        "followup_count",
+        "last_followup_date",
+        "next_followup_date",
+        "referred_by",
+        "uploaded_by",
+        "created_by",
+        "fy",
+        "month",
+        "week",
+    )
+
     enquiry_id = models.CharField(max_length=32, unique=True)
     enquiry_date = models.DateField(null=True, blank=True)
     close_date = models.DateField(null=True, blank=True)
     lead_stage = models.CharField(max_length=64, blank=True)
+    stage_code = models.CharField(
+        max_length=8,
+        choices=LeadStage.choices,
+        blank=True,
+        default=LeadStage.UNKNOWN,
+        editable=False,
+    )
+    is_won = models.BooleanField(default=False, editable=False)
     lead_status = models.CharField(max_length=32, blank=True)
     enquiry_type = models.CharField(max_length=64, blank=True)
     dealer = models.CharField(max_length=128)
@@ -24,7 +125,12 @@ class Lead(models.Model):
     zone = models.CharField(max_length=32, blank=True)
     segment = models.CharField(max_length=64, blank=True)
     sub_segment = models.CharField(max_length=64, blank=True)
-    source = models.CharField(max_length=64, blank=True)
+    source = models.CharField(
+        max_length=128,
+        blank=True,
+        db_index=True,
+        help_text="Source of lead: 'manual' for manually created, or filename for Excel uploads",
+    )
     source_from = models.CharField(max_length=64, blank=True)
     events = models.CharField(max_length=128, blank=True)
     finance_company = models.CharField(max_length=128, blank=True)
@@ -38,13 +144,16 @@ class Lead(models.Model):
     phase = models.CharField(max_length=32, blank=True)
     pincode = models.CharField(max_length=16, blank=True)
     location = models.CharField(max_length=128, blank=True)
-    kva = models.DecimalField(
-        max_digits=10, decimal_places=2, null=True, blank=True)
+    kva = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     kva_range = models.CharField(max_length=32, blank=True)
     quantity = models.PositiveIntegerField(default=1)
-    order_value = models.DecimalField(
-        max_digits=14, decimal_places=2, default=0)
+    order_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     win_flag = models.BooleanField(default=False)
+    # Days from enquiry to close (clamped at zero), derived from the two dates
+    # on every save so aggregates can use it as a plain column.
+    close_time_days = models.PositiveIntegerField(
+        null=True, blank=True, db_index=True, editable=False
+    )
     loss_reason = models.CharField(max_length=255, blank=True)
     remarks = models.TextField(blank=True)
     followup_count = models.PositiveSmallIntegerField(default=0)
@@ -57,18 +166,32 @@ class Lead(models.Model):
     fy = models.CharField(max_length=8, blank=True)
     month = models.CharField(max_length=8, blank=True)
     week = models.CharField(max_length=8, blank=True)
+    # Digest of HASH_FIELDS, so re-uploads can skip leads whose content is unchanged
+    row_hash = models.CharField(max_length=32, blank=True, editable=False)
+    # The latest upload containing this lead, changed or not (null for manual leads)
+    upload_batch = models.ForeignKey(
+        "UploadBatch",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="leads",
+    )
 
     class Meta:
         ordering = ("-updated_at",)
         indexes = [
-            models.Index(fields=['-updated_at']),
-            models.Index(fields=['enquiry_date']),
-            models.Index(fields=['close_date']),
-            models.Index(fields=['lead_status']),
-            models.Index(fields=['dealer']),
-            models.Index(fields=['owner']),
-            models.Index(fields=['state']),
-            models.Index(fields=['enquiry_id']),  # Already unique, but explicit index
+            models.Index(fields=["-updated_at"]),
+            models.Index(fields=["enquiry_date"]),
+            models.Index(fields=["close_date"]),
+            models.Index(fields=["lead_status"]),
+            models.Index(fields=["dealer"]),
+            models.Index(fields=["owner"]),
+            models.Index(fields=["state"]),
+            models.Index(fields=["enquiry_id"]),  # Already unique, but explicit index
+            models.Index(fields=["source"], name="crm_lead_source_0cf4cf_idx"),
+            models.Index(fields=["lead_status", "is_won"]),
+            models.Index(fields=["lead_status", "stage_code"]),
         ]
 
     def __str__(self) -> str:
@@ -81,11 +204,25 @@ class Lead(models.Model):
         today = timezone.now().date()
         return max((today - self.enquiry_date).days, 0)
 
-    @property
-    def close_time_days(self) -> int | None:
-        if not (self.enquiry_date and self.close_date):
-            return None
-        return max((self.close_date - self.enquiry_date).days, 0)
+    def refresh_derived_fields(self) -> None:
+        """
+        Recompute the stored columns derived from other fields.
+        save() calls this; bulk_create/bulk_update callers must call it
+        themselves and include DERIVED_FIELDS in bulk_update's field list.
+        """
+        self.close_time_days = close_time_days_for(self.enquiry_date, self.close_date)
+        self.stage_code = stage_code_for(self.lead_stage)
+        self.is_won = self.stage_code == LeadStage.WON
+        self.row_hash = row_hash_for(
+            {name: getattr(self, name) for name in self.HASH_FIELDS}
+        )
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
 
     @property
     def is_high_value(self) -> bool:
@@ -93,40 +230,453 @@ class Lead(models.Model):
         return self.order_value >= threshold
 
 
+# Decimals are hashed at their stored scale, so 62.5 and 62.50 agree
+_HASH_DECIMAL_EXPONENTS = {
+    field.name: Decimal(1).scaleb(-field.decimal_places)
+    for field in Lead._meta.concrete_fields
+    if isinstance(field, models.DecimalField)
+}
+
+
+def row_hash_for(values) -> str:
+    """
+    Digest of the Lead.HASH_FIELDS in ``values``: a map_row() dict or a
+    lead's field values. Equal content gives an equal hash either way.
+    """
+    canonical = []
+    for name in Lead.HASH_FIELDS:
+        value = values.get(name)
+        if isinstance(value, Decimal) and name in _HASH_DECIMAL_EXPONENTS:
+            try:
+                # ROUND_HALF_UP, as PostgreSQL's numeric rounds on save
+                value = value.quantize(
+                    _HASH_DECIMAL_EXPONENTS[name], rounding=ROUND_HALF_UP
+                )
+            except InvalidOperation:
+                pass
+            value = str(value)
+        elif isinstance(value, date):
+            value = value.isoformat()
+        canonical.append(value)
+    encoded = json.dumps(canonical, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class LeadDailyFact(models.Model):
+    """
+    Daily rollup of leads per dashboard dimension combination.
+
+    Maintained incrementally by the lead write paths (see rollups.py) so KPIs
+    and charts can be answered without scanning crm_lead.
+    """
+
+    enquiry_date = models.DateField(null=True, blank=True)
+    state = models.CharField(max_length=64, blank=True)
+    dealer = models.CharField(max_length=128, blank=True)
+    segment = models.CharField(max_length=64, blank=True)
+    kva_range = models.CharField(max_length=32, blank=True)
+    owner = models.CharField(max_length=64, blank=True)
+    source = models.CharField(max_length=128, blank=True)
+    zone = models.CharField(max_length=32, blank=True)
+    lead_status = models.CharField(max_length=32, blank=True)
+    is_won = models.BooleanField(default=False)
+    lead_count = models.IntegerField(default=0)
+    order_value_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    # Sum of close_time_days (clamped at zero) and the number of leads that
+    # have both dates; close_time_count only counts positive close times.
+    close_days_sum = models.IntegerField(default=0)
+    close_days_count = models.IntegerField(default=0)
+    close_time_count = models.IntegerField(default=0)
+
+    class Meta:
+        # One row per rollup key (rollups.KEY_FIELDS). NULLs never conflict in
+        # a unique index, so undated rows get their own constraint.
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "enquiry_date",
+                    "state",
+                    "dealer",
+                    "segment",
+                    "kva_range",
+                    "owner",
+                    "source",
+                    "zone",
+                    "lead_status",
+                    "is_won",
+                ],
+                condition=models.Q(enquiry_date__isnull=False),
+                name="crm_daily_fact_key_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=[
+                    "state",
+                    "dealer",
+                    "segment",
+                    "kva_range",
+                    "owner",
+                    "source",
+                    "zone",
+                    "lead_status",
+                    "is_won",
+                ],
+                condition=models.Q(enquiry_date__isnull=True),
+                name="crm_daily_fact_undated_key_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["enquiry_date"]),
+            models.Index(fields=["dealer", "enquiry_date"]),
+            models.Index(fields=["state", "enquiry_date"]),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.enquiry_date} {self.dealer} {self.lead_status} ({self.lead_count})"
+        )
+
+
+class LeadFacetValue(models.Model):
+    """
+    Distinct value of a dropdown field and the number of leads holding it.
+
+    Maintained incrementally alongside the daily rollup (see facets.py), so
+    field options are one indexed read instead of a DISTINCT per field.
+    """
+
+    field = models.CharField(max_length=32)
+    value = models.CharField(max_length=255)
+    # Lower-cased value for prefix typeahead
+    normalized = models.CharField(max_length=255)
+    lead_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["field", "value"], name="crm_facet_field_value_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["field", "normalized"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.field}={self.value} ({self.lead_count})"
+
+
+class LeadDataVersion(models.Model):
+    """
+    Single-row counter of lead writes, part of every aggregate cache key.
+
+    Kept in the database rather than the cache so that all gunicorn workers
+    and the import worker see the same version even on a per-process
+    LocMemCache (see cached_views.py).
+    """
+
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"lead data v{self.version}"
+
+
+class LeadSearchToken(models.Model):
+    """
+    Normalised search tokens of a lead's searchable columns.
+
+    Only populated on backends without pg_trgm (see search.py); prefix
+    lookups on the (token, lead) index replace icontains table scans.
+    """
+
+    lead = models.ForeignKey(
+        Lead, on_delete=models.CASCADE, related_name="search_tokens"
+    )
+    token = models.CharField(max_length=128)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["token", "lead"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.lead_id}: {self.token}"
+
+
+class StagedUpload(models.Model):
+    """
+    A previewed upload waiting to be committed.
+
+    The preview stores every mapped row under ``token``; the commit applies
+    them without re-reading the file (see uploads.py). Expired uploads are
+    purged by the next preview.
+    """
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="staged_uploads",
+    )
+    filename = models.CharField(max_length=255)
+    row_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.row_count} rows, {self.token})"
+
+
+class StagedUploadRow(models.Model):
+    """One mapped row of a StagedUpload, as returned by map_row()."""
+
+    upload = models.ForeignKey(
+        StagedUpload, on_delete=models.CASCADE, related_name="rows"
+    )
+    row_number = models.IntegerField()
+    enquiry_id = models.CharField(max_length=255)
+    # Whether no lead had this enquiry_id at preview time
+    is_new = models.BooleanField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["upload", "row_number"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.upload_id} row {self.row_number}: {self.enquiry_id}"
+
+
+class UploadBatch(models.Model):
+    """
+    One applied upload: who sent which file, when, and what it wrote.
+
+    The upload paths create it before writing and record the counts with
+    finish(). Leads point at the latest batch containing them, so the upload
+    history and per-upload deletion work through the indexed upload_batch
+    key instead of scanning Lead.source.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_batches",
+    )
+    filename = models.CharField(max_length=255)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    total_rows = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    unchanged_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["-started_at"]
+        indexes = [
+            models.Index(fields=["-started_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Upload {self.pk} {self.filename}"
+
+    @property
+    def duration_seconds(self):
+        """Time spent writing the upload, or None while it runs."""
+        if self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at).total_seconds(), 3)
+
+    def finish(self, total_rows, created, updated, unchanged, errors):
+        """Record the upload's counts and mark it finished."""
+        self.total_rows = total_rows
+        self.created_count = created
+        self.updated_count = updated
+        self.unchanged_count = unchanged
+        self.error_count = errors
+        self.finished_at = timezone.now()
+        self.save()
+
+
+class BackgroundJob(models.Model):
+    """
+    Status and heartbeat of a job run by ``run_import_worker``.
+
+    Workers claim queued jobs with a conditional update and refresh
+    ``heartbeat_at`` with every committed batch; a running job whose
+    heartbeat stops is requeued and resumed (see jobs.py).
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["-created_at"]
+
+    def _per_second(self, rows):
+        """Rows per second since the job started, or None before it has."""
+        if self.started_at is None:
+            return None
+        elapsed = (
+            (self.finished_at or timezone.now()) - self.started_at
+        ).total_seconds()
+        return round(rows / elapsed, 1) if elapsed > 0 else None
+
+
+class ImportJob(BackgroundJob):
+    """
+    A staged upload queued for the background import worker.
+
+    ``run_import_worker`` applies the staged rows batch by batch, committing
+    each batch together with the job's counters, so progress is visible while
+    it runs and a restarted worker resumes after ``last_row_number``
+    (see imports.py).
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="import_jobs"
+    )
+    # Cleared once the job finishes and its staged rows are deleted
+    upload = models.ForeignKey(
+        StagedUpload,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+    )
+    # Created when the job first runs; the leads it writes point at it
+    upload_batch = models.ForeignKey(
+        UploadBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+    )
+    filename = models.CharField(max_length=255)
+    skip_enquiry_ids = models.JSONField(default=list, blank=True)
+    remarks = models.JSONField(default=dict, blank=True)
+
+    total_rows = models.IntegerField(default=0)
+    processed_rows = models.IntegerField(default=0)
+    last_row_number = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    unchanged_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    # The first MAX_ERRORS row errors; error_count has the total
+    errors = models.JSONField(default=list, blank=True)
+
+    MAX_ERRORS = 50
+
+    class Meta(BackgroundJob.Meta):
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Import {self.pk} {self.filename} ({self.status})"
+
+    @property
+    def rows_per_second(self):
+        """Throughput since the job started, or None before it has."""
+        return self._per_second(self.processed_rows)
+
+
+class DeleteJob(BackgroundJob):
+    """
+    Leads queued for deletion by the background worker: the leads of one
+    UploadBatch, or an explicit list of lead ids.
+
+    ``run_import_worker`` deletes them in primary-key order, one short
+    transaction per chunk, and adjusts the rollups and caches once at the
+    end; a restarted worker resumes after ``last_id`` (see deletes.py).
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="delete_jobs"
+    )
+    # Deleted with its last lead, once the job succeeds
+    upload_batch = models.ForeignKey(
+        UploadBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="delete_jobs",
+    )
+    lead_ids = models.JSONField(default=list, blank=True)
+    description = models.CharField(max_length=255)
+
+    total_rows = models.IntegerField(default=0)
+    deleted_count = models.IntegerField(default=0)
+    last_id = models.BigIntegerField(default=0)
+
+    class Meta(BackgroundJob.Meta):
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Delete {self.pk} {self.description} ({self.status})"
+
+    @property
+    def rows_per_second(self):
+        """Throughput since the job started, or None before it has."""
+        return self._per_second(self.deleted_count)
+
+
 class ActivityLog(models.Model):
     """Track user activities for admin monitoring"""
+
     ACTION_CHOICES = [
-        ('login', 'User Login'),
-        ('logout', 'User Logout'),
-        ('create_lead', 'Created Lead'),
-        ('update_lead', 'Updated Lead'),
-        ('delete_lead', 'Deleted Lead'),
-        ('bulk_delete_leads', 'Bulk Deleted Leads'),
-        ('bulk_create_leads', 'Bulk Created Leads'),
-        ('upload_file', 'Uploaded File'),
-        ('apply_filters', 'Applied Filters'),
-        ('export_data', 'Exported Data'),
-        ('view_page', 'Viewed Page'),
+        ("login", "User Login"),
+        ("logout", "User Logout"),
+        ("create_lead", "Created Lead"),
+        ("update_lead", "Updated Lead"),
+        ("delete_lead", "Deleted Lead"),
+        ("bulk_update_leads", "Bulk Updated Leads"),
+        ("bulk_delete_leads", "Bulk Deleted Leads"),
+        ("bulk_create_leads", "Bulk Created Leads"),
+        ("upload_file", "Uploaded File"),
+        ("apply_filters", "Applied Filters"),
+        ("export_data", "Exported Data"),
+        ("view_page", "Viewed Page"),
     ]
-    
+
     user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, 
-        on_delete=models.CASCADE,
-        related_name='activity_logs'
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="activity_logs"
     )
     action = models.CharField(max_length=50, choices=ACTION_CHOICES)
     description = models.TextField(blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     metadata = models.JSONField(default=dict, blank=True)  # Additional context
-    
+
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ["-timestamp"]
         indexes = [
-            models.Index(fields=['-timestamp']),
-            models.Index(fields=['user', '-timestamp']),
-            models.Index(fields=['action']),
+            models.Index(fields=["-timestamp"]),
+            models.Index(fields=["user", "-timestamp"]),
+            models.Index(fields=["action"]),
         ]
-    
+
     def __str__(self):
         return f"{self.user.username} - {self.get_action_display()} - {self.timestamp}"
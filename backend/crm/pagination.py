@@ -1,4 +1,16 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import F, Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -6,3 +18,159 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 1000
 
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination on (ordering field, id).
+
+    Pages are fetched with ``WHERE (field, id) < (last_field, last_id)``
+    instead of OFFSET and no COUNT(*) is issued, so deep pages cost the
+    same as the first one and the default ``-updated_at`` ordering is
+    served by the updated_at index. ``?ordering=`` accepts the view's
+    ordering_fields; nullable fields sort NULLs last.
+
+    ``?include_total=approx`` adds ``count`` (a planner estimate on
+    PostgreSQL, an exact count elsewhere) with ``count_is_approximate``.
+    values() querysets work as long as they select id and the ordering field.
+    """
+
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    default_ordering = "-updated_at"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, view)
+        self.model_field = queryset.model._meta.get_field(self.field)
+
+        self.count = None
+        if request.query_params.get("include_total") == "approx":
+            self.count, self.count_is_approximate = approximate_count(queryset)
+
+        if self.descending:
+            ordering = (F(self.field).desc(nulls_last=True), "-id")
+        else:
+            ordering = (F(self.field).asc(nulls_last=True), "id")
+        queryset = queryset.order_by(*ordering)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(*cursor))
+
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "previous": None}
+        if self.count is not None:
+            payload["count"] = self.count
+            payload["count_is_approximate"] = self.count_is_approximate
+        payload["results"] = data
+        return Response(payload)
+
+    def get_page_size(self, request):
+        try:
+            size = int(
+                request.query_params.get(self.page_size_query_param, self.page_size)
+            )
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, view):
+        allowed = set(getattr(view, "ordering_fields", None) or ()) | {"updated_at"}
+        ordering = (
+            request.query_params.get(self.ordering_query_param) or self.default_ordering
+        )
+        # Only the first term matters: id is always the tie-breaker
+        ordering = ordering.split(",")[0].strip()
+        field = ordering.lstrip("-")
+        if field not in allowed:
+            ordering, field = self.default_ordering, self.default_ordering.lstrip("-")
+        return field, ordering.startswith("-")
+
+    def after(self, value, pk):
+        """Rows strictly after (value, pk) in the current ordering."""
+        beyond, id_beyond = ("lt", "lt") if self.descending else ("gt", "gt")
+        if value is None:
+            # NULLs sort last, so only later NULL rows remain
+            return Q(**{f"{self.field}__isnull": True, f"id__{id_beyond}": pk})
+        condition = Q(**{f"{self.field}__{beyond}": value}) | Q(
+            **{self.field: value, f"id__{id_beyond}": pk}
+        )
+        if self.model_field.null:
+            condition |= Q(**{f"{self.field}__isnull": True})
+        return condition
+
+    def encode_cursor(self, row):
+        # Pages hold model instances or values() dicts
+        if isinstance(row, dict):
+            value, pk = row[self.field], row["id"]
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        position = {"v": value, "id": pk}
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = position["v"]
+            if value is not None:
+                value = self.model_field.to_python(value)
+            return value, int(position["id"])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound("Invalid cursor")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+
+def approximate_count(queryset):
+    """
+    Return (count, is_approximate) for a queryset.
+
+    On PostgreSQL the planner's row estimate is used (no table scan);
+    other backends fall back to an exact COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql, params = queryset.order_by().values("id").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), True
+    return queryset.count(), False
+
+
+def get_lead_paginator(request):
+    """
+    Keyset pagination when the client opts in (``?pagination=cursor`` or a
+    ``cursor`` parameter), page-number pagination otherwise.
+    """
+    params = request.query_params
+    if params.get("pagination") == "cursor" or params.get(
+        KeysetPagination.cursor_query_param
+    ):
+        return KeysetPagination()
+    return StandardResultsSetPagination()
@@ -0,0 +1,371 @@
+"""
+Daily rollup (LeadDailyFact) maintenance and rollup-backed analytics.
+
+Every lead write path records the leads it removes and adds in a FactDelta and
+applies it in the same transaction, so the rollup never needs a full rebuild.
+A FactDelta also carries a FacetDelta, keeping the field-options dictionary
+(facets.py) in step with the rollup.
+KPIs and charts are answered from the rollup whenever the active filters only
+touch rolled-up dimensions; anything else falls back to the base table.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .facets import FACET_FIELDS, FacetDelta
+from .models import Lead, LeadDailyFact, LeadStage, stage_code_for
+from .services_optimized import (
+    chart_payload_from_rows,
+    close_duration,
+    kpis_from_stats,
+    open_status_condition,
+)
+
+DIMENSION_FIELDS = (
+    "state",
+    "dealer",
+    "segment",
+    "kva_range",
+    "owner",
+    "source",
+    "zone",
+    "lead_status",
+)
+KEY_FIELDS = ("enquiry_date",) + DIMENSION_FIELDS + ("is_won",)
+MEASURE_FIELDS = (
+    "lead_count",
+    "order_value_sum",
+    "close_days_sum",
+    "close_days_count",
+    "close_time_count",
+)
+# Lead columns a fact row is derived from
+FACT_SOURCE_FIELDS = (
+    "enquiry_date",
+    "close_date",
+    "lead_stage",
+    "order_value",
+) + DIMENSION_FIELDS
+
+# LeadFilter parameters the rollup can answer; any other active filter forces
+# a base-table query.
+ROLLUP_FILTER_FIELDS = (
+    "lead_status",
+    "dealer",
+    "state",
+    "segment",
+    "kva_range",
+    "owner",
+    "source",
+    "zone",
+)
+ROLLUP_NEUTRAL_FIELDS = ("date_mode", "start_date", "end_date")
+
+BATCH_SIZE = 1000
+
+
+def is_won_stage(stage) -> bool:
+    return stage_code_for(stage) == LeadStage.WON
+
+
+def _value(lead, field):
+    if isinstance(lead, dict):
+        return lead.get(field)
+    return getattr(lead, field)
+
+
+def fact_snapshot(lead):
+    """Capture the rollup and facet inputs of a lead before it is modified in place."""
+    return {
+        field: getattr(lead, field)
+        for field in dict.fromkeys(FACT_SOURCE_FIELDS + FACET_FIELDS)
+    }
+
+
+def fact_entry(lead):
+    """Return (key, measures) for a single Lead instance or values() dict."""
+    key = (
+        (_value(lead, "enquiry_date"),)
+        + tuple(_value(lead, field) or "" for field in DIMENSION_FIELDS)
+        + (is_won_stage(_value(lead, "lead_stage")),)
+    )
+
+    enquiry_date = _value(lead, "enquiry_date")
+    close_date = _value(lead, "close_date")
+    close_days = None
+    if enquiry_date and close_date:
+        close_days = (close_date - enquiry_date).days
+    measures = {
+        "lead_count": 1,
+        "order_value_sum": _value(lead, "order_value") or 0,
+        "close_days_sum": max(close_days, 0) if close_days is not None else 0,
+        "close_days_count": 1 if close_days is not None else 0,
+        "close_time_count": 1 if close_days and close_days > 0 else 0,
+    }
+    return key, measures
+
+
+def aggregate_facts(queryset, won=None):
+    """
+    Group a Lead queryset into fact rows (one GROUP BY query).
+
+    ``won`` overrides the expression used for is_won (migrations that run
+    before Lead.is_won exists derive it from lead_stage).
+    """
+    return (
+        queryset.annotate(fact_is_won=F("is_won") if won is None else won)
+        .values("enquiry_date", *DIMENSION_FIELDS, "fact_is_won")
+        .annotate(
+            lead_count=Count("id"),
+            order_value_sum=Sum("order_value"),
+            close_days_sum=Sum(
+                close_duration(), filter=Q(close_date__gt=F("enquiry_date"))
+            ),
+            close_days_count=Count(
+                "id", filter=Q(enquiry_date__isnull=False, close_date__isnull=False)
+            ),
+            close_time_count=Count("id", filter=Q(close_date__gt=F("enquiry_date"))),
+        )
+        .order_by()
+    )
+
+
+def _fact_row_entry(row):
+    key = (
+        (row["enquiry_date"],)
+        + tuple(row[field] for field in DIMENSION_FIELDS)
+        + (row["fact_is_won"],)
+    )
+    close_days_sum = row["close_days_sum"]
+    measures = {
+        "lead_count": row["lead_count"],
+        "order_value_sum": row["order_value_sum"] or 0,
+        "close_days_sum": close_days_sum.days if close_days_sum is not None else 0,
+        "close_days_count": row["close_days_count"],
+        "close_time_count": row["close_time_count"],
+    }
+    return key, measures
+
+
+class FactDelta:
+    """Accumulates signed fact changes and applies them in one merge."""
+
+    def __init__(self):
+        self._buckets = defaultdict(lambda: dict.fromkeys(MEASURE_FIELDS, 0))
+        self.facets = FacetDelta()
+
+    def __bool__(self):
+        return any(any(measures.values()) for measures in self._buckets.values())
+
+    def _merge(self, key, measures, sign):
+        bucket = self._buckets[key]
+        for field, value in measures.items():
+            bucket[field] += sign * value
+
+    def add(self, lead):
+        self._merge(*fact_entry(lead), 1)
+        self.facets.add(lead)
+
+    def remove(self, lead):
+        self._merge(*fact_entry(lead), -1)
+        self.facets.remove(lead)
+
+    def remove_queryset(self, queryset):
+        """Subtract every lead in ``queryset`` (call before deleting it)."""
+        for row in aggregate_facts(queryset):
+            self._merge(*_fact_row_entry(row), -1)
+        self.facets.remove_queryset(queryset)
+
+    def apply(self):
+        """Merge the accumulated deltas into LeadDailyFact and LeadFacetValue."""
+        self.facets.apply()
+        buckets = {
+            key: measures
+            for key, measures in self._buckets.items()
+            if any(measures.values())
+        }
+        self._buckets.clear()
+        if not buckets:
+            return
+
+        dates = {key[0] for key in buckets}
+        date_filter = Q(enquiry_date__in=[d for d in dates if d is not None])
+        if None in dates:
+            date_filter |= Q(enquiry_date__isnull=True)
+
+        with transaction.atomic():
+            facts = LeadDailyFact.objects.filter(date_filter)
+            existing = {
+                tuple(fact[field] for field in KEY_FIELDS)
+                for fact in facts.values(*KEY_FIELDS)
+            }
+            to_create = [
+                LeadDailyFact(**dict(zip(KEY_FIELDS, key)))
+                for key, delta in buckets.items()
+                if delta["lead_count"] > 0 and key not in existing
+            ]
+            if to_create:
+                # A concurrent writer may be adding the same new key: insert empty
+                # rows, skipping conflicts, so both end up adding to one locked row
+                LeadDailyFact.objects.bulk_create(
+                    to_create, batch_size=BATCH_SIZE, ignore_conflicts=True
+                )
+
+            to_update, to_delete = [], []
+            for fact in facts.select_for_update():
+                delta = buckets.get(tuple(getattr(fact, field) for field in KEY_FIELDS))
+                if delta is None:
+                    continue
+                for field, value in delta.items():
+                    setattr(fact, field, getattr(fact, field) + value)
+                if fact.lead_count <= 0:
+                    to_delete.append(fact.pk)
+                else:
+                    to_update.append(fact)
+
+            if to_update:
+                LeadDailyFact.objects.bulk_update(
+                    to_update, MEASURE_FIELDS, batch_size=BATCH_SIZE
+                )
+            if to_delete:
+                LeadDailyFact.objects.filter(pk__in=to_delete).delete()
+
+
+def rebuild_daily_facts(lead_model=Lead, fact_model=LeadDailyFact, won=None):
+    """Recompute the whole rollup from crm_lead. Returns the number of fact rows."""
+    facts = []
+    for row in aggregate_facts(lead_model.objects.all(), won=won):
+        key, measures = _fact_row_entry(row)
+        facts.append(fact_model(**dict(zip(KEY_FIELDS, key)), **measures))
+    with transaction.atomic():
+        fact_model.objects.all().delete()
+        fact_model.objects.bulk_create(facts, batch_size=BATCH_SIZE)
+    return len(facts)
+
+
+def check_daily_facts():
+    """
+    Compare the stored rollup with a fresh aggregate of crm_lead.
+
+    Returns a list of {"key", "expected", "actual"} mismatches (empty when consistent).
+    """
+    expected = defaultdict(lambda: dict.fromkeys(MEASURE_FIELDS, 0))
+    for row in aggregate_facts(Lead.objects.all()):
+        key, measures = _fact_row_entry(row)
+        for field, value in measures.items():
+            expected[key][field] += value
+
+    actual = defaultdict(lambda: dict.fromkeys(MEASURE_FIELDS, 0))
+    for fact in LeadDailyFact.objects.all().values(*KEY_FIELDS, *MEASURE_FIELDS):
+        key = tuple(fact[field] for field in KEY_FIELDS)
+        for field in MEASURE_FIELDS:
+            actual[key][field] += fact[field]
+
+    mismatches = []
+    for key in set(expected) | set(actual):
+        expected_measures = expected.get(key, dict.fromkeys(MEASURE_FIELDS, 0))
+        actual_measures = actual.get(key, dict.fromkeys(MEASURE_FIELDS, 0))
+        if expected_measures != actual_measures:
+            mismatches.append(
+                {
+                    "key": dict(zip(KEY_FIELDS, key)),
+                    "expected": expected_measures,
+                    "actual": actual_measures,
+                }
+            )
+    return mismatches
+
+
+def facts_for_filterset(filterset):
+    """
+    Return the LeadDailyFact queryset equivalent to a validated LeadFilter,
+    or None when an active filter is not covered by the rollup.
+    """
+    if not getattr(settings, "CRM_USE_DAILY_ROLLUP", True):
+        return None
+
+    data = filterset.form.cleaned_data
+    for name, value in data.items():
+        if value in (None, "", False):
+            continue
+        if name not in ROLLUP_FILTER_FIELDS and name not in ROLLUP_NEUTRAL_FIELDS:
+            return None
+
+    start_date, end_date = data.get("start_date"), data.get("end_date")
+    if (start_date or end_date) and data.get("date_mode") == "close":
+        return None
+
+    facts = LeadDailyFact.objects.filter(
+        **{field: data[field] for field in ROLLUP_FILTER_FIELDS if data.get(field)}
+    )
+    if start_date:
+        facts = facts.filter(enquiry_date__gte=start_date)
+    if end_date:
+        facts = facts.filter(enquiry_date__lte=end_date)
+    return facts
+
+
+def compute_kpis_from_facts(facts):
+    """services_optimized.compute_kpis answered from the rollup."""
+    today = timezone.now().date()
+    won = Q(is_won=True)
+    stats = facts.aggregate(
+        total_leads=Sum("lead_count"),
+        open_leads=Sum("lead_count", filter=Q(lead_status="Open")),
+        won_leads=Sum("lead_count", filter=won),
+        pipeline_value=Sum("order_value_sum", filter=Q(lead_status="Open")),
+        won_value=Sum("order_value_sum", filter=won),
+        close_days_total=Sum("close_days_sum", filter=Q(lead_status="Closed")),
+        close_days_count=Sum("close_time_count", filter=Q(lead_status="Closed")),
+    )
+    stats["close_days_total"] = stats["close_days_total"] or 0
+    stats["close_days_count"] = stats["close_days_count"] or 0
+
+    # Lead age depends on today's date, so it is folded per enquiry date
+    age_rows = (
+        facts.filter(lead_status__iexact="open", enquiry_date__lt=today)
+        .values("enquiry_date")
+        .annotate(leads=Sum("lead_count"))
+        .order_by()
+    )
+    stats["age_days_total"] = 0
+    stats["age_days_count"] = 0
+    for row in age_rows:
+        stats["age_days_total"] += (today - row["enquiry_date"]).days * row["leads"]
+        stats["age_days_count"] += row["leads"]
+    return kpis_from_stats(stats)
+
+
+def build_chart_payload_from_facts(facts):
+    """services_optimized.build_chart_payload answered from the rollup."""
+    won = Q(is_won=True)
+    is_open = open_status_condition()
+    rows = (
+        facts.annotate(month_start=TruncMonth("enquiry_date"))
+        .values("month_start", "segment")
+        .annotate(
+            leads=Sum("lead_count"),
+            won=Sum("lead_count", filter=won),
+            open=Sum("lead_count", filter=is_open),
+            closed_won=Sum("lead_count", filter=won & ~is_open),
+            close_days_total=Sum("close_days_sum"),
+            close_days_count=Sum("close_days_count"),
+        )
+        .order_by()
+    )
+    measures = (
+        "leads",
+        "won",
+        "open",
+        "closed_won",
+        "close_days_total",
+        "close_days_count",
+    )
+    return chart_payload_from_rows(
+        {**row, **{field: row[field] or 0 for field in measures}} for row in rows
+    )
@@ -0,0 +1,187 @@
+"""
+Indexed lead search for autocomplete and ``?search=``.
+
+On PostgreSQL the searchable columns carry pg_trgm GIN indexes on
+``UPPER(column::text)`` (migration 0011), the expression Django compiles
+icontains to, so plain icontains filters become index scans.
+
+Other backends (SQLite in development) use LeadSearchToken: each lead's
+values are lower-cased and stored whole and split into words, and a search
+term is a prefix range lookup on the token index. A term therefore matches
+leads with a value or word starting with it; enquiry_id also stores its
+suffixes so substring matches keep working there.
+
+Write paths call sync_search_tokens() for the leads they create or update;
+deletes cascade to the tokens.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from rest_framework.filters import SearchFilter
+
+from .models import Lead, LeadSearchToken
+
+SEARCH_FIELDS = ("enquiry_id", "dealer", "owner", "state", "city", "segment")
+# Ranking weight per field: an enquiry_id hit beats a dealer hit, and so on
+FIELD_WEIGHTS = {
+    "enquiry_id": 6,
+    "dealer": 5,
+    "owner": 4,
+    "city": 3,
+    "state": 2,
+    "segment": 1,
+}
+# Fields whose suffixes are indexed so any substring is a token prefix
+SUFFIX_FIELDS = ("enquiry_id",)
+MIN_SUFFIX_LENGTH = 2
+TOKEN_MAX_LENGTH = LeadSearchToken._meta.get_field("token").max_length
+BATCH_SIZE = 1000
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_TERM_SPLIT_RE = re.compile(r"[\s,]+")
+# Upper bound for prefix ranges; sorts after every UTF-8 string
+_PREFIX_END = "\U0010ffff"
+
+
+def uses_trigram_index(using="default") -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def search_terms(query):
+    """Split a search string into lower-cased terms."""
+    return [
+        term for term in _TERM_SPLIT_RE.split((query or "").strip().lower()) if term
+    ]
+
+
+def _value(lead, field):
+    if isinstance(lead, dict):
+        return lead.get(field)
+    return getattr(lead, field)
+
+
+def lead_tokens(lead):
+    """Return the search tokens for a Lead instance or values() dict."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        value = (_value(lead, field) or "").strip().lower()
+        if not value:
+            continue
+        tokens.add(value)
+        tokens.update(_WORD_RE.findall(value))
+        if field in SUFFIX_FIELDS:
+            tokens.update(
+                value[start:] for start in range(1, len(value) - MIN_SUFFIX_LENGTH + 1)
+            )
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens}
+
+
+def _token_rows(leads):
+    for lead in leads:
+        lead_id = _value(lead, "id")
+        for token in lead_tokens(lead):
+            yield LeadSearchToken(lead_id=lead_id, token=token)
+
+
+def sync_search_tokens(leads, using="default") -> int:
+    """
+    Replace the tokens of saved Lead instances; returns the number written.
+
+    A no-op on PostgreSQL, where the trigram indexes are maintained by the
+    database itself.
+    """
+    if uses_trigram_index(using):
+        return 0
+    leads = [lead for lead in leads if lead.pk is not None]
+    written = 0
+    for start in range(0, len(leads), BATCH_SIZE):
+        batch = leads[start : start + BATCH_SIZE]
+        LeadSearchToken.objects.using(using).filter(
+            lead_id__in=[lead.pk for lead in batch]
+        ).delete()
+        written += len(
+            LeadSearchToken.objects.using(using).bulk_create(
+                _token_rows(batch), batch_size=BATCH_SIZE
+            )
+        )
+    return written
+
+
+def rebuild_search_index(using="default") -> int:
+    """Rebuild LeadSearchToken from scratch; returns the number of tokens."""
+    if uses_trigram_index(using):
+        return 0
+    LeadSearchToken.objects.using(using).all().delete()
+    rows = Lead.objects.using(using).values("id", *SEARCH_FIELDS).order_by()
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            written += len(
+                LeadSearchToken.objects.using(using).bulk_create(_token_rows(batch))
+            )
+            batch = []
+    if batch:
+        written += len(
+            LeadSearchToken.objects.using(using).bulk_create(_token_rows(batch))
+        )
+    return written
+
+
+def filter_search(queryset, terms):
+    """Keep leads where every term matches at least one search field."""
+    if uses_trigram_index(queryset.db):
+        for term in terms:
+            condition = Q()
+            for field in SEARCH_FIELDS:
+                condition |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(condition)
+        return queryset
+    for term in terms:
+        prefix = term[:TOKEN_MAX_LENGTH]
+        matches = LeadSearchToken.objects.filter(
+            token__gte=prefix, token__lt=prefix + _PREFIX_END
+        )
+        queryset = queryset.filter(pk__in=matches.values("lead_id"))
+    return queryset
+
+
+def rank_search(queryset, query):
+    """
+    Annotate ``search_rank``: exact matches beat prefix matches, which beat
+    any other hit, and within each tier the field weight decides.
+    """
+    phrase = " ".join(search_terms(query))
+    fields = sorted(FIELD_WEIGHTS, key=FIELD_WEIGHTS.get, reverse=True)
+    whens = []
+    for lookup, tier in (("iexact", 100), ("istartswith", 10)):
+        whens.extend(
+            When(
+                **{f"{field}__{lookup}": phrase},
+                then=Value(tier * FIELD_WEIGHTS[field]),
+            )
+            for field in fields
+        )
+    return queryset.annotate(
+        search_rank=Case(*whens, default=Value(0), output_field=IntegerField())
+    )
+
+
+def search_leads(queryset, query):
+    """Matching leads, best match first."""
+    queryset = filter_search(queryset, search_terms(query))
+    return rank_search(queryset, query).order_by("-search_rank", "-updated_at", "-id")
+
+
+class LeadSearchFilter(SearchFilter):
+    """``?search=`` over SEARCH_FIELDS, served by the search index."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = [term.lower() for term in self.get_search_terms(request)]
+        if not terms:
+            return queryset
+        return filter_search(queryset, terms)
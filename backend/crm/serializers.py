@@ -1,12 +1,14 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
+
 from rest_framework import serializers
 
-from .models import Lead, ActivityLog
+from .models import ActivityLog, DeleteJob, ImportJob, Lead, UploadBatch
 
 
 class LeadSerializer(serializers.ModelSerializer):
     lead_age_days = serializers.SerializerMethodField()
-    close_time_days = serializers.SerializerMethodField()
     is_high_value = serializers.SerializerMethodField()
 
     class Meta:
@@ -52,6 +54,8 @@ class LeadSerializer(serializers.ModelSerializer):
             "finance_required",
             "order_value",
             "win_flag",
+            "stage_code",
+            "is_won",
             "loss_reason",
             "followup_count",
             "last_followup_date",
@@ -72,35 +76,135 @@ class LeadSerializer(serializers.ModelSerializer):
     def get_lead_age_days(self, obj: Lead):
         return obj.lead_age_days
 
-    def get_close_time_days(self, obj: Lead):
-        return obj.close_time_days
-
     def get_is_high_value(self, obj: Lead):
         return obj.is_high_value
 
 
+class FastLeadListSerializer:
+    """
+    Read-only LeadSerializer twin for list pages built from ``values()`` rows.
+
+    Skips model instantiation and DRF's per-field machinery: plain columns are
+    passed through, dates use isoformat(), and only decimals/datetimes go
+    through the matching DRF field. Output is identical to LeadSerializer for
+    the selected ``fields`` (all fields when None).
+    """
+
+    # Computed fields and the columns they are derived from
+    COMPUTED_FIELDS = {
+        "lead_age_days": ("lead_status", "enquiry_date"),
+        "is_high_value": ("order_value",),
+    }
+
+    def __init__(self, fields=None):
+        available = LeadSerializer.Meta.fields
+        if fields is None:
+            fields = available
+        else:
+            unknown = sorted(set(fields) - set(available))
+            if unknown:
+                raise serializers.ValidationError(
+                    {"fields": f"Unknown fields: {', '.join(unknown)}"}
+                )
+            # Keep the serializer's field order; id is always included
+            fields = [name for name in available if name == "id" or name in fields]
+        self.fields = fields
+
+        drf_fields = LeadSerializer().fields
+        self.converters = {}
+        for name in fields:
+            if name in self.COMPUTED_FIELDS:
+                continue
+            field = drf_fields[name]
+            if isinstance(field, (serializers.DateTimeField, serializers.DecimalField)):
+                self.converters[name] = field.to_representation
+            elif isinstance(field, serializers.DateField):
+                self.converters[name] = lambda value: value.isoformat()
+            else:
+                self.converters[name] = None
+
+    @property
+    def db_fields(self):
+        """Columns to pass to values()."""
+        columns = [name for name in self.fields if name not in self.COMPUTED_FIELDS]
+        for name in self.fields:
+            columns.extend(self.COMPUTED_FIELDS.get(name, ()))
+        return list(dict.fromkeys(columns))
+
+    def to_representation(self, row):
+        data = {}
+        for name in self.fields:
+            converter = self.converters.get(name)
+            if name == "lead_age_days":
+                data[name] = self.lead_age_days(row)
+            elif name == "is_high_value":
+                data[name] = row["order_value"] >= self.high_value_threshold
+            else:
+                value = row[name]
+                data[name] = (
+                    converter(value)
+                    if converter is not None and value is not None
+                    else value
+                )
+        return data
+
+    def render(self, rows):
+        self.today = timezone.now().date()
+        self.high_value_threshold = getattr(
+            settings, "CRM_HIGH_VALUE_THRESHOLD", 1_000_000
+        )
+        return [self.to_representation(row) for row in rows]
+
+    def lead_age_days(self, row):
+        """Lead.lead_age_days for a values() row."""
+        if (row["lead_status"] or "").lower() != "open" or not row["enquiry_date"]:
+            return None
+        return max((self.today - row["enquiry_date"]).days, 0)
+
+
+def parse_sparse_fields(request):
+    """Return the ``?fields=`` list (None when absent)."""
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    return [name.strip() for name in raw.split(",") if name.strip()]
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user management in admin panel"""
+
     password = serializers.CharField(write_only=True, required=False)
-    
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 
-                  'is_active', 'is_staff', 'date_joined', 'last_login', 'password']
-        read_only_fields = ['date_joined', 'last_login']
-    
+        fields = [
+            "id",
+            "username",
+            "email",
+            "first_name",
+            "last_name",
+            "is_active",
+            "is_staff",
+            "date_joined",
+            "last_login",
+            "password",
+        ]
+        read_only_fields = ["date_joined", "last_login"]
+
     def create(self, validated_data):
-        password = validated_data.pop('password', None)
+        password = validated_data.pop("password", None)
         if not password:
-            raise serializers.ValidationError({"password": "Password is required for new users"})
-            
+            raise serializers.ValidationError(
+                {"password": "Password is required for new users"}
+            )
+
         user = User(**validated_data)
         user.set_password(password)
         user.save()
         return user
-    
+
     def update(self, instance, validated_data):
-        password = validated_data.pop('password', None)
+        password = validated_data.pop("password", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         if password:
@@ -111,12 +215,128 @@ class UserSerializer(serializers.ModelSerializer):
 
 class ActivityLogSerializer(serializers.ModelSerializer):
     """Serializer for activity logs"""
-    username = serializers.CharField(source='user.username', read_only=True)
-    user_email = serializers.EmailField(source='user.email', read_only=True)
-    action_display = serializers.CharField(source='get_action_display', read_only=True)
-    
+
+    username = serializers.CharField(source="user.username", read_only=True)
+    user_email = serializers.EmailField(source="user.email", read_only=True)
+    action_display = serializers.CharField(source="get_action_display", read_only=True)
+
     class Meta:
         model = ActivityLog
-        fields = ['id', 'user', 'username', 'user_email', 'action', 
-                  'action_display', 'description', 'ip_address', 'timestamp', 'metadata']
-        read_only_fields = ['timestamp']
+        fields = [
+            "id",
+            "user",
+            "username",
+            "user_email",
+            "action",
+            "action_display",
+            "description",
+            "ip_address",
+            "timestamp",
+            "metadata",
+        ]
+        read_only_fields = ["timestamp"]
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Progress of a background import job"""
+
+    progress = serializers.SerializerMethodField()
+    rows_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "filename",
+            "status",
+            "total_rows",
+            "processed_rows",
+            "progress",
+            "created_count",
+            "updated_count",
+            "unchanged_count",
+            "error_count",
+            "errors",
+            "message",
+            "rows_per_second",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Percentage of rows applied"""
+        if obj.status == ImportJob.SUCCEEDED:
+            return 100.0
+        if not obj.total_rows:
+            return 0.0
+        return round(min(obj.processed_rows / obj.total_rows, 1) * 100, 1)
+
+
+class DeleteJobSerializer(serializers.ModelSerializer):
+    """Progress of a background lead deletion"""
+
+    progress = serializers.SerializerMethodField()
+    rows_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = DeleteJob
+        fields = [
+            "id",
+            "description",
+            "status",
+            "total_rows",
+            "deleted_count",
+            "progress",
+            "message",
+            "rows_per_second",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Percentage of leads deleted"""
+        if obj.status == DeleteJob.SUCCEEDED:
+            return 100.0
+        if not obj.total_rows:
+            return 0.0
+        return round(min(obj.deleted_count / obj.total_rows, 1) * 100, 1)
+
+
+class UploadBatchSerializer(serializers.ModelSerializer):
+    """An upload history entry; lead_count is annotated by the history view"""
+
+    upload_key = serializers.CharField(source="pk", read_only=True)
+    uploaded_by = serializers.CharField(
+        source="user.username", read_only=True, default=None
+    )
+    timestamp = serializers.SerializerMethodField()
+    lead_count = serializers.IntegerField(read_only=True)
+    duration_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UploadBatch
+        fields = [
+            "id",
+            "upload_key",
+            "filename",
+            "uploaded_by",
+            "timestamp",
+            "started_at",
+            "finished_at",
+            "duration_seconds",
+            "total_rows",
+            "created_count",
+            "updated_count",
+            "unchanged_count",
+            "error_count",
+            "lead_count",
+        ]
+        read_only_fields = fields
+
+    def get_timestamp(self, obj):
+        """When the upload finished (or started, while it runs)"""
+        return (obj.finished_at or obj.started_at).isoformat()
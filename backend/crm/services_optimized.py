@@ -1,13 +1,81 @@
 """
 Optimized business logic for CRM analytics and reporting.
 Uses Django aggregation for performance instead of loading all records into memory.
+
+compute_kpis and build_chart_payload return exactly the same payloads as their
+counterparts in services.py; test_services_parity.py keeps the two
+implementations in lock-step. build_insights returns the Insights tab payload
+consumed directly by the frontend. Every count, sum and average is computed by
+the database with conditional aggregation; Python only divides and formats the
+handful of aggregate rows that come back.
 """
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
 from django.db.models import (
-    Count, Sum, Avg, Q, F, Value, FloatField,
+    BooleanField,
+    Case,
+    CharField,
+    Count,
+    DateField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Sum,
+    Value,
+    When,
 )
-from django.db.models.functions import TruncMonth, Coalesce, Cast
+from django.db.models.functions import Lower, Trim, TruncMonth
+from django.db.models.lookups import Exact
 from django.utils import timezone
 
+from .models import LeadStage
+
+
+def won_stage_condition():
+    """
+    lead_stage equals 'Closed-Won' or 'Order Booked' (trimmed, case-insensitive),
+    read from the stored is_won column.
+    """
+    return Q(is_won=True)
+
+
+def open_status_condition():
+    """lead_status equals 'open' after trimming and lower-casing (chart semantics)."""
+    return Q(Exact(Lower(Trim("lead_status")), "open"))
+
+
+def close_duration():
+    """close_date - enquiry_date as a duration, for summing close times in SQL."""
+    return ExpressionWrapper(
+        F("close_date") - F("enquiry_date"), output_field=DurationField()
+    )
+
+
+def age_duration(today):
+    """today - enquiry_date as a duration, for summing lead ages in SQL."""
+    return ExpressionWrapper(
+        Value(today, output_field=DateField()) - F("enquiry_date"),
+        output_field=DurationField(),
+    )
+
+
+def _days(value) -> int:
+    """Convert a summed duration (None when nothing matched) to whole days."""
+    if value is None:
+        return 0
+    if isinstance(value, timedelta):
+        return value.days
+    return int(value)
+
+
+def _average(total, count):
+    return round(total / count) if count else None
+
 
 def compute_kpis(queryset):
     """
@@ -17,7 +85,7 @@ def compute_kpis(queryset):
     - Total leads: count of all leads
     - Open leads: count where lead_status='Open'
     - Closed leads: total - open
-   - Won leads: count where lead_stage equals 'Closed-Won' OR 'Order Booked'
+    - Won leads: count where lead_stage equals 'Closed-Won' OR 'Order Booked'
     - Lost leads: closed - won
     - Conversion rate: (won / total) * 100
     - Avg lead age: average of lead_age_days for ALL leads (not just open)
@@ -25,32 +93,36 @@ def compute_kpis(queryset):
 
     PERFORMANCE OPTIMIZATION:
     - Before: O(n) memory - loads all records
-    - After: O(1) memory - database aggregation
+    - After: O(1) memory - one aggregation query
     """
-    # Single aggregation query for all KPIs
+    today = timezone.now().date()
+    won = won_stage_condition()
+    # close_time_days / lead_age_days are only counted when non-zero, matching
+    # the truthiness checks in services.compute_kpis
+    closed_with_close_time = Q(lead_status="Closed", close_time_days__gt=0)
+    open_with_age = Q(lead_status__iexact="open", enquiry_date__lt=today)
+
     stats = queryset.aggregate(
-        total_leads=Count('id'),
-        open_leads=Count('id', filter=Q(lead_status='Open')),
-        # Won leads: lead_stage equals 'Closed-Won' OR 'Order Booked' (case-insensitive)
-        won_leads=Count('id', filter=(
-            Q(lead_stage__iexact='Closed-Won') |
-            Q(lead_stage__iexact='Order Booked')
-        )),
-        pipeline_value=Sum('order_value', filter=Q(
-            lead_status='Open'), default=0),
-        won_value=Sum('order_value', filter=(
-            Q(lead_stage__iexact='Closed-Won') |
-            Q(lead_stage__iexact='Order Booked')
-        ), default=0),
-        # Average close time for CLOSED leads only
-        avg_close_days=Avg('close_time_days', filter=Q(lead_status='Closed')),
-        # Average lead age for ALL leads (not just open)
-        avg_lead_age_days=Avg('lead_age_days'),
+        total_leads=Count("id"),
+        open_leads=Count("id", filter=Q(lead_status="Open")),
+        won_leads=Count("id", filter=won),
+        pipeline_value=Sum("order_value", filter=Q(lead_status="Open")),
+        won_value=Sum("order_value", filter=won),
+        close_days_total=Sum("close_time_days", filter=closed_with_close_time),
+        close_days_count=Count("id", filter=closed_with_close_time),
+        age_days_total=Sum(age_duration(today), filter=open_with_age),
+        age_days_count=Count("id", filter=open_with_age),
     )
+    stats["close_days_total"] = _days(stats["close_days_total"])
+    stats["age_days_total"] = _days(stats["age_days_total"])
+    return kpis_from_stats(stats)
 
-    total = stats['total_leads'] or 0
-    open_leads = stats['open_leads'] or 0
-    won_leads = stats['won_leads'] or 0
+
+def kpis_from_stats(stats):
+    """Shape the raw KPI aggregates into the /kpis/ payload."""
+    total = stats["total_leads"] or 0
+    open_leads = stats["open_leads"] or 0
+    won_leads = stats["won_leads"] or 0
 
     # Closed leads = Total - Open
     closed_leads = total - open_leads
@@ -58,29 +130,26 @@ def compute_kpis(queryset):
     # Lost leads = Closed - Won
     lost_leads = closed_leads - won_leads
 
-    # Conversion rate = (won / total) * 100
-    conversion_rate = (
-        (won_leads / total * 100) if total > 0 else 0
-    )
-
     return {
-        'total_leads': total,
-        'open_leads': open_leads,
-        'closed_leads': closed_leads,
-        'won_leads': won_leads,
-        'lost_leads': lost_leads,  # New metric
-        'conversion_rate': round(conversion_rate, 1),
-        'pipeline_value': float(stats['pipeline_value'] or 0),
-        'won_value': float(stats['won_value'] or 0),
-        'avg_close_days': round(stats['avg_close_days']) if stats['avg_close_days'] else None,
-        'avg_lead_age_days': round(stats['avg_lead_age_days']) if stats['avg_lead_age_days'] else None,
+        "total_leads": total,
+        "open_leads": open_leads,
+        "closed_leads": closed_leads,
+        "won_leads": won_leads,
+        "lost_leads": lost_leads,  # New metric
+        "conversion_rate": round((won_leads / total) * 100, 1) if total else 0,
+        "pipeline_value": float(stats["pipeline_value"] or 0),
+        "won_value": float(stats["won_value"] or 0),
+        "avg_close_days": _average(
+            stats["close_days_total"], stats["close_days_count"]
+        ),
+        "avg_lead_age_days": _average(stats["age_days_total"], stats["age_days_count"]),
     }
 
 
 def build_chart_payload(queryset):
     """
     Build chart data matching frontend's expected structure.
-    
+
     Returns structure compatible with ChartsView component:
     - monthlyLeads: Monthly lead volume with conversion rates
     - conversionTrend: Conversion rate trend over time
@@ -89,278 +158,391 @@ def build_chart_payload(queryset):
     - segmentStatus: Open vs Closed counts per segment
     - segmentCloseDays: Average close days per segment
     - avgCloseDays: Overall average close days
-    
-    PERFORMANCE: Uses database aggregation where possible, but needs to iterate
-    for monthly grouping and conversion calculations.
+
+    PERFORMANCE: A single GROUP BY (month, segment) query with conditional
+    aggregates; every chart is folded from those few rows.
     """
-    from collections import defaultdict
-    from datetime import datetime
-    
-    # Get status counts using aggregation
-    stats = queryset.aggregate(
-        total_leads=Count('id'),
-        open_leads=Count('id', filter=Q(lead_status='Open')),
-        won_leads=Count('id', filter=(
-            Q(lead_stage__iexact='Closed-Won') |
-            Q(lead_stage__iexact='Order Booked')
-        )),
+    won = won_stage_condition()
+    is_open = open_status_condition()
+    rows = (
+        queryset.annotate(month_start=TruncMonth("enquiry_date"))
+        .values("month_start", "segment")
+        .annotate(
+            leads=Count("id"),
+            won=Count("id", filter=won),
+            open=Count("id", filter=is_open),
+            closed_won=Count("id", filter=won & ~is_open),
+            close_days_total=Sum("close_time_days"),
+            close_days_count=Count("close_time_days"),
+        )
+        .order_by()
+    )
+    return chart_payload_from_rows(
+        {**row, "close_days_total": row["close_days_total"] or 0} for row in rows
     )
 
-    total = stats['total_leads'] or 0
-    open_leads = stats['open_leads'] or 0
-    won_leads = stats['won_leads'] or 0
-    closed_leads = total - open_leads
-    lost_leads = max(closed_leads - won_leads, 0)
 
-    # Status summary (matching frontend format)
-    status_summary = [
-        {'label': 'Open', 'value': open_leads},
-        {'label': 'Won', 'value': won_leads},
-        {'label': 'Lost', 'value': lost_leads},
-    ]
-
-    # Monthly leads - need to iterate for date formatting
-    monthly_map = defaultdict(lambda: {'leads': 0, 'won': 0})
-    
-    # Get leads with enquiry_date for monthly grouping
-    leads_with_dates = queryset.exclude(enquiry_date__isnull=True).values('enquiry_date', 'lead_stage')
-    
-    for lead in leads_with_dates:
-        if lead['enquiry_date']:
-            try:
-                date_obj = lead['enquiry_date']
-                if isinstance(date_obj, str):
-                    date_obj = datetime.strptime(date_obj.split('T')[0], '%Y-%m-%d')
-                
-                month_key = f"{date_obj.year}-{date_obj.month:02d}"
-                month_label = date_obj.strftime('%b %Y')
-                
-                monthly_map[month_key]['leads'] += 1
-                monthly_map[month_key]['label'] = month_label
-                
-                # Check if won
-                stage = (lead.get('lead_stage') or '').strip().lower()
-                if stage == 'closed-won' or stage == 'order booked':
-                    monthly_map[month_key]['won'] += 1
-            except (ValueError, AttributeError, TypeError):
-                pass
-    
-    # Build monthlyLeads array
-    monthly_leads = []
-    for month_key in sorted(monthly_map.keys()):
-        entry = monthly_map[month_key]
-        leads_count = entry['leads']
-        won_count_month = entry['won']
-        conversion = round((won_count_month / leads_count * 100), 1) if leads_count > 0 else 0
-        
-        monthly_leads.append({
-            'label': entry['label'],
-            'leads': leads_count,
-            'conversion': conversion
-        })
-    
-    # Build conversionTrend (same as monthlyLeads but only conversion)
-    conversion_trend = [
-        {'label': item['label'], 'conversion': item['conversion']}
-        for item in monthly_leads
-    ]
+def chart_payload_from_rows(rows):
+    """
+    Fold (month_start, segment) aggregate rows into the /charts/ payload.
 
-    # Segment distribution using aggregation
-    segment_distribution_raw = list(
-        queryset.values('segment')
-        .annotate(value=Count('id'))
-        .annotate(label=Coalesce('segment', Value('Unspecified')))
-        .values('label', 'value')
-        .order_by('-value')
+    Each row carries leads, won, open, closed_won, close_days_total and
+    close_days_count; month_start is None for leads without an enquiry date.
+    """
+    monthly_map = defaultdict(lambda: {"leads": 0, "won": 0})
+    segment_totals = defaultdict(
+        lambda: {"open": 0, "closed": 0, "close_total": 0, "close_count": 0}
     )
-    
-    segment_distribution = [
-        {'segment': item['label'], 'value': item['value']}
-        for item in segment_distribution_raw
-    ]
+    open_count = 0
+    won_count = 0
+    lost_count = 0
+    total_close_days = 0
+    close_days_count = 0
+
+    for row in rows:
+        month_start = row["month_start"]
+        if month_start:
+            entry = monthly_map[(month_start.year, month_start.month)]
+            entry["leads"] += row["leads"]
+            entry["won"] += row["won"]
+            entry["label"] = month_start.strftime("%b %Y")
+
+        closed = row["leads"] - row["open"]
+        open_count += row["open"]
+        won_count += row["closed_won"]
+        lost_count += closed - row["closed_won"]
+
+        segment = segment_totals[row["segment"] or "Unspecified"]
+        segment["open"] += row["open"]
+        segment["closed"] += closed
+        segment["close_total"] += row["close_days_total"]
+        segment["close_count"] += row["close_days_count"]
+        total_close_days += row["close_days_total"]
+        close_days_count += row["close_days_count"]
 
-    # Segment status (open vs closed) using aggregation
-    segment_status_raw = list(
-        queryset.values('segment')
-        .annotate(
-            open=Count('id', filter=Q(lead_status='Open')),
-            closed=Count('id', filter=~Q(lead_status='Open'))
+    monthly_leads = []
+    for month_key in sorted(monthly_map):
+        entry = monthly_map[month_key]
+        monthly_leads.append(
+            {
+                "label": entry["label"],
+                "leads": entry["leads"],
+                "conversion": (
+                    round((entry["won"] / entry["leads"] * 100), 1)
+                    if entry["leads"] > 0
+                    else 0
+                ),
+            }
         )
-        .annotate(label=Coalesce('segment', Value('Unspecified')))
-        .values('label', 'open', 'closed')
-        .order_by('-open', '-closed')
-    )
-    
-    segment_status = [
-        {
-            'segment': item['label'],
-            'open': item['open'],
-            'closed': item['closed']
-        }
-        for item in segment_status_raw
-    ]
 
-    # Segment close days using aggregation
-    segment_close_days_raw = list(
-        queryset.exclude(close_time_days__isnull=True)
-        .values('segment')
-        .annotate(
-            avg_close_days=Avg('close_time_days'),
-            count=Count('id')
-        )
-        .annotate(label=Coalesce('segment', Value('Unspecified')))
-        .filter(count__gt=0)
-        .values('label', 'avg_close_days')
-        .order_by('-avg_close_days')
+    # Ties are broken by segment name so the payload is deterministic
+    by_volume = sorted(
+        segment_totals.items(),
+        key=lambda item: (-(item[1]["open"] + item[1]["closed"]), item[0]),
     )
-    
-    segment_close_days = [
-        {
-            'segment': item['label'],
-            'avgCloseDays': round(item['avg_close_days'])
-        }
-        for item in segment_close_days_raw
-    ]
-
-    # Overall average close days
-    avg_close_stats = queryset.exclude(close_time_days__isnull=True).aggregate(
-        avg_close_days=Avg('close_time_days')
+    segment_close_days = sorted(
+        [
+            {
+                "segment": segment,
+                "avgCloseDays": round(stats["close_total"] / stats["close_count"]),
+            }
+            for segment, stats in segment_totals.items()
+            if stats["close_count"] > 0
+        ],
+        key=lambda item: (-item["avgCloseDays"], item["segment"]),
     )
-    avg_close_days = round(avg_close_stats['avg_close_days']) if avg_close_stats['avg_close_days'] else None
 
     return {
-        'monthlyLeads': monthly_leads,
-        'conversionTrend': conversion_trend,
-        'statusSummary': status_summary,
-        'segmentDistribution': segment_distribution,
-        'segmentStatus': segment_status,
-        'segmentCloseDays': segment_close_days,
-        'avgCloseDays': avg_close_days
+        "monthlyLeads": monthly_leads,
+        "conversionTrend": [
+            {"label": item["label"], "conversion": item["conversion"]}
+            for item in monthly_leads
+        ],
+        "statusSummary": [
+            {"label": "Open", "value": open_count},
+            {"label": "Won", "value": won_count},
+            {"label": "Lost", "value": lost_count},
+        ],
+        "segmentDistribution": [
+            {"segment": segment, "value": stats["open"] + stats["closed"]}
+            for segment, stats in by_volume
+        ],
+        "segmentStatus": [
+            {"segment": segment, "open": stats["open"], "closed": stats["closed"]}
+            for segment, stats in by_volume
+        ],
+        "segmentCloseDays": segment_close_days,
+        "avgCloseDays": _average(total_close_days, close_days_count),
     }
 
 
+# Engagement clusters, in classification priority order: (key, label, color)
+INSIGHT_CLUSTERS = (
+    ("fast", "Fast Closure", "#6be585"),
+    ("long", "Long Follow Up Time", "#f5aa3c"),
+    ("engage", "High Engage", "#7fd3ff"),
+    ("passive", "No Follow-Up", "#ff6584"),
+)
+
+
+def _round_half_up(value, digits=0):
+    """Round like JavaScript's Math.round / toFixed, which the dashboard used before."""
+    quantum = Decimal(1).scaleb(-digits)
+    rounded = Decimal(repr(value)).quantize(quantum, rounding=ROUND_HALF_UP)
+    return int(rounded) if digits == 0 else float(rounded)
+
+
 def build_insights(queryset):
     """
-    Generate insights using database aggregation.
-
-    PERFORMANCE: Filters and counts in database instead of Python.
+    Build the Insights tab payload (same shape as the frontend's former
+    buildInsightsFromDataset) for the whole filtered population.
+
+    - Overdue follow-ups: open leads (trimmed, case-insensitive) whose next
+      follow-up date has passed
+    - Loss reasons: leads with a "lost" stage or closed without a win; a blank
+      reason is reported as "Lost"/"Closed" respectively
+    - Fastest segments / clusters only count positive close times
+    - Clusters: Fast Closure (close <= 30 days), Long Follow Up Time
+      (>= 4 follow-ups and close > 45 days), High Engage (>= 2 follow-ups),
+      otherwise No Follow-Up
+
+    PERFORMANCE: one GROUP BY per section, constant client cost.
     """
-    # High value leads count
-    high_value_count = queryset.filter(
-        order_value__gte=1_000_000  # Use setting value in production
-    ).count()
-
-    # Overdue follow-ups
     today = timezone.now().date()
-    overdue_count = queryset.filter(
-        lead_status='Open',
-        next_followup_date__lt=today
-    ).count()
-
-    # Loss reasons (for lost leads)
-    loss_reasons = list(
-        queryset.filter(lead_stage__icontains='lost')
-        .values('loss_reason')
-        .annotate(value=Count('id'))
-        .annotate(label=Coalesce('loss_reason', Value('N/A')))
-        .values('label', 'value')
-        .order_by('-value')
+    threshold = getattr(settings, "CRM_HIGH_VALUE_THRESHOLD", 1_000_000)
+    positive_close = Q(close_time_days__gt=0)
+
+    counts = queryset.aggregate(
+        high_value_count=Count("id", filter=Q(order_value__gte=threshold)),
+        overdue_followups=Count(
+            "id", filter=open_status_condition() & Q(next_followup_date__lt=today)
+        ),
     )
 
-    # Fastest closing segments (segments with best avg close time)
-    fastest_segments = list(
-        queryset.filter(lead_status='Closed', close_time_days__isnull=False)
-        .values('segment')
+    # Loss reasons
+    lost_stage = Q(stage_code=LeadStage.LOST)
+    closed_without_win = Q(Exact(Lower(Trim("lead_status")), "closed")) & ~Q(
+        win_flag=True
+    )
+    loss_counts = defaultdict(int)
+    loss_rows = (
+        queryset.filter(lost_stage | closed_without_win)
         .annotate(
-            avg_close_time=Avg('close_time_days'),
-            count=Count('id')
+            is_lost_stage=Case(
+                When(lost_stage, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
         )
-        .filter(count__gte=5)  # At least 5 leads for statistical significance
-        .annotate(label=Coalesce('segment', Value('Unknown')))
-        .values('label', 'avg_close_time', 'count')
-        .order_by('avg_close_time')[:5]
+        .values("loss_reason", "is_lost_stage")
+        .annotate(value=Count("id"))
+        .order_by()
+    )
+    for row in loss_rows:
+        label = row["loss_reason"] or ("Lost" if row["is_lost_stage"] else "Closed")
+        loss_counts[label] += row["value"]
+    loss_reasons = sorted(
+        [{"label": label, "value": value} for label, value in loss_counts.items()],
+        key=lambda item: (-item["value"], item["label"]),
     )
 
-    # Format for response
-    fastest_segments_formatted = [
-        {
-            'label': item['label'],
-            'avg_close_time': round(item['avg_close_time']),
-            'sample_size': item['count']
-        }
-        for item in fastest_segments
-    ]
-
-    # Lead Behavior Clusters (based on engagement/followup count)
-    clusters = list(
-        queryset.values('followup_count')
-        .annotate(count=Count('id'))
-        .order_by('followup_count')
+    # Fastest closing segments
+    segment_rows = (
+        queryset.exclude(segment="")
+        .filter(positive_close)
+        .values("segment")
+        .annotate(total=Sum("close_time_days"), count=Count("id"))
+        .order_by()
+    )
+    fastest_segments = sorted(
+        [
+            {
+                "segment": row["segment"],
+                "avg_close_time": _round_half_up(row["total"] / row["count"]),
+            }
+            for row in segment_rows
+        ],
+        key=lambda item: (item["avg_close_time"], item["segment"]),
     )
 
-    # Group into engagement clusters
-    cluster_data = []
-    for item in clusters:
-        followup_count = item['followup_count'] or 0
-        if followup_count == 0:
-            label = 'No Follow-Up'
-        elif followup_count <= 2:
-            label = 'Low Engagement'
-        elif followup_count <= 5:
-            label = 'Medium Engagement'
-        else:
-            label = 'High Engagement'
-
-        # Find or add to cluster
-        existing = next((c for c in cluster_data if c['label'] == label), None)
-        if existing:
-            existing['value'] += item['count']
-        else:
-            cluster_data.append({'label': label, 'value': item['count']})
-
-    # Employee Conversion (top employees by conversion rate)
-    employee_conversion = list(
-        queryset.exclude(owner__isnull=True)
-        .exclude(owner='')
-        .values('owner')
-        .annotate(
-            total=Count('id'),
-            won=Count('id', filter=(
-                Q(lead_stage__iexact='Closed-Won') |
-                Q(lead_stage__iexact='Order Booked')
-            ))
+    # Engagement clusters
+    cluster_rows = (
+        queryset.annotate(
+            cluster=Case(
+                When(positive_close & Q(close_time_days__lte=30), then=Value("fast")),
+                When(
+                    Q(followup_count__gte=4, close_time_days__gt=45), then=Value("long")
+                ),
+                When(followup_count__gte=2, then=Value("engage")),
+                default=Value("passive"),
+                output_field=CharField(),
+            )
         )
-        .filter(total__gte=5)  # At least 5 leads for significance
+        .values("cluster")
         .annotate(
-            label=F('owner'),
-            conversion_rate=Cast(F('won'), FloatField()) /
-            Cast(F('total'), FloatField()) * 100
+            count=Count("id"),
+            close_total=Sum("close_time_days"),
+            followups=Sum("followup_count"),
         )
-        .values('label', 'conversion_rate', 'total', 'won')
-        .order_by('-conversion_rate')[:10]
+        .order_by()
     )
+    cluster_stats = {row["cluster"]: row for row in cluster_rows}
+    clusters = []
+    for key, label, color in INSIGHT_CLUSTERS:
+        row = cluster_stats.get(key)
+        if not row:
+            continue
+        clusters.append(
+            {
+                "label": label,
+                "value": row["count"],
+                "avgClose": _round_half_up((row["close_total"] or 0) / row["count"]),
+                "avgFollowups": _round_half_up(
+                    (row["followups"] or 0) / row["count"], 1
+                ),
+                "color": color,
+            }
+        )
 
-    # Format employee conversion
-    employee_conversion_formatted = [
+    # Employee conversion (win_flag based)
+    employees = defaultdict(lambda: {"total": 0, "wins": 0, "followups": 0})
+    owner_rows = (
+        queryset.values("owner")
+        .annotate(
+            total=Count("id"),
+            wins=Count("id", filter=Q(win_flag=True)),
+            followups=Sum("followup_count"),
+        )
+        .order_by()
+    )
+    for row in owner_rows:
+        entry = employees[row["owner"] or "Unassigned"]
+        entry["total"] += row["total"]
+        entry["wins"] += row["wins"]
+        entry["followups"] += row["followups"] or 0
+    employee_conversion = sorted(
+        [
+            {
+                "owner": owner,
+                "conversion": _round_half_up(entry["wins"] / entry["total"] * 100, 1),
+                "leads": entry["total"],
+                "avgFollowups": _round_half_up(entry["followups"] / entry["total"], 1),
+            }
+            for owner, entry in employees.items()
+        ],
+        key=lambda item: (-item["conversion"], item["owner"]),
+    )
+    followup_vs_conversion = [
         {
-            'label': item['label'],
-            'conversion_rate': round(item['conversion_rate'], 1),
-            'total_leads': item['total'],
-            'won_leads': item['won']
+            "owner": item["owner"],
+            "conversion": item["conversion"],
+            "followups": item["avgFollowups"],
         }
         for item in employee_conversion
+        if item["leads"] >= 2
     ]
 
     return {
-        'highValueCount': high_value_count,
-        'overdueFollowups': overdue_count,
-        'lossReasons': loss_reasons,
-        'fastestSegments': fastest_segments_formatted,
-        'clusters': cluster_data,
-        'employeeConversion': employee_conversion_formatted,
+        "highValueCount": counts["high_value_count"],
+        "overdueFollowups": counts["overdue_followups"],
+        "lossReasons": loss_reasons,
+        "fastestSegments": fastest_segments,
+        "clusters": clusters,
+        "employeeConversion": employee_conversion,
+        "followupVsConversion": followup_vs_conversion,
+        "forecastSummary": build_forecast_summary(queryset),
+        "cycleTimes": {
+            field: build_cycle_times(queryset, field) for field in CYCLE_TIME_FIELDS
+        },
     }
 
 
+CYCLE_TIME_FIELDS = ("segment", "state", "dealer")
+
+
+def build_cycle_times(queryset, field):
+    """
+    Average close time and open-lead age per value of ``field``, in one GROUP BY.
+
+    avgCloseDays averages the stored close_time_days; avgLeadAge averages
+    Lead.lead_age_days (open leads with an enquiry date, clamped at zero).
+    """
+    today = timezone.now().date()
+    is_open = Q(lead_status__iexact="open", enquiry_date__isnull=False)
+    rows = (
+        queryset.values(field)
+        .annotate(
+            leads=Count("id"),
+            close_days_total=Sum("close_time_days"),
+            close_days_count=Count("close_time_days"),
+            age_days_total=Sum(
+                age_duration(today), filter=is_open & Q(enquiry_date__lt=today)
+            ),
+            age_days_count=Count("id", filter=is_open),
+        )
+        .order_by()
+    )
+    groups = defaultdict(
+        lambda: dict.fromkeys(
+            (
+                "leads",
+                "close_days_total",
+                "close_days_count",
+                "age_days_total",
+                "age_days_count",
+            ),
+            0,
+        )
+    )
+    for row in rows:
+        group = groups[row[field] or "Unspecified"]
+        group["leads"] += row["leads"]
+        group["close_days_total"] += row["close_days_total"] or 0
+        group["close_days_count"] += row["close_days_count"]
+        group["age_days_total"] += _days(row["age_days_total"])
+        group["age_days_count"] += row["age_days_count"]
+    return sorted(
+        [
+            {
+                "label": label,
+                "leads": group["leads"],
+                "avgCloseDays": _average(
+                    group["close_days_total"], group["close_days_count"]
+                ),
+                "avgLeadAge": _average(
+                    group["age_days_total"], group["age_days_count"]
+                ),
+            }
+            for label, group in groups.items()
+        ],
+        key=lambda item: (-item["leads"], item["label"]),
+    )
+
+
+def build_forecast_summary(queryset):
+    """services.build_forecast (month-FY lead/conversion buckets) as one GROUP BY."""
+    buckets = defaultdict(lambda: {"leads": 0, "wins": 0})
+    rows = (
+        queryset.values("month", "fy")
+        .annotate(leads=Count("id"), wins=Count("id", filter=Q(win_flag=True)))
+        .order_by()
+    )
+    for row in rows:
+        label = (
+            f"{row['month']}-{row['fy']}" if row["month"] and row["fy"] else "Unknown"
+        )
+        buckets[label]["leads"] += row["leads"]
+        buckets[label]["wins"] += row["wins"]
+    return [
+        {
+            "label": label,
+            "leads": stats["leads"],
+            "conversion_pct": round((stats["wins"] / stats["leads"]) * 100, 1),
+        }
+        for label, stats in sorted(buckets.items())
+    ]
+
+
 def compute_forecast(queryset):
     """
     Compute forecast data using database aggregation.
@@ -369,15 +551,15 @@ def compute_forecast(queryset):
     """
     # Get monthly trends
     monthly_data = list(
-        queryset.annotate(month=TruncMonth('enquiry_date'))
-        .values('month')
+        queryset.annotate(month=TruncMonth("enquiry_date"))
+        .values("month")
         .annotate(
-            lead_count=Count('id'),
-            won_count=Count('id', filter=Q(win_flag=True)),
-            total_value=Sum('order_value', default=0),
-            won_value=Sum('order_value', filter=Q(win_flag=True), default=0)
+            lead_count=Count("id"),
+            won_count=Count("id", filter=Q(win_flag=True)),
+            total_value=Sum("order_value", default=0),
+            won_value=Sum("order_value", filter=Q(win_flag=True), default=0),
         )
-        .order_by('month')
+        .order_by("month")
     )
 
     # Calculate trends
@@ -386,34 +568,37 @@ def compute_forecast(queryset):
         previous_month = monthly_data[-2]
 
         lead_trend = (
-            (recent_month['lead_count'] - previous_month['lead_count'])
-            / previous_month['lead_count'] * 100
-            if previous_month['lead_count'] > 0 else 0
+            (recent_month["lead_count"] - previous_month["lead_count"])
+            / previous_month["lead_count"]
+            * 100
+            if previous_month["lead_count"] > 0
+            else 0
         )
     else:
         lead_trend = 0
 
     # Current month stats
     current_stats = queryset.filter(
-        enquiry_date__month=timezone.now().month,
-        enquiry_date__year=timezone.now().year
+        enquiry_date__month=timezone.now().month, enquiry_date__year=timezone.now().year
     ).aggregate(
-        current_month_leads=Count('id'),
-        current_month_value=Sum('order_value', default=0)
+        current_month_leads=Count("id"),
+        current_month_value=Sum("order_value", default=0),
     )
 
     return {
-        'monthly_trends': [
+        "monthly_trends": [
             {
-                'month': item['month'].strftime('%Y-%m') if item['month'] else 'Unknown',
-                'leads': item['lead_count'],
-                'won': item['won_count'],
-                'value': float(item['total_value']),
+                "month": (
+                    item["month"].strftime("%Y-%m") if item["month"] else "Unknown"
+                ),
+                "leads": item["lead_count"],
+                "won": item["won_count"],
+                "value": float(item["total_value"]),
             }
             for item in monthly_data
         ],
-        'lead_trend_percentage': round(lead_trend, 1),
-        'current_month_leads': current_stats['current_month_leads'] or 0,
+        "lead_trend_percentage": round(lead_trend, 1),
+        "current_month_leads": current_stats["current_month_leads"] or 0,
         # Simple projection
-        'projected_month_end': current_stats['current_month_leads'] * 2,
+        "projected_month_end": current_stats["current_month_leads"] * 2,
     }
@@ -0,0 +1,116 @@
+"""
+Tests for the bulk lead update endpoint.
+"""
+
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from crm.models import ActivityLog, Lead, LeadDailyFact
+from crm.rollups import aggregate_facts, rebuild_daily_facts
+
+
+class LeadBulkUpdateTests(TestCase):
+    """One request validates, writes and logs every update together"""
+
+    @classmethod
+    def setUpTestData(cls):
+        leads = [
+            Lead(
+                enquiry_id=f"BULK{idx:03d}",
+                dealer="Dealer A",
+                state="Punjab",
+                lead_stage="Follow Up",
+                enquiry_date=date(2024, 3, 1),
+            )
+            for idx in range(30)
+        ]
+        for lead in leads:
+            lead.refresh_derived_fields()
+        Lead.objects.bulk_create(leads)
+        rebuild_daily_facts()
+        cls.user = User.objects.create_user(username="bulk", password="pass12345")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, updates):
+        return self.client.post(
+            "/api/v1/leads/bulk-update/", {"updates": updates}, format="json"
+        )
+
+    def test_bulk_update(self):
+        """Updates are applied with a constant number of writes and one log entry"""
+        ids = list(Lead.objects.order_by("id").values_list("id", flat=True))
+        updates = {
+            str(pk): {"lead_stage": "Closed-Won", "remarks": f"note {pk}"}
+            for pk in ids[:20]
+        }
+        updates[str(ids[20])] = {"owner": "Ravi"}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(updates)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 21)
+        updates_sql = [
+            q
+            for q in queries.captured_queries
+            if q["sql"].startswith('UPDATE "crm_lead"')
+        ]
+        self.assertEqual(len(updates_sql), 1)
+
+        self.assertEqual(Lead.objects.filter(is_won=True, stage_code="won").count(), 20)
+        self.assertEqual(Lead.objects.get(pk=ids[3]).remarks, f"note {ids[3]}")
+        self.assertEqual(Lead.objects.get(pk=ids[20]).owner, "Ravi")
+        self.assertEqual(Lead.objects.get(pk=ids[25]).owner, "")
+
+        log = ActivityLog.objects.get(action="bulk_update_leads")
+        self.assertEqual(log.metadata["updated"], 21)
+        self.assertEqual(log.metadata["fields"], ["lead_stage", "owner", "remarks"])
+        self.assertFalse(ActivityLog.objects.filter(action="update_lead").exists())
+
+        # The daily rollup follows the bulk write
+        fields = ("enquiry_date", "dealer", "owner", "is_won", "lead_count")
+        stored = sorted(
+            LeadDailyFact.objects.filter(lead_count__gt=0).values_list(*fields)
+        )
+        expected = sorted(
+            (
+                row["enquiry_date"],
+                row["dealer"],
+                row["owner"],
+                row["fact_is_won"],
+                row["lead_count"],
+            )
+            for row in aggregate_facts(Lead.objects.all())
+        )
+        self.assertEqual(stored, expected)
+
+    def test_validation_is_all_or_nothing(self):
+        """Any invalid update rejects the whole request"""
+        lead = Lead.objects.order_by("id").first()
+        response = self.post(
+            {
+                str(lead.pk): {"remarks": "fine"},
+                "999999": {"remarks": "missing"},
+                str(lead.pk + 1): {"order_value": "not a number"},
+                str(lead.pk + 2): {"enquiry_id": "NEW"},
+            }
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.data["error"]["details"]["errors"]),
+            {"999999", str(lead.pk + 1), str(lead.pk + 2)},
+        )
+        self.assertEqual(Lead.objects.get(pk=lead.pk).remarks, "")
+        self.assertFalse(
+            ActivityLog.objects.filter(action="bulk_update_leads").exists()
+        )
+
+        self.assertEqual(self.post({}).status_code, 400)
@@ -0,0 +1,156 @@
+"""
+Tests for the aggregate result cache and lead data version invalidation.
+"""
+
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from crm import cached_views
+from crm.cached_views import (
+    LEAD_DATA_VERSION_KEY,
+    aggregate_cache_key,
+    invalidate_lead_caches,
+    lead_data_version,
+)
+from crm.filters import LeadFilter
+from crm.models import Lead, LeadDataVersion
+from crm.rollups import rebuild_daily_facts
+
+
+def _forget_local_version(test):
+    patcher = mock.patch.object(cached_views, "_local_version", None)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+def _filterset(params):
+    filterset = LeadFilter(data=params, queryset=Lead.objects.all())
+    assert filterset.is_valid(), filterset.errors
+    return filterset
+
+
+class AggregateCacheKeyTests(TestCase):
+    """Cache keys are canonical and carry the lead data version"""
+
+    def setUp(self):
+        cache.clear()
+        _forget_local_version(self)
+
+    def test_equivalent_filters_share_a_key(self):
+        """Parameter order, whitespace and blank values do not split the key"""
+        key = aggregate_cache_key(
+            "kpis", _filterset({"state": "Punjab", "dealer": "Dealer A"})
+        )
+        for params in [
+            {"dealer": "Dealer A", "state": "Punjab"},
+            {"state": " Punjab ", "dealer": "Dealer A", "segment": "", "page": "3"},
+            {"state": "Punjab", "dealer": "Dealer A", "high_value_only": "false"},
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(aggregate_cache_key("kpis", _filterset(params)), key)
+
+    def test_different_filters_and_prefixes_differ(self):
+        """Different filters or endpoints never collide"""
+        punjab = _filterset({"state": "Punjab"})
+        self.assertNotEqual(
+            aggregate_cache_key("kpis", punjab),
+            aggregate_cache_key("kpis", _filterset({"state": "Delhi"})),
+        )
+        self.assertNotEqual(
+            aggregate_cache_key("kpis", punjab), aggregate_cache_key("charts", punjab)
+        )
+        self.assertNotEqual(
+            aggregate_cache_key("forecast", punjab, {"horizon": "3M"}),
+            aggregate_cache_key("forecast", punjab, {"horizon": "6M"}),
+        )
+
+    def test_invalidation_bumps_version(self):
+        """invalidate_lead_caches moves every key to a new version"""
+        filterset = _filterset({"state": "Punjab"})
+        key = aggregate_cache_key("kpis", filterset)
+        version = lead_data_version()
+        invalidate_lead_caches()
+        self.assertGreater(lead_data_version(), version)
+        self.assertNotEqual(aggregate_cache_key("kpis", filterset), key)
+
+    def test_invalidation_recovers_missing_version(self):
+        """A missing version row is re-seeded instead of raising"""
+        LeadDataVersion.objects.all().delete()
+        invalidate_lead_caches()
+        self.assertTrue(LeadDataVersion.objects.exists())
+
+    def test_version_is_shared_across_processes(self):
+        """The version survives a cache that another process cannot see"""
+        version = lead_data_version()
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(lead_data_version(), version)
+        # A bump made elsewhere is seen once the local copy expires
+        LeadDataVersion.objects.update(version=version + 1)
+        self.assertEqual(lead_data_version(), version)
+        later = time.monotonic() + cached_views.LOCAL_VERSION_TTL
+        with mock.patch.object(cached_views.time, "monotonic", return_value=later):
+            self.assertEqual(lead_data_version(), version + 1)
+
+    def test_shared_cache_holds_the_counter(self):
+        """With a shared backend the version is read from the cache, not the database"""
+        with mock.patch.object(cached_views, "_shared_cache", return_value=True):
+            version = lead_data_version()
+            with self.assertNumQueries(0):
+                self.assertEqual(lead_data_version(), version)
+            invalidate_lead_caches()
+            with self.assertNumQueries(0):
+                self.assertEqual(lead_data_version(), version + 1)
+            # The row follows the counter and re-seeds it when the cache loses it
+            cache.delete(LEAD_DATA_VERSION_KEY)
+            self.assertEqual(lead_data_version(), version + 1)
+            cache.delete(LEAD_DATA_VERSION_KEY)
+            invalidate_lead_caches()
+            self.assertEqual(cache.get(LEAD_DATA_VERSION_KEY), version + 2)
+
+
+class AggregateCacheViewTests(TestCase):
+    """Aggregate endpoints serve repeat requests from cache"""
+
+    def setUp(self):
+        cache.clear()
+        _forget_local_version(self)
+        self.user = User.objects.create_user(
+            username="manager", password="pass12345", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Lead.objects.create(
+            enquiry_id="C001", dealer="Dealer A", state="Punjab", lead_status="Open"
+        )
+        rebuild_daily_facts()
+
+    def test_repeat_requests_skip_database(self):
+        """Second identical request does not touch the database"""
+        for endpoint in ("/api/v1/kpis/", "/api/v1/charts/", "/api/v1/insights/"):
+            with self.subTest(endpoint=endpoint):
+                first = self.client.get(endpoint, {"state": "Punjab"})
+                self.assertEqual(first.status_code, 200)
+                with self.assertNumQueries(0):
+                    second = self.client.get(
+                        endpoint, {"state": "Punjab", "dealer": ""}
+                    )
+                self.assertEqual(second.data, first.data)
+
+    def test_lead_write_invalidates(self):
+        """Writing a lead through the API makes the next request recompute"""
+        self.assertEqual(self.client.get("/api/v1/kpis/").data["total_leads"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/leads/",
+                {"enquiry_id": "C002", "dealer": "Dealer B"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get("/api/v1/kpis/").data["total_leads"], 2)
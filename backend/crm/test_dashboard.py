@@ -0,0 +1,65 @@
+"""
+Tests for the combined /dashboard/ endpoint.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from crm.models import Lead
+from crm.rollups import rebuild_daily_facts
+from crm.test_services_parity import _make_leads
+
+
+class DashboardViewTests(TestCase):
+    """One request returns the same sections as the standalone endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _make_leads(120)
+        rebuild_daily_facts()
+        cls.user = User.objects.create_user(username="dash", password="pass12345")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_default_sections_match_endpoints(self):
+        """Each section equals the response of its own endpoint"""
+        params = {"state": "Punjab", "page_size": 10}
+        response = self.client.get("/api/v1/dashboard/", params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["sections"], ["leads", "kpis", "charts", "insights"])
+        self.assertNotIn("forecast", data)
+
+        self.assertEqual(
+            data["leads"]["count"], Lead.objects.filter(state="Punjab").count()
+        )
+        self.assertEqual(len(data["leads"]["results"]), 10)
+        self.assertEqual(
+            data["leads"]["results"],
+            self.client.get("/api/v1/leads/", params).json()["results"],
+        )
+        for section in ("kpis", "charts", "insights"):
+            with self.subTest(section=section):
+                self.assertEqual(
+                    data[section], self.client.get(f"/api/v1/{section}/", params).json()
+                )
+
+    def test_section_selection(self):
+        """Only requested sections are computed; forecast is admin-only"""
+        response = self.client.get("/api/v1/dashboard/", {"sections": "kpis, forecast"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {"sections", "kpis"})
+
+        response = self.client.get("/api/v1/dashboard/", {"sections": "kpis,bogus"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_filter_rejected(self):
+        """Filters are validated once and rejected with 400"""
+        response = self.client.get("/api/v1/dashboard/", {"start_date": "not-a-date"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,257 @@
+"""
+Tests for background lead deletion: chunked DeleteJobs and their endpoints.
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from crm import deletes
+from crm.deletes import (
+    claim_next_delete_job,
+    enqueue_delete,
+    requeue_stale_delete_jobs,
+    run_delete_job,
+)
+from crm.facets import FACET_FIELDS, rebuild_facets
+from crm.models import DeleteJob, Lead, LeadFacetValue, LeadSearchToken, UploadBatch
+from crm.rollups import FactDelta, check_daily_facts, rebuild_daily_facts
+from crm.search import sync_search_tokens
+
+BULK_DELETE_URL = "/api/v1/admin/bulk-delete-leads/"
+
+
+def facets_match():
+    expected = Counter()
+    for row in Lead.objects.values(*FACET_FIELDS):
+        for field in FACET_FIELDS:
+            if row[field]:
+                expected[(field, row[field])] += 1
+    return dict(expected) == {
+        (row.field, row.value): row.lead_count for row in LeadFacetValue.objects.all()
+    }
+
+
+class DeleteJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="admin", password="pass12345", is_staff=True
+        )
+
+    def setUp(self):
+        self.upload_batch = UploadBatch.objects.create(filename="march.csv")
+        leads = [
+            Lead(
+                enquiry_id=f"DEL{idx:03d}",
+                dealer=f"Dealer {idx % 3}",
+                state="Punjab",
+                enquiry_date=date(2024, 3, 1) + timedelta(days=idx % 5),
+                upload_batch=self.upload_batch if idx < 9 else None,
+            )
+            for idx in range(12)
+        ]
+        for lead in leads:
+            lead.refresh_derived_fields()
+        sync_search_tokens(Lead.objects.bulk_create(leads))
+        rebuild_daily_facts()
+        rebuild_facets()
+
+    def claimed(self, job):
+        self.assertEqual(claim_next_delete_job().pk, job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_deletes_batch_in_chunks_without_collector(self):
+        job = enqueue_delete(
+            self.user, "upload march.csv", upload_batch=self.upload_batch
+        )
+        self.assertEqual(job.total_rows, 9)
+        job = self.claimed(job)
+
+        with CaptureQueriesContext(connection) as queries, mock.patch.object(
+            deletes, "invalidate_lead_caches"
+        ) as invalidate, self.captureOnCommitCallbacks(execute=True):
+            job = run_delete_job(job, chunk_size=4)
+        self.assertEqual(job.status, DeleteJob.SUCCEEDED)
+        self.assertEqual(job.deleted_count, 9)
+        # Once per chunk, so lists and dashboards agree while the job runs
+        self.assertEqual(invalidate.call_count, 3)
+        # 3 chunks, one DELETE per table each; the collector would have loaded whole leads
+        lead_deletes = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('DELETE FROM "crm_lead"')
+        ]
+        self.assertEqual(len(lead_deletes), 3)
+        self.assertFalse(
+            [query for query in queries if '"crm_lead"."enquiry_id"' in query["sql"]]
+        )
+
+        self.assertEqual(Lead.objects.count(), 3)
+        self.assertFalse(
+            LeadSearchToken.objects.exclude(lead__in=Lead.objects.all()).exists()
+        )
+        self.assertTrue(LeadSearchToken.objects.exists())
+        self.assertFalse(UploadBatch.objects.exists())
+        self.assertEqual(check_daily_facts(), [])
+        self.assertTrue(facets_match())
+
+    def test_failed_job_keeps_committed_chunks_and_their_rollup(self):
+        lead_ids = list(Lead.objects.order_by("id").values_list("id", flat=True)[:6])
+        job = self.claimed(
+            enqueue_delete(self.user, "6 selected leads", lead_ids=lead_ids)
+        )
+        real_delete = deletes.delete_leads
+        calls, mismatches = [], []
+
+        def fail_second_chunk(ids):
+            calls.append(ids)
+            if len(calls) == 2:
+                # The first chunk is already out of the rollup
+                mismatches.extend(check_daily_facts())
+                raise RuntimeError("lock timeout")
+            return real_delete(ids)
+
+        with mock.patch.object(deletes, "delete_leads", fail_second_chunk):
+            job = run_delete_job(job, chunk_size=3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeleteJob.FAILED)
+        self.assertEqual(job.message, "lock timeout")
+        self.assertEqual((job.deleted_count, job.last_id), (3, lead_ids[2]))
+        self.assertEqual(Lead.objects.count(), 9)
+        self.assertEqual(mismatches, [])
+        self.assertEqual(check_daily_facts(), [])
+        self.assertTrue(facets_match())
+
+    def test_stale_job_resumes_after_last_id(self):
+        lead_ids = list(Lead.objects.order_by("id").values_list("id", flat=True)[:5])
+        job = self.claimed(
+            enqueue_delete(self.user, "5 selected leads", lead_ids=lead_ids)
+        )
+        # Simulate a worker that died after committing the first chunk
+        with transaction.atomic():
+            facts = FactDelta()
+            facts.remove_queryset(Lead.objects.filter(id__in=lead_ids[:2]))
+            deletes.delete_leads(lead_ids[:2])
+            facts.apply()
+        DeleteJob.objects.filter(pk=job.pk).update(
+            deleted_count=2,
+            last_id=lead_ids[1],
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertIsNone(claim_next_delete_job())
+        self.assertEqual(requeue_stale_delete_jobs(), 1)
+
+        job = run_delete_job(claim_next_delete_job(), chunk_size=2)
+        self.assertEqual(job.status, DeleteJob.SUCCEEDED)
+        self.assertEqual(job.deleted_count, 5)
+        self.assertEqual(Lead.objects.count(), 7)
+        self.assertEqual(check_daily_facts(), [])
+        self.assertTrue(facets_match())
+
+    def test_search_tokens_are_the_only_cascade(self):
+        """delete_leads() bypasses the collector, so it must know every cascade of Lead"""
+        cascades = [
+            relation.related_model
+            for relation in Lead._meta.related_objects
+            if relation.on_delete.__name__ == "CASCADE"
+        ]
+        self.assertEqual(cascades, [LeadSearchToken])
+
+
+class DeleteJobEndpointTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", password="pass12345", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.leads = Lead.objects.bulk_create(
+            Lead(enquiry_id=f"EP{idx}", dealer="Dealer") for idx in range(3)
+        )
+
+    @mock.patch.object(deletes, "INLINE_DELETE_LIMIT", 1)
+    def test_bulk_delete_queues_job_and_reports_progress(self):
+        ids = [self.leads[0].id, self.leads[1].id]
+        response = self.client.post(BULK_DELETE_URL, {"lead_ids": ids}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["deleted_count"], 2)
+        job_url = f"/api/v1/admin/delete-jobs/{response.data['job']['id']}/"
+        self.assertEqual(self.client.get(job_url).data["status"], DeleteJob.QUEUED)
+        self.assertEqual(Lead.objects.count(), 3)
+
+        run_delete_job(claim_next_delete_job())
+        response = self.client.get(job_url)
+        self.assertEqual(response.data["status"], DeleteJob.SUCCEEDED)
+        self.assertEqual(
+            (response.data["deleted_count"], response.data["progress"]), (2, 100.0)
+        )
+        self.assertEqual(
+            list(Lead.objects.values_list("enquiry_id", flat=True)), ["EP2"]
+        )
+
+    def test_small_sets_are_deleted_inline(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                BULK_DELETE_URL, {"lead_ids": [self.leads[0].id]}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["job"]["status"], DeleteJob.SUCCEEDED)
+        self.assertEqual(Lead.objects.count(), 2)
+        self.assertIsNone(claim_next_delete_job())
+
+    def test_invalid_requests(self):
+        self.assertEqual(
+            self.client.post(
+                BULK_DELETE_URL, {"lead_ids": []}, format="json"
+            ).status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.post(
+                BULK_DELETE_URL, {"lead_ids": ["x"]}, format="json"
+            ).status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.get("/api/v1/admin/delete-jobs/999/").status_code, 404
+        )
+
+        job = enqueue_delete(self.admin, "1 selected lead", lead_ids=[self.leads[0].id])
+        self.client.force_authenticate(
+            User.objects.create_user(username="user", password="pass12345")
+        )
+        self.assertEqual(
+            self.client.get(f"/api/v1/admin/delete-jobs/{job.pk}/").status_code, 403
+        )
+        response = self.client.post(
+            BULK_DELETE_URL, {"lead_ids": [self.leads[0].id]}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @mock.patch.object(deletes, "INLINE_DELETE_LIMIT", 0)
+    def test_upload_delete_conflicts_while_queued(self):
+        upload_batch = UploadBatch.objects.create(filename="a.csv")
+        Lead.objects.update(upload_batch=upload_batch)
+        url = "/api/v1/leads/upload/history/"
+        self.assertEqual(
+            self.client.delete(
+                url, {"upload_key": upload_batch.pk}, format="json"
+            ).status_code,
+            202,
+        )
+        self.assertEqual(
+            self.client.delete(
+                url, {"upload_key": upload_batch.pk}, format="json"
+            ).status_code,
+            409,
+        )
@@ -0,0 +1,73 @@
+"""
+Tests for the streaming lead export endpoint.
+"""
+
+import csv
+import io
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from crm.models import ActivityLog, Lead
+from crm.test_services_parity import _make_leads
+
+
+class LeadExportTests(TestCase):
+    """Exports honour LeadFilter, column subsets and log one activity entry"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _make_leads(150)
+        cls.user = User.objects.create_user(username="exporter", password="pass12345")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_csv_export(self):
+        """CSV is streamed with every matching lead and the requested columns"""
+        response = self.client.get(
+            "/api/v1/leads/export/",
+            {"state": "Delhi", "fields": "enquiry_id,order_value,updated_at"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ["id", "enquiry_id", "order_value", "updated_at"])
+        expected = Lead.objects.filter(state="Delhi")
+        self.assertEqual(len(rows) - 1, expected.count())
+        self.assertEqual(
+            sorted(row[1] for row in rows[1:]),
+            sorted(expected.values_list("enquiry_id", flat=True)),
+        )
+
+        logs = ActivityLog.objects.filter(user=self.user, action="export_data")
+        self.assertEqual(logs.count(), 1)
+        self.assertEqual(logs.get().metadata["filters"], {"state": "Delhi"})
+
+    def test_xlsx_export(self):
+        """XLSX export contains a header and one row per lead"""
+        response = self.client.get(
+            "/api/v1/leads/export/", {"file_type": "xlsx", "lead_status": "Open"}
+        )
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(
+            io.BytesIO(b"".join(response.streaming_content)), read_only=True
+        )
+        rows = list(workbook["Leads"].iter_rows(values_only=True))
+        self.assertEqual(rows[0][:3], ("id", "enquiry_id", "enquiry_date"))
+        self.assertEqual(len(rows) - 1, Lead.objects.filter(lead_status="Open").count())
+
+    def test_invalid_parameters(self):
+        """Unknown file types, fields and filter values are rejected"""
+        for params in [{"file_type": "pdf"}, {"fields": "nope"}, {"start_date": "bad"}]:
+            with self.subTest(params=params):
+                response = self.client.get("/api/v1/leads/export/", params)
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(ActivityLog.objects.filter(action="export_data").exists())
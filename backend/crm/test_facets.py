@@ -0,0 +1,196 @@
+"""
+Tests for the facet dictionary, filter-aware facet counts and typeahead.
+"""
+
+from collections import Counter
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from crm.facets import FACET_FIELDS, FacetDelta, field_options, rebuild_facets
+from crm.models import Lead, LeadFacetValue
+from crm.rollups import rebuild_daily_facts
+from crm.test_services_parity import _make_leads
+
+
+def stored_facets():
+    return {
+        (row.field, row.value): row.lead_count for row in LeadFacetValue.objects.all()
+    }
+
+
+def expected_facets():
+    counts = Counter()
+    for row in Lead.objects.values(*FACET_FIELDS):
+        for field in FACET_FIELDS:
+            if row[field]:
+                counts[(field, row[field])] += 1
+    return dict(counts)
+
+
+class FacetTests(TestCase):
+    """The dictionary follows lead writes and answers option requests cheaply"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _make_leads(120)
+        rebuild_daily_facts()
+        rebuild_facets()
+        cls.user = User.objects.create_user(
+            username="facets", password="pass12345", is_staff=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_dictionary_follows_writes(self):
+        """Create, update, bulk update, upload and delete keep the counts exact"""
+        self.assertEqual(stored_facets(), expected_facets())
+
+        response = self.client.post(
+            "/api/v1/leads/",
+            {"enquiry_id": "FAC-1", "dealer": "Brand New Dealer", "city": "Agra"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        lead = Lead.objects.order_by("id").first()
+        self.client.patch(
+            f"/api/v1/leads/{lead.id}/", {"dealer": "Renamed Dealer"}, format="json"
+        )
+        self.client.post(
+            "/api/v1/leads/bulk-update/",
+            {"updates": {str(lead.id + 1): {"city": "Agra"}}},
+            format="json",
+        )
+        response = self.client.post(
+            "/api/v1/leads/upload/create/",
+            {
+                "rows": [
+                    {"Enquiry No": "FAC-2", "Dealer": "Upload Dealer", "State": "Goa"}
+                ],
+                "filename": "f.xlsx",
+            },
+            format="json",
+        )
+        response = self.client.delete(
+            "/api/v1/leads/upload/history/",
+            {"upload_key": response.data["upload_batch"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.post(
+            "/api/v1/admin/bulk-delete-leads/",
+            {"lead_ids": [lead.id + 2]},
+            format="json",
+        )
+
+        self.assertEqual(stored_facets(), expected_facets())
+        self.assertIn(("dealer", "Renamed Dealer"), stored_facets())
+        self.assertNotIn(("dealer", "Upload Dealer"), stored_facets())
+
+    def test_concurrent_new_value(self):
+        """A value another writer inserted after the read is incremented, not duplicated"""
+        lead = Lead(enquiry_id="FAC-6", dealer="Race Dealer")
+        delta = FacetDelta()
+        delta.add(lead)
+        real_bulk_create = LeadFacetValue.objects.bulk_create
+
+        def other_writer_first(rows, **kwargs):
+            LeadFacetValue.objects.create(
+                field="dealer",
+                value="Race Dealer",
+                normalized="race dealer",
+                lead_count=2,
+            )
+            return real_bulk_create(rows, **kwargs)
+
+        with mock.patch.object(
+            LeadFacetValue.objects, "bulk_create", side_effect=other_writer_first
+        ):
+            delta.apply()
+        self.assertEqual(stored_facets()[("dealer", "Race Dealer")], 3)
+        self.assertFalse(LeadFacetValue.objects.filter(lead_count__lte=0).exists())
+
+    def test_all_field_options_single_query(self):
+        """All dropdown options come from one dictionary read, then from cache"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/leads/all-field-options/")
+        self.assertEqual(response.status_code, 200)
+        reads = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "crm_leadfacetvalue" in query["sql"]
+        ]
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(set(response.data), set(FACET_FIELDS))
+        dealers = sorted(
+            set(Lead.objects.exclude(dealer="").values_list("dealer", flat=True))
+        )
+        self.assertEqual(response.data["dealer"], dealers[:200])
+
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/v1/leads/all-field-options/")
+        self.assertEqual(again.data, response.data)
+        # A lead write makes the next request read the dictionary again
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/v1/leads/",
+                {"enquiry_id": "FAC-7", "dealer": "Aaa Dealer"},
+                format="json",
+            )
+        response = self.client.get("/api/v1/leads/all-field-options/")
+        self.assertEqual(response.data["dealer"][0], "Aaa Dealer")
+
+    def test_field_options_limit_per_field(self):
+        """The per-field limit is applied by the query, alphabetically"""
+        with CaptureQueriesContext(connection) as queries:
+            options = field_options(("dealer", "state"), limit=2)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(options["dealer"], ["Dealer 0", "Dealer 1"])
+        states = sorted(set(Lead.objects.values_list("state", flat=True)))
+        self.assertEqual(options["state"], states[:2])
+
+    def test_typeahead(self):
+        """?q= returns values starting with the prefix, most used first"""
+        Lead.objects.create(enquiry_id="FAC-3", dealer="Zeta Power")
+        Lead.objects.create(enquiry_id="FAC-4", dealer="Zeta Gensets")
+        rebuild_facets()
+        Lead.objects.create(enquiry_id="FAC-5", dealer="Zeta Gensets")
+        rebuild_facets()
+        response = self.client.get(
+            "/api/v1/lead-field-options/", {"field": "dealer", "q": "ZETA"}
+        )
+        self.assertEqual(response.data["options"], ["Zeta Gensets", "Zeta Power"])
+
+    def test_facet_counts_under_filters(self):
+        """Facet counts match a direct count of the filtered leads"""
+        response = self.client.get(
+            "/api/v1/leads/facets/", {"state": "Delhi", "fields": "dealer,owner"}
+        )
+        self.assertEqual(response.status_code, 200)
+        filtered = Lead.objects.filter(state="Delhi")
+        for field in ("dealer", "owner"):
+            expected = Counter(
+                value for value in filtered.values_list(field, flat=True) if value
+            )
+            got = {option["value"]: option["count"] for option in response.data[field]}
+            self.assertEqual(got, dict(expected))
+
+        response = self.client.get(
+            "/api/v1/dashboard/", {"sections": "facets", "state": "Delhi"}
+        )
+        self.assertEqual(
+            set(response.data["facets"]),
+            {"city", "dealer", "owner", "segment", "kva_range"},
+        )
+
+        response = self.client.get("/api/v1/leads/facets/", {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,198 @@
+"""
+Equivalence tests for the columnar import mapping.
+"""
+
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+import pandas as pd
+
+from crm.import_columnar import SOURCE_COLUMNS, map_frame, map_rows
+from crm.import_utils import DATE_PARSERS, DateParser, map_row
+
+DATES = [
+    "2024-01-05",
+    "2024-1-5",
+    "05-01-2024",
+    "5-1-2024",
+    "05/01/2024",
+    "12/25/2024",
+    "13/01/2024",
+    "01 Apr 2024",
+    "1 april 2024",
+    "01-APR-2024",
+    "1-April-2024",
+    "31-02-2024",
+    "29-02-2024",
+    "01-02-3000",
+    "0001-01-01",
+    "2024/01/05",
+    "20240105",
+    "nan",
+    "NaN",
+    " 2024-01-05 ",
+    "Sept 1 2024",
+]
+NUMBERS = [
+    "62.5",
+    " 125 ",
+    "0",
+    "-0",
+    "1e3",
+    "NaN",
+    "1_000",
+    "abc",
+    "49.999",
+    "50",
+    "300",
+    "-5",
+    "2.5",
+    "7",
+    "0.005",
+    "1e308",
+]
+STAGES = [
+    "Closed-Won",
+    "Order Booked",
+    "Won",
+    "Lost to competitor",
+    "LOST",
+    "Follow Up",
+    "Open",
+    "Declined",
+    " closed ",
+    "order received",
+]
+TEXT = [
+    "Dealer A",
+    "  padded  ",
+    "Ünïcode İstanbul",
+    "x" * 40,
+    "\tTabbed\n",
+    "yes",
+    "Y",
+    "true",
+    "1",
+    "no",
+]
+# Cells map_row would treat differently from strings, and strings it raises on
+ODD = [5, 2.5, float("nan"), True, 0, b"bytes", "inf", "-inf", "sNaN", "1e400"]
+
+
+def value_pool(column):
+    if "Date" in column:
+        return DATES
+    if column in ("KVA", "Qty", "Quantity", "No of Follow-ups", "FollowupCount"):
+        return NUMBERS
+    if column in ("Enquiry Stage", "EnquiryStatus"):
+        return STAGES + TEXT
+    return TEXT + STAGES[:2]
+
+
+def random_row(rng, odd_rate):
+    row = {}
+    for column in SOURCE_COLUMNS:
+        roll = rng.random()
+        if roll < 0.15:
+            continue  # column absent
+        if roll < 0.25:
+            row[column] = rng.choice([None, "", "   "])
+        elif roll < 0.25 + odd_rate:
+            row[column] = rng.choice(ODD)
+        else:
+            row[column] = rng.choice(value_pool(column))
+    return row
+
+
+def outcome(mapped):
+    if isinstance(mapped, Exception):
+        return type(mapped), str(mapped)
+    return {key: (type(value), str(value)) for key, value in mapped.items()}
+
+
+def expected_outcome(row):
+    try:
+        return outcome(map_row(row))
+    except Exception as exc:
+        return outcome(exc)
+
+
+class ColumnarMappingTests(SimpleTestCase):
+    """map_rows/map_frame match map_row value for value, type for type"""
+
+    def assert_equivalent(self, rows, results):
+        self.assertEqual(len(results), len(rows))
+        for index, (row, mapped) in enumerate(zip(rows, results)):
+            self.assertEqual(
+                outcome(mapped), expected_outcome(row), f"row {index}: {row!r}"
+            )
+
+    def test_random_rows_match_map_row(self):
+        """Randomized rows, including odd values and missing columns, in random batch sizes"""
+        rng = random.Random(20240105)
+        for odd_rate in (0, 0.002, 0.05):
+            rows = [random_row(rng, odd_rate) for _ in range(600)]
+            start = 0
+            while start < len(rows):
+                size = rng.choice([1, 7, 64, 250])
+                with self.subTest(odd_rate=odd_rate, start=start):
+                    batch = rows[start : start + size]
+                    self.assert_equivalent(batch, map_rows(batch))
+                start += size
+
+    def test_typical_rows(self):
+        rows = [
+            {
+                "Enquiry No": f" ENQ{idx} ",
+                "Enquiry Date": "05-01-2024",
+                "KVA": str(25 * idx),
+                "Qty": "2" if idx % 2 else "",
+                "Enquiry Stage": STAGES[idx % len(STAGES)],
+                "Location": "",
+                "City": " Ludhiana ",
+                "Remarks": " price ",
+                "Finance Required": "Yes",
+            }
+            for idx in range(20)
+        ]
+        results = map_rows(rows)
+        self.assert_equivalent(rows, results)
+        self.assertEqual(results[0]["city"], "Ludhiana")
+        self.assertEqual(results[3]["kva_range"], "50-100")
+
+    def test_frame_with_extra_columns(self):
+        """A reader DataFrame may carry columns map_row ignores and lack others"""
+        frame = pd.DataFrame(
+            {
+                "Enquiry No": ["A1", "A2", None],
+                "Dealer": ["D", "", "E"],
+                "Unmapped": [1, 2, 3],
+            }
+        )
+        rows = [
+            {"Enquiry No": "A1", "Dealer": "D"},
+            {"Enquiry No": "A2", "Dealer": ""},
+            {"Enquiry No": None, "Dealer": "E"},
+        ]
+        self.assert_equivalent(rows, map_frame(frame))
+
+    def test_date_parsers_carry_over_between_chunks(self):
+        """Each distinct date is parsed once per import, by its column's DateParser"""
+        parsers = {column: DateParser(sample_size=5) for column in DATE_PARSERS}
+        rows = [
+            {"Enquiry No": f"ENQ{idx}", "Enquiry Date": f"{idx % 10 + 1:02d}-03-2024"}
+            for idx in range(40)
+        ]
+        with mock.patch.dict(DATE_PARSERS, parsers):
+            results = map_rows(rows[:20]) + map_rows(rows[20:])
+        parser = parsers["Enquiry Date"]
+        self.assertEqual(parser.format, "%d-%m-%Y")
+        self.assertEqual(
+            (parser.cache_info().misses, parser.cache_info().hits), (10, 10)
+        )
+        self.assert_equivalent(rows, results)
+
+    def test_empty(self):
+        self.assertEqual(map_rows([]), [])
@@ -0,0 +1,181 @@
+"""
+Tests for background import jobs: enqueue, run_import_worker, progress endpoint.
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from crm.imports import claim_next_job, requeue_stale_jobs, run_job
+from crm.models import ImportJob, Lead, StagedUpload, UploadBatch
+from crm.test_import_utils import csv_upload, synthetic_rows
+from crm.uploads import UploadWriter, stage_upload
+
+PREVIEW_URL = "/api/v1/leads/upload/preview/"
+COMMIT_URL = "/api/v1/leads/upload/commit/"
+IMPORTS_URL = "/api/v1/imports/"
+
+
+class ImportJobTests(TestCase):
+    def setUp(self):
+        # Upload endpoints are rate limited per user
+        cache.clear()
+        self.user = User.objects.create_user(username="uploader", password="pass12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def preview(self, rows):
+        response = self.client.post(PREVIEW_URL, {"file": csv_upload(rows)})
+        self.assertEqual(response.status_code, 200)
+        return response.data["upload_token"]
+
+    def enqueue(self, token, **body):
+        return self.client.post(
+            IMPORTS_URL, {"upload_token": token, **body}, format="json"
+        )
+
+    def queued_job(self, rows, **body):
+        response = self.enqueue(self.preview(rows), **body)
+        self.assertEqual(response.status_code, 202)
+        return ImportJob.objects.get(pk=response.data["id"])
+
+    def test_enqueue_run_and_report_progress(self):
+        Lead.objects.create(enquiry_id="ENQ0000001", dealer="Old Dealer")
+        token = self.preview(synthetic_rows(5))
+        response = self.enqueue(token, skip_enquiry_ids=["ENQ0000004"])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], ImportJob.QUEUED)
+        self.assertEqual(response.data["total_rows"], 4)
+        self.assertEqual(response.data["progress"], 0.0)
+        self.assertIsNone(response.data["rows_per_second"])
+        # Nothing is written by the request itself
+        self.assertEqual(Lead.objects.count(), 1)
+
+        out = StringIO()
+        call_command("run_import_worker", "--once", "--batch-size", "2", stdout=out)
+        self.assertIn("succeeded", out.getvalue())
+
+        response = self.client.get(f"{IMPORTS_URL}{response.data['id']}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], ImportJob.SUCCEEDED)
+        self.assertEqual(response.data["processed_rows"], 4)
+        self.assertEqual(response.data["created_count"], 3)
+        self.assertEqual(response.data["updated_count"], 1)
+        self.assertEqual(response.data["error_count"], 0)
+        self.assertEqual(response.data["progress"], 100.0)
+        self.assertIsNotNone(response.data["finished_at"])
+
+        self.assertEqual(Lead.objects.count(), 4)
+        self.assertEqual(Lead.objects.get(enquiry_id="ENQ0000001").dealer, "Dealer 1")
+        self.assertFalse(Lead.objects.filter(enquiry_id="ENQ0000004").exists())
+        self.assertFalse(StagedUpload.objects.exists())
+
+    def test_batches_commit_separately(self):
+        job = self.queued_job(synthetic_rows(5))
+        claim_next_job()
+        job.refresh_from_db()
+        real_write = UploadWriter.write_mapped
+        calls = []
+
+        def fail_second_batch(writer, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            real_write(writer, rows)
+
+        with mock.patch.object(UploadWriter, "write_mapped", fail_second_batch):
+            job = run_job(job, batch_size=2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertEqual(job.message, "disk full")
+        self.assertEqual(job.processed_rows, 2)
+        self.assertEqual(job.last_row_number, 2)
+        self.assertEqual(Lead.objects.count(), 2)
+        self.assertEqual(job.upload_batch.created_count, 2)
+        self.assertIsNotNone(job.upload_batch.finished_at)
+        # The staged rows outlive a failed job until they expire
+        self.assertTrue(StagedUpload.objects.exists())
+
+    def test_stale_job_resumes_after_last_committed_row(self):
+        job = self.queued_job(synthetic_rows(5))
+        claim_next_job()
+        job.refresh_from_db()
+        with mock.patch.object(
+            UploadWriter, "write_mapped", side_effect=KeyboardInterrupt
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                run_job(job, batch_size=2)
+        # Simulate a worker that died after committing rows 1-2
+        ImportJob.objects.filter(pk=job.pk).update(
+            processed_rows=2,
+            last_row_number=2,
+            created_count=2,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(requeue_stale_jobs(), 1)
+
+        job = run_job(claim_next_job(), batch_size=2)
+        self.assertEqual(job.status, ImportJob.SUCCEEDED)
+        self.assertEqual(job.processed_rows, 5)
+        self.assertEqual(job.created_count, 5)
+        self.assertEqual(
+            list(
+                Lead.objects.order_by("enquiry_id").values_list("enquiry_id", flat=True)
+            ),
+            ["ENQ0000002", "ENQ0000003", "ENQ0000004"],
+        )
+        # The resumed run writes into the batch of the first one
+        upload_batch = UploadBatch.objects.get()
+        self.assertEqual(job.upload_batch, upload_batch)
+        self.assertEqual((upload_batch.total_rows, upload_batch.created_count), (5, 5))
+        self.assertEqual(Lead.objects.filter(upload_batch=upload_batch).count(), 3)
+
+    def test_job_taken_over_by_another_worker_stops(self):
+        job = self.queued_job(synthetic_rows(3))
+        claim_next_job()
+        job.refresh_from_db()
+        ImportJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() + timedelta(seconds=1)
+        )
+        job = run_job(job)
+        self.assertEqual(job.status, ImportJob.RUNNING)
+        self.assertFalse(Lead.objects.exists())
+
+    def test_queued_upload_is_not_committed_or_purged(self):
+        token = self.preview(synthetic_rows(2))
+        self.assertEqual(self.enqueue(token).status_code, 202)
+        self.assertEqual(self.enqueue(token).status_code, 409)
+        response = self.client.post(COMMIT_URL, {"upload_token": token}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+        StagedUpload.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        stage_upload(self.user, "next.csv")
+        self.assertTrue(StagedUpload.objects.filter(token=token).exists())
+
+    def test_invalid_requests_and_privacy(self):
+        self.assertEqual(self.enqueue("not-a-token").status_code, 400)
+        token = self.preview(synthetic_rows(1))
+        self.assertEqual(
+            self.enqueue(token, skip_enquiry_ids=["ENQ0000000"]).status_code, 400
+        )
+        response = self.enqueue(token)
+        self.assertEqual(response.status_code, 202)
+
+        other = User.objects.create_user(username="other", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(
+            client.get(f"{IMPORTS_URL}{response.data['id']}/").status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(f"{IMPORTS_URL}{response.data['id'] + 1}/").status_code, 404
+        )
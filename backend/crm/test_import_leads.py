@@ -0,0 +1,132 @@
+"""
+Tests for the import_leads management command.
+"""
+
+import csv
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from crm.models import Lead, UploadBatch
+
+HEADER = ["Enquiry No", "Dealer", "Enquiry Stage", "Enquiry Date", "KVA"]
+
+
+class ImportLeadsCommandTests(TransactionTestCase):
+    def import_csv(self, rows, *args):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", newline="", encoding="utf-8"
+        ) as handle:
+            writer = csv.writer(handle)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+            handle.flush()
+            out = StringIO()
+            call_command(
+                "import_leads", handle.name, *args, stdout=out, stderr=StringIO()
+            )
+        return out.getvalue()
+
+    def rows(self):
+        return [
+            ["ENQ1", "Dealer A", "Open", "05-01-2024", "62.5"],
+            ["ENQ2", "Dealer B", "Closed-Won", "06-01-2024", "125"],
+            ["", "No id", "Open", "", ""],
+            [
+                "ENQ1",
+                "Dealer A2",
+                "Lost",
+                "07-01-2024",
+                "10",
+            ],  # same batch: last row wins
+            ["ENQ3", "Dealer C", "Open", "08-01-2024", ""],
+            ["ENQ2", "Dealer B2", "Open", "09-01-2024", "300"],  # next batch: updated
+        ]
+
+    def test_upserts_in_batches(self):
+        Lead.objects.create(enquiry_id="ENQ3", dealer="Old")
+        out = self.import_csv(self.rows(), "--batch-size", "4", "--commit-every", "4")
+        self.assertIn(
+            "Processed 6 rows • created 2 • updated 2 • unchanged 0 • skipped 1 • 0 errors",
+            out,
+        )
+        self.assertIn("rows/s", out)
+
+        leads = {lead.enquiry_id: lead for lead in Lead.objects.all()}
+        self.assertEqual(sorted(leads), ["ENQ1", "ENQ2", "ENQ3"])
+        self.assertEqual(leads["ENQ1"].dealer, "Dealer A2")
+        self.assertEqual(leads["ENQ1"].stage_code, "lost")
+        self.assertEqual(leads["ENQ2"].dealer, "Dealer B2")
+        self.assertFalse(leads["ENQ2"].is_won)
+        self.assertEqual(leads["ENQ3"].dealer, "Dealer C")
+        self.assertEqual(str(leads["ENQ3"].enquiry_date), "2024-01-08")
+        upload_batch = UploadBatch.objects.get()
+        self.assertEqual(upload_batch.filename, Path(upload_batch.filename).name)
+        self.assertEqual(
+            (
+                upload_batch.total_rows,
+                upload_batch.created_count,
+                upload_batch.error_count,
+            ),
+            (6, 2, 1),
+        )
+        self.assertEqual(Lead.objects.filter(upload_batch=upload_batch).count(), 3)
+
+        # Re-importing the same file writes nothing; one batch dedups ENQ1 and ENQ2
+        out = self.import_csv(self.rows(), "--commit-every", "0")
+        self.assertIn("created 0 • updated 0 • unchanged 3", out)
+        self.assertEqual(Lead.objects.count(), 3)
+
+        rows = self.rows()
+        rows[4][1] = "Dealer C2"
+        out = self.import_csv(rows, "--commit-every", "0")
+        self.assertIn("created 0 • updated 1 • unchanged 2", out)
+        self.assertEqual(Lead.objects.get(enquiry_id="ENQ3").dealer, "Dealer C2")
+        latest = UploadBatch.objects.latest("started_at")
+        self.assertEqual(Lead.objects.filter(upload_batch=latest).count(), 3)
+
+    def test_merge_skips_unchanged_rows(self):
+        self.import_csv(self.rows(), "--merge")
+        rows = self.rows()
+        rows[4][1] = "Dealer C2"
+        out = self.import_csv(rows, "--merge")
+        self.assertIn("created 0 • updated 1 • unchanged 2", out)
+        self.assertEqual(Lead.objects.get(enquiry_id="ENQ3").dealer, "Dealer C2")
+        # Unchanged leads move to the latest batch too
+        latest = UploadBatch.objects.latest("started_at")
+        self.assertEqual(Lead.objects.filter(upload_batch=latest).count(), 3)
+
+    def test_workers_map_chunks_in_file_order(self):
+        rows = [
+            [f"ENQ{idx % 7}", f"Dealer {idx}", "Open", "05-01-2024", "62.5"]
+            for idx in range(30)
+        ]
+        self.import_csv(rows, "--batch-size", "3", "--workers", "2")
+        self.assertEqual(Lead.objects.count(), 7)
+        # The last row of every enquiry_id wins across batches
+        self.assertEqual(Lead.objects.get(enquiry_id="ENQ0").dealer, "Dealer 28")
+        self.assertEqual(Lead.objects.get(enquiry_id="ENQ6").dealer, "Dealer 27")
+
+    def test_merge_matches_upsert(self):
+        Lead.objects.create(enquiry_id="ENQ3", dealer="Old")
+        out = self.import_csv(
+            self.rows(), "--batch-size", "4", "--commit-every", "4", "--merge"
+        )
+        self.assertIn(
+            "Processed 6 rows • created 2 • updated 2 • unchanged 0 • skipped 1 • 0 errors",
+            out,
+        )
+        merged = list(Lead.objects.order_by("enquiry_id").values())
+
+        Lead.objects.all().delete()
+        Lead.objects.create(enquiry_id="ENQ3", dealer="Old")
+        self.import_csv(self.rows(), "--batch-size", "4", "--commit-every", "4")
+        upserted = list(Lead.objects.order_by("enquiry_id").values())
+        for row in merged + upserted:
+            del row["id"]
+            # Each run is its own batch
+            self.assertIsNotNone(row.pop("upload_batch_id"))
+        self.assertEqual(merged, upserted)
@@ -0,0 +1,222 @@
+"""
+Tests for the streaming upload reader.
+"""
+
+import io
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from crm.import_utils import (
+    DateParser,
+    iter_record_batches,
+    iter_records,
+    load_records_from_file,
+    parse_date,
+)
+from crm.models import Lead
+from crm.uploads import PREVIEW_UPDATE_LIMIT
+
+HEADER = ["Enquiry No", "Dealer", "State", "KVA", "Enquiry Date", "Remarks"]
+
+
+def csv_upload(rows, name="leads.csv"):
+    lines = [",".join(HEADER)] + [",".join(str(value) for value in row) for row in rows]
+    return SimpleUploadedFile(
+        name, ("\n".join(lines) + "\n").encode(), content_type="text/csv"
+    )
+
+
+def xlsx_upload(rows, name="leads.xlsx"):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(
+        name,
+        buffer.getvalue(),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+def synthetic_rows(count):
+    return [
+        [f"ENQ{idx:07d}", f"Dealer {idx % 50}", "Punjab", 62.5, "01-02-2024", "x" * 40]
+        for idx in range(count)
+    ]
+
+
+def peak_memory(read, upload):
+    tracemalloc.start()
+    try:
+        read(upload)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stream(upload):
+    for batch in iter_record_batches(upload, batch_size=500):
+        pass
+
+
+class StreamingReaderTests(SimpleTestCase):
+    """Rows stream as normalized dicts with memory bounded by the batch size"""
+
+    def test_csv_and_xlsx_rows(self):
+        """Both formats yield the same string rows; blank rows are skipped"""
+        rows = [
+            ["ENQ1", "Dealer A", "Delhi", 125, "01-02-2024", ""],
+            [None] * 6,
+            ["ENQ2", "Dealer B"],
+        ]
+        for upload in (
+            csv_upload([[v if v is not None else "" for v in row] for row in rows]),
+            xlsx_upload(rows),
+        ):
+            with self.subTest(upload=upload.name):
+                records = list(iter_records(upload))
+                self.assertEqual(len(records), 2)
+                self.assertEqual(
+                    records[0],
+                    {
+                        "Enquiry No": "ENQ1",
+                        "Dealer": "Dealer A",
+                        "State": "Delhi",
+                        "KVA": "125",
+                        "Enquiry Date": "01-02-2024",
+                        "Remarks": "",
+                    },
+                )
+                self.assertEqual(records[1]["Dealer"], "Dealer B")
+                self.assertEqual(records[1]["KVA"], "")
+
+    def test_peak_memory_is_bounded(self):
+        """Peak memory tracks the batch size, not the file size"""
+        rows = synthetic_rows(10000)
+        streamed = peak_memory(stream, csv_upload(rows))
+        self.assertLess(
+            streamed, peak_memory(load_records_from_file, csv_upload(rows)) / 4
+        )
+        # 5x the rows, same peak (at most two batches are alive at once)
+        self.assertLess(
+            streamed, peak_memory(stream, csv_upload(synthetic_rows(2000))) * 1.25
+        )
+
+        # XLSX also holds the workbook's shared-string table, so only the rows are bounded
+        rows = synthetic_rows(10000)
+        streamed = peak_memory(stream, xlsx_upload(rows))
+        self.assertLess(
+            streamed, peak_memory(load_records_from_file, xlsx_upload(rows)) / 2
+        )
+
+
+class DateParserTests(SimpleTestCase):
+    """DateParser learns a column's format and always agrees with parse_date"""
+
+    def test_learns_format_and_memoises(self):
+        parser = DateParser(sample_size=5)
+        values = [f"{day:02d}-03-2024" for day in range(1, 21)] * 3
+        self.assertEqual(
+            [parser(value) for value in values], [parse_date(value) for value in values]
+        )
+        self.assertEqual(parser.format, "%d-%m-%Y")
+        self.assertEqual(parser.cache_info().misses, 20)
+        self.assertEqual(parser.cache_info().hits, 40)
+
+    def test_matches_parse_date_under_any_learned_format(self):
+        values = [
+            "05/06/2024",
+            "12/25/2024",
+            "13/01/2024",
+            "2024-02-29",
+            "31-02-2024",
+            "1 May 2024",
+            "01-May-2024",
+            "7 September 2024",
+            " 02-01-2024 ",
+            "nan",
+            "",
+            None,
+            "garbage",
+            20240105,
+        ]
+        for fmt in ("%m/%d/%Y", "%d/%m/%Y", "%d %B %Y", "%Y-%m-%d"):
+            parser = DateParser(sample_size=10**6)
+            parser.format = fmt
+            with self.subTest(format=fmt):
+                self.assertEqual(
+                    [parser(value) for value in values],
+                    [parse_date(value) for value in values],
+                )
+
+    def test_relearns_when_the_format_changes(self):
+        parser = DateParser(sample_size=10)
+        for day in range(1, 11):
+            parser(f"2024-01-{day:02d}")
+        self.assertEqual(parser.format, "%Y-%m-%d")
+        for day in range(1, 11):
+            parser(f"{day} Jan 2024")
+        self.assertEqual(parser.format, "%d %b %Y")
+
+
+class UploadPreviewTests(TestCase):
+    """The preview endpoint consumes the streamed batches"""
+
+    def setUp(self):
+        user = User.objects.create_user(username="uploader", password="pass12345")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_preview_csv(self):
+        Lead.objects.create(enquiry_id="ENQ0000001", dealer="Old Dealer")
+
+        response = self.client.post(
+            "/api/v1/leads/upload/preview/", {"file": csv_upload(synthetic_rows(3))}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_records"], 3)
+        self.assertEqual(response.data["updated_count"], 1)
+        self.assertEqual(
+            [c["enquiry_id"] for c in response.data["new_candidates"]],
+            ["ENQ0000000", "ENQ0000002"],
+        )
+        self.assertEqual(response.data["new_candidates"][0]["raw"]["KVA"], "62.5")
+        self.assertEqual(response.data["updated_preview"][0]["dealer"], "Old Dealer")
+        self.assertEqual(
+            response.data["updated_preview"][0]["changes"]["dealer"],
+            {"from": "Old Dealer", "to": "Dealer 1"},
+        )
+
+    def test_preview_queries_per_batch(self):
+        """Existing leads are loaded once per batch and every change is counted"""
+        Lead.objects.bulk_create(
+            Lead(enquiry_id=f"ENQ{idx:07d}", dealer="Old Dealer", state="Punjab")
+            for idx in range(0, 1200, 2)
+        )
+        upload = csv_upload(synthetic_rows(1200))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/v1/leads/upload/preview/", {"file": upload}
+            )
+        # 3 batches of 500 -> 3 lookups; the other queries stage the rows
+        lead_queries = [query for query in queries if 'FROM "crm_lead"' in query["sql"]]
+        self.assertEqual(len(lead_queries), 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_records"], 1200)
+        self.assertEqual(response.data["updated_count"], 600)
+        self.assertEqual(len(response.data["new_candidates"]), 600)
+        self.assertEqual(len(response.data["updated_preview"]), PREVIEW_UPDATE_LIMIT)
+        self.assertEqual(response.data["field_changes"]["dealer"], 600)
+        self.assertNotIn("state", response.data["field_changes"])
@@ -0,0 +1,109 @@
+"""
+Tests for the staging-table lead merge (SQLite path; COPY formatting on its own).
+"""
+
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.transaction import TransactionManagementError
+from django.test import SimpleTestCase, TestCase
+
+from crm.import_utils import map_row
+from crm.lead_merge import LeadMerge, _copy_text
+from crm.models import Lead, UploadBatch
+
+
+def mapped(enquiry_id, **columns):
+    return map_row({"Enquiry No": enquiry_id, **columns})
+
+
+class LeadMergeTests(TestCase):
+    def test_merge_inserts_and_updates_in_place(self):
+        existing = Lead.objects.create(
+            enquiry_id="ENQ1", dealer="Old", remarks="kept id"
+        )
+        with transaction.atomic():
+            merge = LeadMerge()
+            merge.add(
+                [
+                    mapped(
+                        "ENQ1",
+                        Dealer="New",
+                        **{
+                            "Enquiry Stage": "Closed-Won",
+                            "Enquiry Date": "01-01-2024",
+                            "Enquiry Closure Date": "11-01-2024",
+                        }
+                    ),
+                    mapped("ENQ2", Dealer="First", KVA="62.5"),
+                ]
+            )
+            merge.add([mapped("ENQ2", Dealer="Last", KVA="125")])
+            self.assertEqual(merge.merge(), (1, 1, 0))
+
+        lead = Lead.objects.get(enquiry_id="ENQ1")
+        self.assertEqual(lead.pk, existing.pk)
+        self.assertEqual(lead.dealer, "New")
+        self.assertEqual(lead.remarks, "")
+        self.assertTrue(lead.is_won)
+        self.assertEqual(lead.stage_code, "won")
+        self.assertEqual(lead.close_time_days, 10)
+
+        lead = Lead.objects.get(enquiry_id="ENQ2")
+        self.assertEqual(lead.dealer, "Last")
+        self.assertEqual(lead.kva, Decimal("125"))
+        self.assertEqual(lead.kva_range, "100-200")
+
+    def test_empty_merge_and_reuse_in_one_transaction(self):
+        with transaction.atomic():
+            self.assertEqual(LeadMerge().merge(), (0, 0, 0))
+            merge = LeadMerge()
+            merge.add([mapped("ENQ9")])
+            self.assertEqual(merge.merge(), (1, 0, 0))
+        self.assertTrue(Lead.objects.filter(enquiry_id="ENQ9").exists())
+
+    def test_unchanged_rows_are_not_written(self):
+        rows = [mapped("ENQ1", Dealer="Same", KVA="62.5"), mapped("ENQ2", Dealer="Old")]
+        with transaction.atomic():
+            merge = LeadMerge()
+            merge.add(rows)
+            merge.merge()
+        marker = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        Lead.objects.update(updated_at=marker)
+
+        # A different source alone is no change; the lead only moves batch
+        upload_batch = UploadBatch.objects.create(filename="again.csv")
+        batch = {"source": "again.csv", "upload_batch_id": upload_batch.pk}
+        with transaction.atomic():
+            merge = LeadMerge()
+            merge.add([{**rows[0], **batch}, {**mapped("ENQ2", Dealer="New"), **batch}])
+            self.assertEqual(merge.merge(), (0, 1, 1))
+        lead = Lead.objects.get(enquiry_id="ENQ1")
+        self.assertEqual(lead.updated_at, marker)
+        self.assertEqual(lead.source, "")
+        self.assertEqual(lead.upload_batch, upload_batch)
+        lead = Lead.objects.get(enquiry_id="ENQ2")
+        self.assertEqual(lead.dealer, "New")
+        self.assertNotEqual(lead.updated_at, marker)
+
+
+class LeadMergeUnitTests(SimpleTestCase):
+    def test_requires_transaction(self):
+        with self.assertRaises(TransactionManagementError):
+            LeadMerge()
+
+    def test_copy_text(self):
+        self.assertEqual(_copy_text(None), "\\N")
+        self.assertEqual(_copy_text(True), "t")
+        self.assertEqual(_copy_text(False), "f")
+        self.assertEqual(_copy_text(0), "0")
+        self.assertEqual(_copy_text(Decimal("62.50")), "62.50")
+        self.assertEqual(_copy_text(date(2024, 1, 5)), "2024-01-05")
+        self.assertEqual(
+            _copy_text(datetime(2024, 1, 5, 6, 30, tzinfo=dt_timezone.utc)),
+            "2024-01-05T06:30:00+00:00",
+        )
+        self.assertEqual(_copy_text("a\tb\nc\\d\re"), "a\\tb\\nc\\\\d\\re")
+        self.assertEqual(_copy_text(""), "")
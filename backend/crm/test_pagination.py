@@ -0,0 +1,118 @@
+"""
+Tests for opt-in keyset (cursor) pagination on lead listings.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from crm.models import Lead
+
+
+class KeysetPaginationTests(TestCase):
+    """Walking every cursor page returns each lead exactly once, in order"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        leads = []
+        for idx in range(25):
+            leads.append(
+                Lead(
+                    enquiry_id=f"KEY{idx:03d}",
+                    dealer="Dealer",
+                    source="manual" if idx % 2 else "feb.xlsx",
+                    # Duplicate timestamps, values and NULLs exercise the id tie-breaker
+                    updated_at=now - timedelta(minutes=idx // 3),
+                    order_value=Decimal(1000 * (idx % 4)),
+                    kva=None if idx % 5 == 0 else Decimal(idx % 7),
+                )
+            )
+        Lead.objects.bulk_create(leads)
+        cls.user = User.objects.create_user(username="keyset", password="pass12345")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, params):
+        ids, pages = [], 0
+        response = self.client.get(url, {**params, "pagination": "cursor"})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages += 1
+            ids.extend(row["id"] for row in response.data["results"])
+            if not response.data["next"]:
+                return ids, pages
+            response = self.client.get(response.data["next"])
+
+    def expected_ids(self, queryset, field, descending):
+        rows = list(queryset.values_list(field, "id"))
+        present = sorted(
+            (row for row in rows if row[0] is not None), reverse=descending
+        )
+        missing = sorted((row for row in rows if row[0] is None), reverse=descending)
+        return [pk for _, pk in present + missing]
+
+    def test_walk_all_orderings(self):
+        """Each ordering field pages through the full set without gaps or repeats"""
+        for ordering in [
+            "-updated_at",
+            "updated_at",
+            "kva",
+            "-kva",
+            "-order_value",
+            "followup_count",
+        ]:
+            with self.subTest(ordering=ordering):
+                ids, pages = self.walk(
+                    "/api/v1/leads/", {"ordering": ordering, "page_size": 4}
+                )
+                field = ordering.lstrip("-")
+                self.assertEqual(
+                    ids,
+                    self.expected_ids(
+                        Lead.objects.all(), field, ordering.startswith("-")
+                    ),
+                )
+                self.assertEqual(pages, 7)
+
+    def test_no_count_query_by_default(self):
+        """Cursor pages skip COUNT(*) unless an approximate total is requested"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/v1/leads/", {"pagination": "cursor", "page_size": 5}
+            )
+        self.assertNotIn("count", response.data)
+        self.assertFalse(
+            any("COUNT(" in query["sql"].upper() for query in queries.captured_queries)
+        )
+
+        response = self.client.get(
+            "/api/v1/leads/",
+            {"pagination": "cursor", "include_total": "approx", "page_size": 5},
+        )
+        self.assertEqual(response.data["count"], 25)
+        self.assertIn("count_is_approximate", response.data)
+
+    def test_manual_leads_cursor(self):
+        """ManualLeadsView supports the same cursor mode"""
+        ids, _ = self.walk("/api/v1/leads/manual/", {"page_size": 5})
+        manual = Lead.objects.filter(source="manual")
+        self.assertEqual(ids, self.expected_ids(manual, "updated_at", True))
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is rejected and page-number mode is unchanged"""
+        response = self.client.get("/api/v1/leads/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get("/api/v1/leads/", {"page_size": 10})
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 10)
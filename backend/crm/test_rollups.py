@@ -0,0 +1,268 @@
+"""
+Tests for the LeadDailyFact rollup: write-path maintenance and rollup-backed analytics.
+"""
+
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from crm import services_optimized
+from crm.filters import LeadFilter
+from crm.models import Lead, LeadDailyFact, UploadBatch
+from crm.rollups import (
+    FactDelta,
+    build_chart_payload_from_facts,
+    check_daily_facts,
+    compute_kpis_from_facts,
+    facts_for_filterset,
+    rebuild_daily_facts,
+)
+from crm.test_services_parity import _canonical, _make_leads
+
+
+def _filterset(**params):
+    filterset = LeadFilter(data=params, queryset=Lead.objects.all())
+    assert filterset.is_valid(), filterset.errors
+    return filterset
+
+
+class RollupAnalyticsTests(TestCase):
+    """Rollup-backed KPIs and charts match the base-table engine"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _make_leads(300)
+        rebuild_daily_facts()
+
+    def test_rebuild_is_consistent(self):
+        """A fresh rebuild passes the consistency checker"""
+        self.assertEqual(check_daily_facts(), [])
+
+    def test_rollup_matches_base_table(self):
+        """KPIs and charts from facts equal the base-table aggregates"""
+        filter_sets = [
+            {},
+            {"state": "Punjab"},
+            {"lead_status": "Open"},
+            {"dealer": "Dealer 2", "segment": "Retail"},
+            {"start_date": "2024-01-01", "end_date": date.today().isoformat()},
+            {"date_mode": "enquiry", "start_date": "2025-06-01", "state": "Delhi"},
+        ]
+        for params in filter_sets:
+            with self.subTest(params=params):
+                filterset = _filterset(**params)
+                facts = facts_for_filterset(filterset)
+                self.assertIsNotNone(facts)
+                self.assertEqual(
+                    compute_kpis_from_facts(facts),
+                    services_optimized.compute_kpis(filterset.qs),
+                )
+                self.assertEqual(
+                    _canonical(build_chart_payload_from_facts(facts)),
+                    _canonical(services_optimized.build_chart_payload(filterset.qs)),
+                )
+
+    def test_unsupported_filters_fall_back(self):
+        """Filters outside the rollup dimensions return None"""
+        for params in [
+            {"city": "Ludhiana"},
+            {"lead_stage": "Lost"},
+            {"fy": "FY24"},
+            {"high_value_only": "true"},
+            {"followup_due_only": "true"},
+            {"date_mode": "close", "start_date": "2024-01-01"},
+        ]:
+            with self.subTest(params=params):
+                self.assertIsNone(facts_for_filterset(_filterset(**params)))
+
+    def test_kpi_view_reads_rollup(self):
+        """KPI endpoint does not touch crm_lead when the rollup can answer"""
+        cache.clear()
+        user = User.objects.create_user(username="rollup", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/v1/kpis/", {"state": "Punjab"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            any('"crm_lead"' in query["sql"] for query in queries.captured_queries)
+        )
+        self.assertEqual(
+            response.data["total_leads"], Lead.objects.filter(state="Punjab").count()
+        )
+
+
+class RollupMaintenanceTests(TestCase):
+    """Every lead write path keeps LeadDailyFact consistent"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="admin", password="pass12345", is_staff=True
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.lead = Lead.objects.create(
+            enquiry_id="ROLL001",
+            dealer="Dealer A",
+            state="Punjab",
+            lead_status="Open",
+            lead_stage="Follow Up",
+            enquiry_date=date.today() - timedelta(days=20),
+            order_value=100000,
+        )
+        rebuild_daily_facts()
+
+    def assertConsistent(self):
+        self.assertEqual(check_daily_facts(), [])
+
+    def test_create_and_update(self):
+        """Creating and patching leads through the API updates the rollup"""
+        response = self.client.post(
+            "/api/v1/leads/",
+            {
+                "enquiry_id": "ROLL002",
+                "dealer": "Dealer B",
+                "state": "Delhi",
+                "lead_status": "Open",
+                "enquiry_date": "2024-05-01",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertConsistent()
+
+        response = self.client.patch(
+            f"/api/v1/leads/{self.lead.id}/",
+            {
+                "lead_status": "Closed",
+                "lead_stage": "Closed-Won",
+                "close_date": date.today().isoformat(),
+                "dealer": "Dealer C",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+        self.assertEqual(LeadDailyFact.objects.filter(dealer="Dealer A").count(), 0)
+        self.assertTrue(
+            LeadDailyFact.objects.filter(dealer="Dealer C", is_won=True).exists()
+        )
+
+    def test_upload_create(self):
+        """Upload create applies created and updated leads to the rollup"""
+        rows = [
+            {
+                "Enquiry No": "ROLL001",
+                "Dealer": "Dealer A",
+                "State": "Haryana",
+                "Enquiry Date": "01-02-2024",
+                "Enquiry Stage": "Order Booked",
+                "KVA": "62.5",
+            },
+            {
+                "Enquiry No": "ROLL010",
+                "Dealer": "Dealer Z",
+                "State": "Punjab",
+                "Enquiry Date": "03-02-2024",
+                "Enquiry Closure Date": "20-02-2024",
+                "KVA": "125",
+            },
+            {
+                "Enquiry No": "ROLL010",
+                "Dealer": "Dealer Z",
+                "State": "Punjab",
+                "Enquiry Date": "03-02-2024",
+                "KVA": "125",
+            },
+        ]
+        response = self.client.post(
+            "/api/v1/leads/upload/create/",
+            {"rows": rows, "filename": "feb.xlsx"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+
+        rows[0]["Enquiry Stage"] = "Closed-Lost"
+        rows[0]["Enquiry Closure Date"] = "11-02-2024"
+        response = self.client.post(
+            "/api/v1/leads/upload/create/",
+            {"rows": rows[:1], "filename": "feb.xlsx"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+        self.assertEqual(Lead.objects.get(enquiry_id="ROLL001").close_time_days, 10)
+
+    def test_bulk_and_upload_delete(self):
+        """Bulk delete and upload rollback subtract leads from the rollup"""
+        upload_batch = UploadBatch.objects.create(filename="march.csv")
+        uploaded = [
+            Lead(
+                enquiry_id=f"UP{idx}",
+                dealer="Dealer U",
+                source="march.csv",
+                upload_batch=upload_batch,
+                enquiry_date=date(2024, 3, 1 + idx),
+                lead_status="Closed",
+                close_date=date(2024, 3, 10),
+            )
+            for idx in range(5)
+        ]
+        Lead.objects.bulk_create(uploaded)
+        rebuild_daily_facts()
+
+        response = self.client.post(
+            "/api/v1/admin/bulk-delete-leads/",
+            {"lead_ids": [self.lead.id]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+
+        response = self.client.delete(
+            "/api/v1/leads/upload/history/",
+            {"upload_key": upload_batch.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+        self.assertEqual(LeadDailyFact.objects.count(), 0)
+
+    def test_fact_key_is_unique(self):
+        """The rollup holds one row per key, dated or not"""
+        for enquiry_date in (date(2024, 1, 1), None):
+            LeadDailyFact.objects.create(enquiry_date=enquiry_date, dealer="Dealer K")
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                LeadDailyFact.objects.create(
+                    enquiry_date=enquiry_date, dealer="Dealer K"
+                )
+
+    def test_concurrent_new_key(self):
+        """A key another writer inserted after the read is added to, not duplicated"""
+        lead = Lead(enquiry_id="ROLL009", dealer="Race Dealer", lead_status="Open")
+        delta = FactDelta()
+        delta.add(lead)
+        real_bulk_create = LeadDailyFact.objects.bulk_create
+
+        def other_writer_first(rows, **kwargs):
+            LeadDailyFact.objects.create(
+                dealer="Race Dealer", lead_status="Open", lead_count=2
+            )
+            return real_bulk_create(rows, **kwargs)
+
+        with mock.patch.object(
+            LeadDailyFact.objects, "bulk_create", side_effect=other_writer_first
+        ):
+            delta.apply()
+        facts = LeadDailyFact.objects.filter(dealer="Race Dealer")
+        self.assertEqual(list(facts.values_list("lead_count", flat=True)), [3])
@@ -0,0 +1,117 @@
+"""
+Tests for indexed lead search (autocomplete and ?search=).
+"""
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from crm.models import Lead, LeadSearchToken
+from crm.search import lead_tokens, rebuild_search_index
+
+
+class LeadSearchTests(TestCase):
+    """Search uses the index, ranks matches and follows lead writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = [
+            ("ENQ-1001", "Tata Motors", "Asha", "Delhi", "New Delhi", "Retail"),
+            ("ENQ-1002", "Delhi Gensets", "Ravi", "Punjab", "Ludhiana", "Telecom"),
+            ("ENQ-2100", "Power House", "Asha", "Haryana", "Gurgaon", "Infra"),
+            ("SRV-9910", "Tata Projects", "Meena", "Delhi", "Delhi", "Infra"),
+        ]
+        Lead.objects.bulk_create(
+            Lead(
+                enquiry_id=enquiry_id,
+                dealer=dealer,
+                owner=owner,
+                state=state,
+                city=city,
+                segment=segment,
+            )
+            for enquiry_id, dealer, owner, state, city, segment in rows
+        )
+        rebuild_search_index()
+        cls.user = User.objects.create_user(username="searcher", password="pass12345")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get("/api/v1/leads/", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["enquiry_id"] for row in response.data["results"])
+
+    def test_tokens(self):
+        """Values are stored whole and per word; enquiry_id also by suffix"""
+        tokens = lead_tokens({"enquiry_id": "ENQ-1001", "dealer": "Tata Motors"})
+        self.assertTrue(
+            {"enq-1001", "enq", "1001", "q-1001", "001", "tata motors", "motors"}
+            <= tokens
+        )
+        self.assertNotIn("otors", tokens)
+
+    def test_search_filter(self):
+        """?search= matches every term in any field"""
+        self.assertEqual(self.search(search="tata"), ["ENQ-1001", "SRV-9910"])
+        self.assertEqual(self.search(search="delhi infra"), ["SRV-9910"])
+        self.assertEqual(self.search(search="asha, gurg"), ["ENQ-2100"])
+        self.assertEqual(
+            self.search(search="100"), ["ENQ-1001", "ENQ-1002", "ENQ-2100"]
+        )
+        self.assertEqual(self.search(search="nomatch"), [])
+
+    def test_autocomplete_ranking(self):
+        """Exact matches beat prefix matches; field weight breaks ties"""
+        response = self.client.get("/api/v1/leads/search/", {"q": "ENQ-1001"})
+        self.assertEqual(
+            [row["enquiry_id"] for row in response.data["results"]], ["ENQ-1001"]
+        )
+
+        response = self.client.get("/api/v1/leads/search/", {"q": "delhi"})
+        ids = [row["enquiry_id"] for row in response.data["results"]]
+        # exact city, exact state, then dealer prefix
+        self.assertEqual(ids, ["SRV-9910", "ENQ-1001", "ENQ-1002"])
+
+        response = self.client.get("/api/v1/leads/search/", {"q": "e"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_uses_token_index(self):
+        """Without pg_trgm the search goes through LeadSearchToken"""
+        if connection.vendor == "postgresql":
+            self.skipTest("trigram indexes are used on PostgreSQL")
+        with CaptureQueriesContext(connection) as queries:
+            self.search(search="tata")
+        select = next(
+            query["sql"]
+            for query in queries.captured_queries
+            if "LIMIT" in query["sql"]
+        )
+        self.assertIn("crm_leadsearchtoken", select)
+        self.assertNotIn("LIKE", select)
+
+    def test_tokens_follow_writes(self):
+        """Creating and updating leads through the API re-indexes them"""
+        lead = Lead.objects.get(enquiry_id="ENQ-2100")
+        response = self.client.patch(
+            f"/api/v1/leads/{lead.id}/", {"dealer": "Kirloskar Traders"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search(search="kirlo"), ["ENQ-2100"])
+        self.assertEqual(self.search(search="power"), [])
+
+        response = self.client.post(
+            "/api/v1/leads/",
+            {"enquiry_id": "NEW-77", "dealer": "Zenith Power"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.search(search="zenith"), ["NEW-77"])
+
+        Lead.objects.filter(enquiry_id="NEW-77").delete()
+        self.assertFalse(LeadSearchToken.objects.filter(token="zenith").exists())
@@ -0,0 +1,64 @@
+"""
+Tests for the values()-based lead list serializer and ?fields= sparse fieldsets.
+"""
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from crm.models import Lead
+from crm.serializers import FastLeadListSerializer, LeadSerializer
+from crm.test_services_parity import _make_leads
+
+
+class FastLeadListSerializerTests(TestCase):
+    """FastLeadListSerializer renders exactly what LeadSerializer does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _make_leads(60)
+        Lead.objects.filter(pk__in=Lead.objects.values("pk")[:5]).update(
+            kva="62.50", email="a@b.co"
+        )
+        cls.user = User.objects.create_user(username="fast", password="pass12345")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_matches_lead_serializer(self):
+        """Every field matches the DRF serializer output"""
+        queryset = Lead.objects.order_by("id")
+        fast = FastLeadListSerializer()
+        expected = LeadSerializer(queryset, many=True).data
+        rows = fast.render(queryset.values(*fast.db_fields))
+        self.assertEqual([dict(item) for item in expected], rows)
+
+    def test_sparse_fields(self):
+        """?fields= limits both the payload and the selected columns"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/v1/leads/",
+                {"fields": "enquiry_id,dealer,is_high_value", "page_size": 5},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 60)
+        self.assertEqual(
+            list(response.data["results"][0]),
+            ["id", "enquiry_id", "dealer", "is_high_value"],
+        )
+        select = next(
+            query["sql"]
+            for query in queries.captured_queries
+            if "LIMIT" in query["sql"]
+        )
+        self.assertNotIn('"remarks"', select)
+        self.assertIn('"order_value"', select)
+
+    def test_unknown_field_rejected(self):
+        """Unknown field names are a validation error"""
+        response = self.client.get("/api/v1/leads/", {"fields": "enquiry_id,password"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,306 @@
+"""
+Parity tests: the SQL aggregation engine (services_optimized) must return the
+same payloads as the reference Python implementations (services, and the
+frontend's former client-side insights).
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from crm import services, services_optimized
+from crm.models import Lead
+
+STATUSES = ["Open", "Closed", "open", " Open ", "OPEN", "Pending", ""]
+STAGES = [
+    "Closed-Won",
+    " order booked ",
+    "ORDER BOOKED",
+    "Closed-Lost",
+    "Lost",
+    "Won",
+    "Open",
+    "Follow Up",
+    "",
+]
+SEGMENTS = ["Retail", "Telecom", "Infra", "Healthcare", ""]
+LOSS_REASONS = ["Price", "Competition", "Budget", ""]
+STATES = ["Punjab", "Haryana", "Delhi"]
+OWNERS = ["Asha", "Ravi", "Unassigned", ""]
+
+# Lists whose ordering between equal values is implementation-defined
+TIE_SORTED_KEYS = {
+    "segmentDistribution": lambda item: (item["value"], item["segment"]),
+    "segmentStatus": lambda item: (item["open"] + item["closed"], item["segment"]),
+    "segmentCloseDays": lambda item: (item["avgCloseDays"], item["segment"]),
+    "loss_reasons": lambda item: (item["value"], item["label"]),
+    "lossReasons": lambda item: (item["value"], item["label"]),
+    "fastestSegments": lambda item: (item["avg_close_time"], item["segment"]),
+    "employeeConversion": lambda item: (item["conversion"], item["owner"]),
+    "followupVsConversion": lambda item: (item["conversion"], item["owner"]),
+}
+
+
+def _canonical(payload):
+    return {
+        key: (
+            sorted(value, key=TIE_SORTED_KEYS[key]) if key in TIE_SORTED_KEYS else value
+        )
+        for key, value in payload.items()
+    }
+
+
+def _js_round(value, digits=0):
+    # Math.round / toFixed on the values used here (no binary-float edge cases)
+    scaled = int(Decimal(repr(value)) * 10**digits + Decimal("0.5"))
+    return scaled if digits == 0 else scaled / 10**digits
+
+
+def _close_days(lead):
+    # Derived from the dates, independently of the stored close_time_days column
+    if not (lead.enquiry_date and lead.close_date):
+        return None
+    return max((lead.close_date - lead.enquiry_date).days, 0)
+
+
+def _reference_insights(queryset):
+    """Python port of the frontend's former buildInsightsFromDataset, run over every lead."""
+    today = timezone.now().date()
+    leads = list(queryset)
+    loss, segments, employees, forecast = {}, {}, {}, {}
+    clusters = {
+        key: {"count": 0, "close": 0, "followups": 0}
+        for key in ("fast", "long", "engage", "passive")
+    }
+    for lead in leads:
+        status = (lead.lead_status or "").strip().lower()
+        lost_stage = "lost" in (lead.lead_stage or "").strip().lower()
+        if lost_stage or (status == "closed" and not lead.win_flag):
+            label = lead.loss_reason or ("Lost" if lost_stage else "Closed")
+            loss[label] = loss.get(label, 0) + 1
+
+        close_days = _close_days(lead) or None
+        if lead.segment and close_days:
+            segments.setdefault(lead.segment, []).append(close_days)
+
+        key = "passive"
+        if close_days and close_days <= 30:
+            key = "fast"
+        elif lead.followup_count >= 4 and close_days and close_days > 45:
+            key = "long"
+        elif lead.followup_count >= 2:
+            key = "engage"
+        clusters[key]["count"] += 1
+        clusters[key]["close"] += close_days or 0
+        clusters[key]["followups"] += lead.followup_count
+
+        owner = employees.setdefault(lead.owner or "Unassigned", [0, 0, 0])
+        owner[0] += 1
+        owner[1] += 1 if lead.win_flag else 0
+        owner[2] += lead.followup_count
+
+        bucket = forecast.setdefault(
+            f"{lead.month}-{lead.fy}" if lead.month and lead.fy else "Unknown", [0, 0]
+        )
+        bucket[0] += 1
+        bucket[1] += 1 if lead.win_flag else 0
+
+    labels = dict(
+        (key, (label, color))
+        for key, label, color in services_optimized.INSIGHT_CLUSTERS
+    )
+    employee_conversion = [
+        {
+            "owner": owner,
+            "conversion": _js_round(wins / total * 100, 1),
+            "leads": total,
+            "avgFollowups": _js_round(followups / total, 1),
+        }
+        for owner, (total, wins, followups) in employees.items()
+    ]
+    return {
+        "highValueCount": sum(1 for lead in leads if lead.is_high_value),
+        "overdueFollowups": sum(
+            1
+            for lead in leads
+            if (lead.lead_status or "").strip().lower() == "open"
+            and lead.next_followup_date
+            and lead.next_followup_date < today
+        ),
+        "lossReasons": [
+            {"label": label, "value": value} for label, value in loss.items()
+        ],
+        "fastestSegments": [
+            {"segment": segment, "avg_close_time": _js_round(sum(values) / len(values))}
+            for segment, values in segments.items()
+        ],
+        "clusters": [
+            {
+                "label": labels[key][0],
+                "value": stats["count"],
+                "avgClose": _js_round(stats["close"] / stats["count"]),
+                "avgFollowups": _js_round(stats["followups"] / stats["count"], 1),
+                "color": labels[key][1],
+            }
+            for key, stats in clusters.items()
+            if stats["count"]
+        ],
+        "employeeConversion": employee_conversion,
+        "followupVsConversion": [
+            {
+                "owner": item["owner"],
+                "conversion": item["conversion"],
+                "followups": item["avgFollowups"],
+            }
+            for item in employee_conversion
+            if item["leads"] >= 2
+        ],
+        "forecastSummary": [
+            {
+                "label": label,
+                "leads": total,
+                "conversion_pct": round(wins / total * 100, 1),
+            }
+            for label, (total, wins) in sorted(forecast.items())
+        ],
+        "cycleTimes": {
+            field: _reference_cycle_times(leads, field)
+            for field in services_optimized.CYCLE_TIME_FIELDS
+        },
+    }
+
+
+def _reference_cycle_times(leads, field):
+    groups = {}
+    for lead in leads:
+        group = groups.setdefault(
+            getattr(lead, field) or "Unspecified", {"leads": 0, "close": [], "age": []}
+        )
+        group["leads"] += 1
+        if _close_days(lead) is not None:
+            group["close"].append(_close_days(lead))
+        if lead.lead_age_days is not None:
+            group["age"].append(lead.lead_age_days)
+
+    def average(values):
+        return round(sum(values) / len(values)) if values else None
+
+    return sorted(
+        [
+            {
+                "label": label,
+                "leads": group["leads"],
+                "avgCloseDays": average(group["close"]),
+                "avgLeadAge": average(group["age"]),
+            }
+            for label, group in groups.items()
+        ],
+        key=lambda item: (-item["leads"], item["label"]),
+    )
+
+
+def _make_leads(count, seed=7):
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    leads = []
+    for idx in range(count):
+        enquiry_date = None
+        if rng.random() > 0.1:
+            enquiry_date = today - timedelta(days=rng.randint(-5, 700))
+        close_date = None
+        if enquiry_date and rng.random() > 0.4:
+            # Includes same-day and "closed before enquiry" rows
+            close_date = enquiry_date + timedelta(days=rng.randint(-3, 120))
+        next_followup = None
+        if rng.random() > 0.3:
+            next_followup = today + timedelta(days=rng.randint(-30, 30))
+        leads.append(
+            Lead(
+                enquiry_id=f"PAR{idx:04d}",
+                dealer=f"Dealer {idx % 6}",
+                state=rng.choice(STATES),
+                lead_status=rng.choice(STATUSES),
+                lead_stage=rng.choice(STAGES),
+                segment=rng.choice(SEGMENTS),
+                loss_reason=rng.choice(LOSS_REASONS),
+                enquiry_date=enquiry_date,
+                close_date=close_date,
+                next_followup_date=next_followup,
+                order_value=Decimal(
+                    rng.choice([0, 250000, 999999.5, 1000000, 3500000])
+                ),
+                updated_at=timezone.now() - timedelta(minutes=idx),
+                owner=rng.choice(OWNERS),
+                followup_count=rng.randint(0, 6),
+                win_flag=rng.random() > 0.7,
+                month=rng.choice(["", "Apr", "May"]),
+                fy=rng.choice(["", "FY24", "FY25"]),
+            )
+        )
+    for lead in leads:
+        lead.refresh_derived_fields()
+    Lead.objects.bulk_create(leads)
+
+
+class AnalyticsParityTests(TestCase):
+    """services_optimized must match services field for field"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _make_leads(400)
+
+    def assert_parity(self, queryset):
+        self.assertEqual(
+            services_optimized.compute_kpis(queryset),
+            services.compute_kpis(queryset),
+        )
+        self.assertEqual(
+            _canonical(services_optimized.build_chart_payload(queryset)),
+            _canonical(services.build_chart_payload(queryset)),
+        )
+        self.assertEqual(
+            _canonical(services_optimized.build_insights(queryset)),
+            _canonical(_reference_insights(queryset)),
+        )
+
+    def test_full_table_parity(self):
+        """Unfiltered dataset produces identical payloads"""
+        self.assert_parity(Lead.objects.all())
+
+    def test_filtered_parity(self):
+        """Filtered querysets produce identical payloads"""
+        for state in STATES:
+            with self.subTest(state=state):
+                self.assert_parity(Lead.objects.filter(state=state))
+        self.assert_parity(
+            Lead.objects.filter(enquiry_date__gte=date(2000, 1, 1), lead_status="Open")
+        )
+
+    def test_empty_queryset_parity(self):
+        """Empty querysets produce identical zero payloads"""
+        self.assert_parity(Lead.objects.none())
+        self.assert_parity(Lead.objects.filter(state="Nowhere"))
+
+    def test_ranked_lists_are_ordered(self):
+        """Ranked chart lists are ordered by their metric"""
+        charts = services_optimized.build_chart_payload(Lead.objects.all())
+        values = [item["value"] for item in charts["segmentDistribution"]]
+        self.assertEqual(values, sorted(values, reverse=True))
+        close_days = [item["avgCloseDays"] for item in charts["segmentCloseDays"]]
+        self.assertEqual(close_days, sorted(close_days, reverse=True))
+
+        insights = services_optimized.build_insights(Lead.objects.all())
+        close_times = [item["avg_close_time"] for item in insights["fastestSegments"]]
+        self.assertEqual(close_times, sorted(close_times))
+        conversions = [item["conversion"] for item in insights["employeeConversion"]]
+        self.assertEqual(conversions, sorted(conversions, reverse=True))
+
+    def test_kpis_use_single_query(self):
+        """KPIs are computed with one aggregate query"""
+        with self.assertNumQueries(1):
+            services_optimized.compute_kpis(Lead.objects.all())
+        with self.assertNumQueries(1):
+            services_optimized.build_chart_payload(Lead.objects.all())
@@ -0,0 +1,173 @@
+"""
+Tests for staged uploads: preview stages mapped rows, commit applies them by token.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from crm.models import Lead, StagedUpload
+from crm.test_import_utils import csv_upload, synthetic_rows
+
+PREVIEW_URL = "/api/v1/leads/upload/preview/"
+COMMIT_URL = "/api/v1/leads/upload/commit/"
+
+
+class StagedUploadTests(TestCase):
+    def setUp(self):
+        # Upload endpoints are rate limited per user
+        cache.clear()
+        self.user = User.objects.create_user(username="uploader", password="pass12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def preview(self, rows, name="leads.csv"):
+        response = self.client.post(PREVIEW_URL, {"file": csv_upload(rows, name=name)})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def commit(self, token, **body):
+        return self.client.post(
+            COMMIT_URL, {"upload_token": token, **body}, format="json"
+        )
+
+    def test_preview_stages_rows_and_commit_applies_them(self):
+        Lead.objects.create(enquiry_id="ENQ0000001", dealer="Old Dealer")
+        preview = self.preview(synthetic_rows(3))
+        staged = StagedUpload.objects.get(token=preview["upload_token"])
+        self.assertEqual(staged.row_count, 3)
+        self.assertEqual(
+            list(staged.rows.order_by("row_number").values_list("is_new", flat=True)),
+            [True, False, True],
+        )
+
+        # The file is not mapped a second time
+        with mock.patch(
+            "crm.uploads.map_rows", side_effect=AssertionError("re-parsed")
+        ):
+            response = self.commit(preview["upload_token"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(
+            response.data["created_enquiry_ids"], ["ENQ0000000", "ENQ0000002"]
+        )
+
+        lead = Lead.objects.get(enquiry_id="ENQ0000002")
+        self.assertEqual(lead.dealer, "Dealer 2")
+        self.assertEqual(lead.kva, Decimal("62.5"))
+        self.assertEqual(lead.enquiry_date, date(2024, 2, 1))
+        self.assertEqual(lead.source, "leads.csv")
+        self.assertEqual(Lead.objects.get(enquiry_id="ENQ0000001").dealer, "Dealer 1")
+
+        # Single use
+        self.assertFalse(StagedUpload.objects.exists())
+        self.assertEqual(self.commit(preview["upload_token"]).status_code, 404)
+
+    def test_skip_and_remarks(self):
+        rows = synthetic_rows(3)
+        rows[1][-1] = "Lost on price"
+        preview = self.preview(rows)
+
+        response = self.commit(
+            preview["upload_token"],
+            skip_enquiry_ids=["ENQ0000000"],
+            remarks={"ENQ0000001": "  Called twice  "},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["created_enquiry_ids"], ["ENQ0000001", "ENQ0000002"]
+        )
+        lead = Lead.objects.get(enquiry_id="ENQ0000001")
+        self.assertEqual(lead.remarks, "Called twice")
+        self.assertEqual(lead.loss_reason, "")
+
+    def test_row_cap_and_batches(self):
+        preview = self.preview(synthetic_rows(1200))
+        # Larger uploads go through the import worker
+        response = self.commit(preview["upload_token"])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Lead.objects.exists())
+
+        skip = [f"ENQ{idx:07d}" for idx in range(200)]
+        response = self.commit(preview["upload_token"], skip_enquiry_ids=skip)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1000)
+        self.assertEqual(Lead.objects.count(), 1000)
+
+    def test_reupload_skips_unchanged_rows(self):
+        rows = synthetic_rows(3)
+        self.commit(self.preview(rows)["upload_token"])
+        marker = timezone.now() - timedelta(days=7)
+        Lead.objects.update(updated_at=marker)
+
+        rows[1][1] = "Dealer X"
+        preview = self.preview(rows, name="again.csv")
+        self.assertEqual(preview["unchanged_count"], 2)
+        self.assertEqual(preview["updated_count"], 1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.commit(preview["upload_token"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (
+                response.data["created"],
+                response.data["updated"],
+                response.data["unchanged"],
+            ),
+            (0, 1, 2),
+        )
+
+        # Only the changed column is written; unchanged leads just move batch
+        updates = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('UPDATE "crm_lead"')
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertIn('"dealer"', updates[0])
+        self.assertNotIn('"state"', updates[0])
+        self.assertTrue(
+            updates[1].startswith('UPDATE "crm_lead" SET "upload_batch_id"')
+        )
+        self.assertNotIn('"source"', updates[1])
+
+        leads = {lead.enquiry_id: lead for lead in Lead.objects.all()}
+        self.assertEqual(leads["ENQ0000001"].dealer, "Dealer X")
+        self.assertEqual(leads["ENQ0000001"].source, "again.csv")
+        self.assertEqual(leads["ENQ0000000"].source, "leads.csv")
+        self.assertEqual(leads["ENQ0000000"].updated_at, marker)
+
+    def test_token_is_private_and_expires(self):
+        preview = self.preview(synthetic_rows(2))
+        other = User.objects.create_user(username="other", password="pass12345")
+        client = APIClient()
+        client.force_authenticate(other)
+        response = client.post(
+            COMMIT_URL, {"upload_token": preview["upload_token"]}, format="json"
+        )
+        self.assertEqual(response.status_code, 404)
+
+        StagedUpload.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.commit(preview["upload_token"]).status_code, 404)
+        # The next preview purges it
+        self.preview(synthetic_rows(1))
+        self.assertEqual(StagedUpload.objects.count(), 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.commit("not-a-token").status_code, 400)
+        preview = self.preview(synthetic_rows(1))
+        response = self.commit(preview["upload_token"], skip_enquiry_ids="ENQ0000000")
+        self.assertEqual(response.status_code, 400)
+        # Skipping everything applies nothing and keeps the token
+        response = self.commit(preview["upload_token"], skip_enquiry_ids=["ENQ0000000"])
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(StagedUpload.objects.exists())
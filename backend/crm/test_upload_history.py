@@ -0,0 +1,135 @@
+"""
+Tests for the UploadBatch registry behind the upload history endpoint.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from crm.models import Lead, UploadBatch
+
+CREATE_URL = "/api/v1/leads/upload/create/"
+HISTORY_URL = "/api/v1/leads/upload/history/"
+
+
+def rows(count, dealer="Dealer"):
+    return [
+        {"Enquiry No": f"HIST{idx:03d}", "Dealer": f"{dealer} {idx}"}
+        for idx in range(count)
+    ]
+
+
+class UploadHistoryTests(TestCase):
+    def setUp(self):
+        # Upload endpoints are rate limited per user
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="admin", password="pass12345", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, rows, filename="leads.csv"):
+        response = self.client.post(
+            CREATE_URL, {"rows": rows, "filename": filename}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return UploadBatch.objects.get(pk=response.data["upload_batch"])
+
+    def test_upload_records_batch(self):
+        upload_batch = self.upload(rows(3) + [{"Dealer": "No id"}])
+        self.assertEqual(upload_batch.user, self.user)
+        self.assertEqual(upload_batch.filename, "leads.csv")
+        self.assertEqual(
+            (
+                upload_batch.total_rows,
+                upload_batch.created_count,
+                upload_batch.updated_count,
+                upload_batch.unchanged_count,
+                upload_batch.error_count,
+            ),
+            (4, 3, 0, 0, 1),
+        )
+        self.assertIsNotNone(upload_batch.duration_seconds)
+        self.assertEqual(Lead.objects.filter(upload_batch=upload_batch).count(), 3)
+
+    def test_history_lists_batches(self):
+        first = self.upload(rows(3), "first.csv")
+        # Every lead of the later file moves to its batch, changed or not
+        changed = rows(3)
+        changed[0]["Dealer"] = "Renamed"
+        second = self.upload(changed, "second.csv")
+        Lead.objects.create(enquiry_id="MANUAL1", dealer="Walk-in", source="manual")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(HISTORY_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries.captured_queries), 2)
+        self.assertEqual(response.data["total_uploads"], 2)
+        self.assertEqual(response.data["manual_leads_count"], 1)
+        latest, earlier = response.data["uploads"]
+        self.assertEqual(
+            (latest["upload_key"], latest["filename"]), (str(second.pk), "second.csv")
+        )
+        self.assertEqual(
+            (latest["lead_count"], latest["updated_count"], latest["unchanged_count"]),
+            (3, 1, 2),
+        )
+        self.assertEqual(latest["uploaded_by"], "admin")
+        self.assertEqual(
+            (earlier["upload_key"], earlier["lead_count"]), (str(first.pk), 0)
+        )
+
+    def test_delete_by_upload_key(self):
+        first = self.upload(rows(2), "same.csv")
+        second = self.upload(rows(4, dealer="Other"), "same.csv")
+        self.assertEqual(Lead.objects.filter(upload_batch=first).count(), 0)
+
+        # Small uploads are deleted within the request
+        response = self.client.delete(
+            HISTORY_URL, {"upload_key": second.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["deleted_count"], 4)
+        self.assertFalse(Lead.objects.exists())
+        self.assertEqual(list(UploadBatch.objects.all()), [first])
+
+    def test_delete_errors(self):
+        self.assertEqual(
+            self.client.delete(HISTORY_URL, {}, format="json").status_code, 400
+        )
+        self.assertEqual(
+            self.client.delete(
+                HISTORY_URL, {"upload_key": "leads.csv"}, format="json"
+            ).status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.delete(
+                HISTORY_URL, {"upload_key": 999}, format="json"
+            ).status_code,
+            404,
+        )
+
+        upload_batch = self.upload(rows(1))
+        self.client.force_authenticate(
+            User.objects.create_user(username="user", password="pass12345")
+        )
+        response = self.client.delete(
+            HISTORY_URL, {"upload_key": upload_batch.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Lead.objects.exists())
+
+    def test_rejected_upload_leaves_no_batch(self):
+        response = self.client.post(
+            CREATE_URL,
+            {"rows": [{"Dealer": "No id"}], "filename": "x.csv"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadBatch.objects.exists())
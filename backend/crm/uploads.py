@@ -0,0 +1,442 @@
+"""
+Batch upsert of uploaded lead rows.
+
+UploadWriter maps raw rows with the columnar map_rows() and applies them
+one batch at a time: existing leads are loaded with one query per batch,
+new leads are bulk-created and existing ones bulk-updated, and the daily
+rollup, facet dictionary and search tokens are patched per batch, so
+memory is bounded by the batch size rather than the upload. Callers own the transaction.
+
+UploadPreview is the counterpart used by the preview endpoint: it diffs
+each batch against the stored leads with one values() query and stages
+the mapped rows in StagedUploadRow, so the commit endpoint applies them by
+upload token (staged_batches) without parsing the file a second time,
+or hands them to the background import worker (imports.py).
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .import_columnar import map_rows
+from .import_utils import UPLOAD_BATCH_SIZE, infer_loss_reason, serialize_for_preview
+from .models import ImportJob, Lead, StagedUpload, StagedUploadRow, row_hash_for
+from .rollups import FactDelta, fact_snapshot
+from .search import sync_search_tokens
+
+# Columns an upload may overwrite on an existing lead
+UPDATE_FIELDS = [
+    "enquiry_date",
+    "close_date",
+    "lead_stage",
+    "lead_status",
+    "enquiry_type",
+    "dealer",
+    "corporate_name",
+    "address",
+    "area_office",
+    "branch",
+    "customer_type",
+    "dg_ownership",
+    "district",
+    "state",
+    "city",
+    "tehsil",
+    "zone",
+    "segment",
+    "sub_segment",
+    "source",
+    "source_from",
+    "events",
+    "finance_company",
+    "finance_required",
+    "owner",
+    "owner_code",
+    "owner_status",
+    "email",
+    "phone_number",
+    "pan_number",
+    "phase",
+    "pincode",
+    "location",
+    "kva",
+    "kva_range",
+    "quantity",
+    "order_value",
+    "win_flag",
+    "loss_reason",
+    "remarks",
+    "followup_count",
+    "last_followup_date",
+    "next_followup_date",
+    "referred_by",
+    "uploaded_by",
+    "created_by",
+    "fy",
+    "month",
+    "week",
+    *Lead.DERIVED_FIELDS,
+    "updated_at",
+]
+# Updated leads whose field-level changes are returned by the preview
+PREVIEW_UPDATE_LIMIT = 15
+# How long a previewed upload can still be committed
+STAGING_TTL = timedelta(hours=2)
+
+
+def _serialize_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def reattribute_unchanged(leads, upload_batch):
+    """
+    Point unchanged leads of an upload at its batch. A lead belongs to the
+    latest upload that contained it, changed or not, so deleting an upload
+    removes exactly the leads of its file. Content, source and updated_at
+    are left alone.
+    """
+    return leads.exclude(upload_batch=upload_batch).update(upload_batch=upload_batch)
+
+
+class UploadWriter:
+    """
+    Upserts uploaded rows into Lead, one batch per write() call.
+
+    A repeated enquiry_id keeps its last row. Existing leads whose row_hash
+    matches the row are counted in ``unchanged`` and keep their content,
+    source and updated_at; the others are updated in only the columns that
+    changed within the batch. Row-level problems are collected in ``errors``
+    instead of aborting the upload. Every lead of the upload, unchanged ones
+    included, points at ``upload_batch``, whose counts finish() records.
+    """
+
+    def __init__(self, source, batch_size=UPLOAD_BATCH_SIZE, upload_batch=None):
+        self.source = source
+        self.batch_size = batch_size
+        self.upload_batch = upload_batch
+        self.created_enquiry_ids = []
+        self.updated_enquiry_ids = set()
+        self.unchanged = 0
+        self.total_rows = 0
+        self.valid_rows = 0
+        self.errors = []
+
+    @property
+    def created(self):
+        return len(self.created_enquiry_ids)
+
+    @property
+    def updated(self):
+        return len(self.updated_enquiry_ids)
+
+    def write(self, rows):
+        """Map and apply one batch of (row number, raw row dict) pairs."""
+        rows = list(rows)
+        mapped_rows = []
+        for (row_num, _), mapped in zip(rows, map_rows([raw for _, raw in rows])):
+            if isinstance(mapped, Exception):
+                self.total_rows += 1
+                self.errors.append(f"Row {row_num}: {str(mapped)[:100]}")
+                continue
+            mapped_rows.append((row_num, mapped))
+        self.write_mapped(mapped_rows)
+
+    def write_mapped(self, rows):
+        """Apply one batch of (row number, map_row() dict) pairs."""
+        mapped_rows = {}
+        for row_num, mapped in rows:
+            self.total_rows += 1
+            enquiry_id = mapped.get("enquiry_id")
+            if not enquiry_id:
+                self.errors.append(f"Row {row_num}: Missing enquiry_id")
+                continue
+            self.valid_rows += 1
+            mapped_rows[enquiry_id] = mapped
+        if not mapped_rows:
+            return
+
+        existing_leads = {
+            lead.enquiry_id: lead
+            for lead in Lead.objects.filter(
+                enquiry_id__in=list(mapped_rows)
+            ).select_for_update()
+        }
+        now = timezone.now()
+        leads_to_create = []
+        leads_to_update = []
+        # Columns that differ on at least one updated lead of the batch
+        changed_fields = set()
+        # Rollup inputs of existing leads, captured before they are overwritten
+        previous_facts = {}
+        unchanged_ids = []
+        for enquiry_id, mapped in mapped_rows.items():
+            lead = existing_leads.get(enquiry_id)
+            if lead is None:
+                lead = Lead(**{k: v for k, v in mapped.items() if k != "updated_at"})
+                leads_to_create.append(lead)
+            else:
+                # Same content as stored: leave the lead, its source and updated_at alone
+                if lead.row_hash == (mapped.get("row_hash") or row_hash_for(mapped)):
+                    self.unchanged += 1
+                    unchanged_ids.append(lead.pk)
+                    continue
+                previous_facts[enquiry_id] = fact_snapshot(lead)
+                for key in Lead.HASH_FIELDS:
+                    if key in mapped and getattr(lead, key) != mapped[key]:
+                        setattr(lead, key, mapped[key])
+                        changed_fields.add(key)
+                leads_to_update.append(lead)
+            # The upload's filename is the source of every lead it touches
+            lead.source = self.source
+            lead.upload_batch = self.upload_batch
+            lead.updated_at = now
+            lead.refresh_derived_fields()
+
+        facts = FactDelta()
+        created = self._create(leads_to_create, facts)
+        update_fields = [
+            *sorted(changed_fields),
+            "source",
+            "upload_batch",
+            "updated_at",
+            *Lead.DERIVED_FIELDS,
+        ]
+        updated = self._update(leads_to_update, update_fields, previous_facts, facts)
+        facts.apply()
+        if unchanged_ids and self.upload_batch is not None:
+            reattribute_unchanged(
+                Lead.objects.filter(pk__in=unchanged_ids), self.upload_batch
+            )
+        sync_search_tokens(created + updated)
+
+        self.created_enquiry_ids.extend(lead.enquiry_id for lead in created)
+        created_ids = set(self.created_enquiry_ids)
+        self.updated_enquiry_ids.update(
+            lead.enquiry_id for lead in updated if lead.enquiry_id not in created_ids
+        )
+
+    def finish(self):
+        """Record the counts of everything written so far on upload_batch."""
+        if self.upload_batch is not None:
+            self.upload_batch.finish(
+                self.total_rows,
+                self.created,
+                self.updated,
+                self.unchanged,
+                len(self.errors),
+            )
+
+    def _create(self, leads, facts):
+        if not leads:
+            return []
+        try:
+            # Savepoint so the per-row fallback can still run on failure
+            with transaction.atomic():
+                Lead.objects.bulk_create(leads, batch_size=self.batch_size)
+            saved = leads
+        except Exception:
+            # Retry individually for per-lead error reporting
+            saved = []
+            for lead in leads:
+                lead.pk = None
+                try:
+                    with transaction.atomic():
+                        lead.save()
+                    saved.append(lead)
+                except Exception as exc:
+                    self.errors.append(
+                        f"Failed to create lead {lead.enquiry_id}: {str(exc)[:100]}"
+                    )
+        for lead in saved:
+            facts.add(lead)
+        return saved
+
+    def _update(self, leads, update_fields, previous_facts, facts):
+        if not leads:
+            return []
+        try:
+            with transaction.atomic():
+                Lead.objects.bulk_update(
+                    leads, update_fields, batch_size=self.batch_size
+                )
+            saved = leads
+        except Exception:
+            saved = []
+            for lead in leads:
+                try:
+                    with transaction.atomic():
+                        lead.save(update_fields=update_fields)
+                    saved.append(lead)
+                except Exception as exc:
+                    self.errors.append(
+                        f"Failed to update lead {lead.enquiry_id}: {str(exc)[:100]}"
+                    )
+        for lead in saved:
+            facts.remove(previous_facts[lead.enquiry_id])
+            facts.add(lead)
+        return saved
+
+
+class UploadPreview:
+    """
+    Diffs uploaded rows against the stored leads, one batch per add() call.
+
+    Every row is counted; leads whose row_hash matches are ``unchanged``,
+    ``field_changes`` holds the number of updated leads per changed field,
+    while ``updated`` keeps the full changes of only the first
+    PREVIEW_UPDATE_LIMIT of them.
+    """
+
+    def __init__(self, staged_upload=None):
+        self.staged_upload = staged_upload
+        self.total_records = 0
+        self.updated_count = 0
+        self.unchanged = 0
+        self.updated = []
+        self.new_candidates = []
+        self.errors = []
+        self.field_changes = Counter()
+
+    def add(self, rows):
+        """Preview one batch of raw row dicts."""
+        mapped_rows = []
+        for row, mapped in zip(rows, map_rows(rows)):
+            self.total_records += 1
+            if isinstance(mapped, Exception):
+                self.errors.append(f"Row {self.total_records}: {str(mapped)}")
+                continue
+            if not mapped.get("enquiry_id"):
+                self.errors.append(f"Row {self.total_records}: Missing enquiry_id")
+                continue
+            mapped_rows.append((self.total_records, mapped, row))
+        if not mapped_rows:
+            return
+
+        # map_row() always returns the same keys, all of them Lead columns
+        fields = [field for field in mapped_rows[0][1] if field != "row_hash"]
+        enquiry_ids = {mapped["enquiry_id"] for _, mapped, _ in mapped_rows}
+        existing = {
+            values["enquiry_id"]: values
+            for values in Lead.objects.filter(enquiry_id__in=enquiry_ids).values(
+                "dealer", "row_hash", *fields
+            )
+        }
+        if self.staged_upload is not None:
+            StagedUploadRow.objects.bulk_create(
+                [
+                    StagedUploadRow(
+                        upload=self.staged_upload,
+                        row_number=row_num,
+                        enquiry_id=mapped["enquiry_id"],
+                        is_new=mapped["enquiry_id"] not in existing,
+                        data=mapped,
+                    )
+                    for row_num, mapped, _ in mapped_rows
+                ]
+            )
+            self.staged_upload.row_count += len(mapped_rows)
+
+        matched = []
+        for _, mapped, row in mapped_rows:
+            current = existing.get(mapped["enquiry_id"])
+            if current is None:
+                self.new_candidates.append(serialize_for_preview(mapped, row))
+            elif current["row_hash"] == mapped["row_hash"]:
+                # The commit will not touch it
+                self.unchanged += 1
+            else:
+                matched.append((mapped, current))
+        if not matched:
+            return
+
+        # Compare column by column; only rows that changed are visited again
+        changed_fields = [[] for _ in matched]
+        for field in fields:
+            changed = [
+                index
+                for index, (mapped, current) in enumerate(matched)
+                if mapped[field] != current[field]
+            ]
+            if changed:
+                self.field_changes[field] += len(changed)
+                for index in changed:
+                    changed_fields[index].append(field)
+
+        for (mapped, current), row_fields in zip(matched, changed_fields):
+            if not row_fields:
+                continue
+            self.updated_count += 1
+            if len(self.updated) < PREVIEW_UPDATE_LIMIT:
+                self.updated.append(
+                    {
+                        "enquiry_id": current["enquiry_id"],
+                        "dealer": current["dealer"],
+                        "changes": {
+                            field: {
+                                "from": _serialize_value(current[field]),
+                                "to": _serialize_value(mapped[field]),
+                            }
+                            for field in row_fields
+                        },
+                    }
+                )
+
+
+def stage_upload(user, filename):
+    """Start a StagedUpload for ``user``; expired ones not queued for import are purged first."""
+    now = timezone.now()
+    # Uploads handed to the import worker are kept until their job finishes
+    StagedUpload.objects.filter(expires_at__lte=now).exclude(
+        import_jobs__status__in=ImportJob.ACTIVE_STATUSES
+    ).delete()
+    return StagedUpload.objects.create(
+        user=user, filename=filename, expires_at=now + STAGING_TTL
+    )
+
+
+def staged_batches(
+    upload, skip=(), remarks=None, batch_size=UPLOAD_BATCH_SIZE, after_row=0
+):
+    """
+    Yield the rows of a StagedUpload as UploadWriter.write_mapped() batches,
+    in file order, starting after row number ``after_row``. Rows whose
+    enquiry_id is in ``skip`` are left out and ``remarks`` ({enquiry_id: text})
+    replaces a row's Remarks column.
+
+    Each batch is read with its own keyset query, so callers may commit
+    between batches.
+    """
+    skip = set(skip)
+    remarks = remarks or {}
+    fields = {field.name: field for field in Lead._meta.concrete_fields}
+    rows = upload.rows.order_by("row_number").values_list(
+        "row_number", "enquiry_id", "data"
+    )
+    while True:
+        page = list(rows.filter(row_number__gt=after_row)[:batch_size])
+        if not page:
+            return
+        after_row = page[-1][0]
+        batch = []
+        for row_num, enquiry_id, data in page:
+            if enquiry_id in skip:
+                continue
+            # JSON holds dates and decimals as strings; the model fields restore them
+            mapped = {key: fields[key].to_python(value) for key, value in data.items()}
+            if enquiry_id in remarks:
+                # As map_row() would have mapped the row with this Remarks value
+                mapped["remarks"] = (remarks[enquiry_id] or "").strip()
+                mapped["loss_reason"] = infer_loss_reason(
+                    mapped["lead_stage"], remarks[enquiry_id]
+                )
+                mapped["row_hash"] = row_hash_for(mapped)
+            batch.append((row_num, mapped))
+        if batch:
+            yield batch
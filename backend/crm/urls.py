@@ -1,41 +1,54 @@
 from django.urls import include, path
+
 from rest_framework.routers import DefaultRouter
 
 from .admin_views import (
     ActivityLogViewSet,
     AdminStatsView,
     BulkDeleteLeadsView,
+    DeleteJobDetailView,
     UserManagementViewSet,
 )
 from .auth_views import CustomAuthToken, logout
 from .views import (
+    AllFieldOptionsView,
     ChartsView,
+    DashboardView,
     ForecastView,
     HealthCheckView,
+    ImportJobCreateView,
+    ImportJobDetailView,
     InsightsView,
     KpiView,
+    LeadBulkUpdateView,
+    LeadExportView,
+    LeadFacetsView,
+    LeadFieldOptionsView,
+    LeadSearchView,
+    LeadUploadCommitView,
     LeadUploadCreateView,
     LeadUploadPreviewView,
     LeadViewSet,
-    LeadSearchView,
-    LeadFieldOptionsView,
-    AllFieldOptionsView,
-    UploadHistoryView,
     ManualLeadsView,
+    UploadHistoryView,
 )
 
 router = DefaultRouter()
 router.register(r"leads", LeadViewSet, basename="lead")
 router.register(r"admin/users", UserManagementViewSet, basename="admin-users")
-router.register(r"admin/activity-logs", ActivityLogViewSet, basename="admin-activity-logs")
+router.register(
+    r"admin/activity-logs", ActivityLogViewSet, basename="admin-activity-logs"
+)
 
 urlpatterns = [
-    path("", include(router.urls)),
-    path("health/", HealthCheckView.as_view(), name="health-check"),  # Health check endpoint
+    path(
+        "health/", HealthCheckView.as_view(), name="health-check"
+    ),  # Health check endpoint
     path("kpis/", KpiView.as_view(), name="kpis"),
     path("charts/", ChartsView.as_view(), name="charts"),
     path("forecast/", ForecastView.as_view(), name="forecast"),
     path("insights/", InsightsView.as_view(), name="insights"),
+    path("dashboard/", DashboardView.as_view(), name="dashboard"),
     path(
         "leads/upload/preview/",
         LeadUploadPreviewView.as_view(),
@@ -46,6 +59,13 @@ urlpatterns = [
         LeadUploadCreateView.as_view(),
         name="lead-upload-create",
     ),
+    path(
+        "leads/upload/commit/",
+        LeadUploadCommitView.as_view(),
+        name="lead-upload-commit",
+    ),
+    path("imports/", ImportJobCreateView.as_view(), name="import-job-create"),
+    path("imports/<int:pk>/", ImportJobDetailView.as_view(), name="import-job-detail"),
     path(
         "leads/upload/history/",
         UploadHistoryView.as_view(),
@@ -56,6 +76,16 @@ urlpatterns = [
         ManualLeadsView.as_view(),
         name="manual-leads",
     ),
+    path(
+        "leads/bulk-update/",
+        LeadBulkUpdateView.as_view(),
+        name="lead-bulk-update",
+    ),
+    path(
+        "leads/export/",
+        LeadExportView.as_view(),
+        name="lead-export",
+    ),
     path(
         "leads/search/",
         LeadSearchView.as_view(),
@@ -66,6 +96,11 @@ urlpatterns = [
         LeadFieldOptionsView.as_view(),
         name="lead-field-options",
     ),
+    path(
+        "leads/facets/",
+        LeadFacetsView.as_view(),
+        name="lead-facets",
+    ),
     path(
         "leads/all-field-options/",
         AllFieldOptionsView.as_view(),
@@ -73,8 +108,19 @@ urlpatterns = [
     ),
     # Admin endpoints
     path("admin/stats/", AdminStatsView.as_view(), name="admin-stats"),
-    path("admin/bulk-delete-leads/", BulkDeleteLeadsView.as_view(), name="admin-bulk-delete-leads"),
+    path(
+        "admin/bulk-delete-leads/",
+        BulkDeleteLeadsView.as_view(),
+        name="admin-bulk-delete-leads",
+    ),
+    path(
+        "admin/delete-jobs/<int:pk>/",
+        DeleteJobDetailView.as_view(),
+        name="admin-delete-job-detail",
+    ),
     # Auth endpoints
     path("auth/login/", CustomAuthToken.as_view(), name="api-login"),
     path("auth/logout/", logout, name="api-logout"),
+    # Router last: its leads/<pk>/ pattern would otherwise shadow leads/manual/ etc.
+    path("", include(router.urls)),
 ]
@@ -388,11 +388,31 @@ RestartSec=10
 WantedBy=multi-user.target
 EOF
     
+    # Background lead imports; the queue is a database table, so no broker is needed
+    cat > /etc/systemd/system/crm-import-worker.service << 'EOF'
+[Unit]
+Description=Sharda CRM Import and Delete Worker
+After=network.target crm-backend.service
+
+[Service]
+User=root
+Group=root
+WorkingDirectory=/var/www/crm-app/backend
+Environment="PATH=/var/www/crm-app/backend/venv/bin"
+ExecStart=/var/www/crm-app/backend/venv/bin/python manage.py run_import_worker
+
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
     systemctl daemon-reload
-    systemctl enable crm-backend
-    systemctl start crm-backend
-    
-    echo "  ✓ Backend service started"
+    systemctl enable crm-backend crm-import-worker
+    systemctl start crm-backend crm-import-worker
+
+    echo "  ✓ Backend service and import worker started"
 ENDSSH
 
 # Wait for services to start
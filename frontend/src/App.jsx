@@ -1,6 +1,7 @@
 import { useEffect, useState, useMemo } from 'react'
 import './App.css'
 import { apiRequest } from './lib/api'
+import { leadService } from './services/leadService'
 import Login from './components/Login'
 import FilterBar from './components/FilterBar'
 import Dashboard from './components/Dashboard'
@@ -37,7 +38,7 @@ function App() {
   })
 
   // Lead data from custom hook
-  const { leads, setLeads, kpiData, forecastSummary, insightData, chartData, forecastData, isLoading, apiError } = useLeadData(
+  const { leads, setLeads, kpiData, forecastSummary, insightData, chartData, forecastData, facets, isLoading, apiError } = useLeadData(
     filters,
     refreshKey,
     isAuthenticated,
@@ -46,7 +47,6 @@ function App() {
 
   // Upload state
   const [uploadFile, setUploadFile] = useState(null)
-  const [uploadFileName, setUploadFileName] = useState(null)
   const [uploadPreview, setUploadPreview] = useState(null)
   const [selectedNewRows, setSelectedNewRows] = useState({})
   const [uploadMessage, setUploadMessage] = useState(null)
@@ -156,9 +156,6 @@ function App() {
       return
     }
 
-    // Store filename for later use
-    setUploadFileName(uploadFile.name)
-
     const formData = new FormData()
     formData.append('file', uploadFile)
     formData.append('filename', uploadFile.name)
@@ -250,35 +247,35 @@ function App() {
       (candidate) => candidate._rowKey && selectedNewRows[candidate._rowKey]
     )
 
-    const rows = selectedCandidates.map((candidate) => {
-      const row = { ...candidate.raw }
-      const comment = comments[candidate._rowKey]
-      if (comment) {
-        row.remarks = comment
-        row.Remarks = comment
-      }
-      return row
-    })
-
-    if (rows.length === 0) {
+    if (selectedCandidates.length === 0) {
       setUploadMessage('Select at least one new lead to import.')
       return
     }
 
+    // The preview staged every row server-side; commit it by token
+    const skipEnquiryIds = uploadPreview.new_candidates
+      .filter((candidate) => !(candidate._rowKey && selectedNewRows[candidate._rowKey]))
+      .map((candidate) => candidate.enquiry_id)
+      .filter(Boolean)
+    const remarks = {}
+    selectedCandidates.forEach((candidate) => {
+      const comment = comments[candidate._rowKey]
+      if (comment && candidate.enquiry_id) {
+        remarks[candidate.enquiry_id] = comment
+      }
+    })
+
     try {
-      const response = await apiRequest('leads/upload/create/', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ 
-          rows,
-          filename: uploadFileName || 'unknown'
-        }),
+      // Applied by the background import worker; large files would outlast the request timeout
+      const queued = await leadService.enqueueImport(uploadPreview.upload_token, { skipEnquiryIds, remarks })
+      const job = await leadService.waitForJob(leadService.getImportJob, queued, {
+        onProgress: (progress) => setUploadMessage(`Importing leads… ${progress.progress}%`),
       })
 
-      // Use actual response data from backend (backward compatible)
-      const created = response.created || 0
-      const updated = response.updated || 0
-      const totalErrors = response.total_errors || 0
+      const created = job.created_count || 0
+      const updated = job.updated_count || 0
+      const unchanged = job.unchanged_count || 0
+      const totalErrors = job.error_count || 0
       
       // Build success message with accurate counts
       let message = ''
@@ -291,6 +288,10 @@ function App() {
       } else {
         message = 'No leads were created or updated.'
       }
+
+      if (unchanged > 0) {
+        message += ` ${unchanged} lead${unchanged !== 1 ? 's were' : ' was'} already up to date.`
+      }
       
       if (totalErrors > 0) {
         message += ` (${totalErrors} error${totalErrors !== 1 ? 's' : ''} occurred)`
@@ -298,25 +299,12 @@ function App() {
       
       setUploadMessage(message)
 
-      // Extract created IDs from backend response (backward compatible)
-      // Backend now returns created_enquiry_ids, but fallback to extracting from rows if not available
+      // The job reports counts only; highlight the selected candidates that were created
       let createdIds = []
-      if (response.created_enquiry_ids && response.created_enquiry_ids.length > 0) {
-        // Use enquiry_ids from backend response (most accurate)
-        createdIds = response.created_enquiry_ids.map(id => id.toString())
-      } else if (created > 0) {
-        // Fallback: extract from rows (less accurate but backward compatible)
-        createdIds = rows
-          .slice(0, Math.min(created, rows.length))
-          .map(
-            (row) =>
-              row.enquiry_id ||
-              row.EnquiryID ||
-              row['Enquiry ID'] ||
-              row['Enquiry No'] ||
-              row.enquiryId ||
-              null
-          )
+      if (created > 0) {
+        createdIds = selectedCandidates
+          .slice(0, Math.min(created, selectedCandidates.length))
+          .map((candidate) => candidate.enquiry_id || null)
           .filter(Boolean)
           .map((value) => value.toString())
       }
@@ -328,7 +316,6 @@ function App() {
       setUploadPreview(null)
       setSelectedNewRows({})
       setUploadFile(null)
-      setUploadFileName(null)
       setRefreshKey((key) => key + 1)
     } catch (error) {
       setUploadMessage(error.message || 'Unable to create new leads.')
@@ -409,6 +396,7 @@ function App() {
             applyDateFilters={applyDateFilters}
             clearFilters={clearFilters}
             leads={leads}
+            facets={facets}
           />
         </aside>
 
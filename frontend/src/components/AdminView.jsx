@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react'
 import { apiRequest } from '../lib/api'
+import { leadService } from '../services/leadService'
 import './AdminView.css'
 
 const AdminView = () => {
@@ -168,14 +169,16 @@ const AdminView = () => {
 
         setError(null)
         try {
-            await apiRequest('admin/bulk-delete-leads/', {
+            const result = await apiRequest('admin/bulk-delete-leads/', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ lead_ids: selectedLeads })
             })
             setShowDeleteConfirm(false)
             setSelectedLeads([])
-            alert(`Successfully deleted ${selectedLeads.length} leads`)
+            // Large selections are deleted by the background worker; refresh once it has run
+            await leadService.waitForJob(leadService.getDeleteJob, result.job)
+            alert(`Deleted ${result.deleted_count} leads`)
             loadData()
         } catch (err) {
             setError(err.message || 'Failed to delete leads')
@@ -23,8 +23,17 @@ export default function FilterBar({
     applyDateFilters,
     clearFilters,
     leads,
+    facets,
 }) {
-    const optionMap = useMemo(() => buildFilterOptions(leads), [leads])
+    // Prefer server-side facets (whole filtered set); fall back to the loaded leads
+    const optionMap = useMemo(() => {
+        const options = buildFilterOptions(leads)
+        if (!facets) return options
+        Object.entries(facets).forEach(([field, values]) => {
+            options[field] = values.map((option) => option.value)
+        })
+        return options
+    }, [leads, facets])
     const fyOptions = useMemo(() => generateFYOptions(), [])
     const [selectedFY, setSelectedFY] = useState(() => getCurrentFY())
 
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { HIGH_VALUE_THRESHOLD, rupeeFormatter, formatDateTime, formatDate } from '../lib/analytics'
 import { apiRequest } from '../lib/api'
+import { leadService } from '../services/leadService'
 import AddLeadModal from './AddLeadModal'
 import './UploadView.css'
 
@@ -170,6 +171,7 @@ const UploadPreviewSection = ({ preview, selectedRows, toggleSelection, onCreate
     const newCount = preview.new_candidates ? preview.new_candidates.length : 0
     const totalRecords = preview.total_records || (updatedCount + newCount)
     const noUpdateCount = Math.max(0, totalRecords - updatedCount - newCount - (preview.total_errors || 0))
+    const fieldChanges = Object.entries(preview.field_changes || {})
 
     return (
         <section className="upload-preview">
@@ -179,6 +181,11 @@ const UploadPreviewSection = ({ preview, selectedRows, toggleSelection, onCreate
                     <h3>
                         Updated {updatedCount} leads • No update {noUpdateCount} leads • {newCount} new leads detected
                     </h3>
+                    {fieldChanges.length > 0 && (
+                        <p className="upload-hint">
+                            Changed fields: {fieldChanges.map(([field, count]) => `${field} (${count})`).join(', ')}
+                        </p>
+                    )}
                 </div>
                 {newCount > 0 ? (
                     <button type="button" className="primary-btn" onClick={onCreate}>
@@ -563,7 +570,7 @@ const UploadHistorySection = ({ onSelectUpload, selectedUpload, onImportClick, o
                     ...(token && { 'Authorization': `Token ${token}` })
                 },
                 credentials: 'include',
-                body: JSON.stringify({ source: upload.upload_key })
+                body: JSON.stringify({ upload_key: upload.upload_key })
             })
             
             if (!response.ok) {
@@ -572,6 +579,11 @@ const UploadHistorySection = ({ onSelectUpload, selectedUpload, onImportClick, o
             }
             
             const result = await response.json()
+
+            // Large uploads are deleted by a background job; wait for it before refreshing
+            if (result.job) {
+                await leadService.waitForJob(leadService.getDeleteJob, result.job)
+            }
             
             // Refresh the upload history
             await fetchUploadHistory()
@@ -644,9 +656,9 @@ const UploadHistorySection = ({ onSelectUpload, selectedUpload, onImportClick, o
             </header>
             <div className="table-scroll">
                 <div className="upload-history-list-full">
-                    {uploadHistory.map((upload, index) => (
+                    {uploadHistory.map((upload) => (
                         <div
-                            key={index}
+                            key={upload.upload_key}
                             className={`upload-history-item-full ${selectedUpload === upload.upload_key ? 'selected' : ''}`}
                             onClick={() => onSelectUpload(upload.upload_key)}
                         >
@@ -655,6 +667,9 @@ const UploadHistorySection = ({ onSelectUpload, selectedUpload, onImportClick, o
                                 <div className="upload-history-meta-full">
                                     <span className="upload-history-date-full">{formatTimestamp(upload.timestamp)}</span>
                                     <span className="upload-history-count-badge-full">{upload.lead_count} lead{upload.lead_count !== 1 ? 's' : ''}</span>
+                                    {upload.uploaded_by && (
+                                        <span className="upload-history-date-full">by {upload.uploaded_by}</span>
+                                    )}
                                 </div>
                             </div>
                             {isAdmin && (
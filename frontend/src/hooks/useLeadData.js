@@ -22,14 +22,13 @@ export const useLeadData = (filters, refreshKey, isAuthenticated, isAdmin = fals
     const [insightData, setInsightData] = useState(() => buildInsightsFromDataset(fallbackLeads))
     const [forecastData, setForecastData] = useState(null)  // Admin-only forecast data
     const [chartData, setChartData] = useState(null)  // Chart data from backend
+    const [facets, setFacets] = useState(null)  // Filter bar options under the current filters
     const [isLoading, setIsLoading] = useState(false)
     const [apiError, setApiError] = useState(null)
 
     useEffect(() => {
         const controller = new AbortController()
         const params = buildQueryParams(filters)
-        const aggregateParams = { ...params }
-        delete aggregateParams.page_size
 
         async function load() {
             if (!isAuthenticated) return
@@ -37,28 +36,24 @@ export const useLeadData = (filters, refreshKey, isAuthenticated, isAdmin = fals
             setIsLoading(true)
             setApiError(null)
             try {
-                // Base requests for all users
-                const baseRequests = [
-                    apiRequest('leads/', { params, signal: controller.signal }),
-                    apiRequest('kpis/', { params: aggregateParams, signal: controller.signal }),
-                    apiRequest('charts/', { params: aggregateParams, signal: controller.signal }),
-                ]
+                // One round trip: the backend validates the filters once and
+                // computes every section from the same filtered set.
+                // Admin users also get forecast data.
+                const sections = ['leads', 'kpis', 'charts', 'insights', 'facets']
+                if (isAdmin) sections.push('forecast')
 
-                // Admin users get forecast data
-                if (isAdmin) {
-                    baseRequests.push(
-                        apiRequest('forecast/', { params: aggregateParams, signal: controller.signal })
-                    )
-                }
-
-                const responses = await Promise.all(baseRequests)
-
-                let leadResponse, kpiResponse, chartResponse, forecastResponse
-                if (isAdmin) {
-                    [leadResponse, kpiResponse, chartResponse, forecastResponse] = responses
-                } else {
-                    [leadResponse, kpiResponse, chartResponse] = responses
-                }
+                const dashboard = await apiRequest('dashboard/', {
+                    params: { ...params, sections: sections.join(',') },
+                    signal: controller.signal,
+                })
+                const {
+                    leads: leadResponse,
+                    kpis: kpiResponse,
+                    charts: chartResponse,
+                    insights: insightResponse,
+                    forecast: forecastResponse,
+                    facets: facetResponse,
+                } = dashboard
 
                 const serverLeads = leadResponse.results ?? leadResponse
                 // Ensure serverLeads is always an array
@@ -72,9 +67,12 @@ export const useLeadData = (filters, refreshKey, isAuthenticated, isAdmin = fals
                 // Set chart data from backend (matches frontend structure)
                 setChartData(chartResponse)
                 
-                // Build insights from client-side using actual leads data
-                setInsightData(buildInsightsFromDataset(leadsArray))
-                setForecastSummary(buildForecastFromDataset(leadsArray))
+                // Insights are aggregated server-side over the full filtered population
+                setInsightData(insightResponse)
+                setForecastSummary(formatForecastResponse(insightResponse?.forecastSummary))
+
+                // Filter bar options come from the whole filtered set, not the current page
+                setFacets(facetResponse ?? null)
 
                 // Set admin forecast data if available
                 if (isAdmin && forecastResponse) {
@@ -96,6 +94,7 @@ export const useLeadData = (filters, refreshKey, isAuthenticated, isAdmin = fals
                 )
                 // Reset chart data on error (will fallback to client-side building)
                 setChartData(null)
+                setFacets(null)
             } finally {
                 setIsLoading(false)
             }
@@ -113,6 +112,7 @@ export const useLeadData = (filters, refreshKey, isAuthenticated, isAdmin = fals
         insightData,
         forecastData,
         chartData,
+        facets,
         isLoading,
         apiError,
     }
@@ -40,13 +40,14 @@ export const leadService = {
     /**
      * Bulk update multiple leads
      * @param {Object} updates - Map of leadId to update data
-     * @returns {Promise<void>}
+     * @returns {Promise<Object>} Updated count and the updated leads
      */
     bulkUpdateLeads: async (updates) => {
-        const promises = Object.entries(updates).map(([leadId, data]) =>
-            leadService.updateLead(leadId, data)
-        )
-        return Promise.all(promises)
+        return apiRequest('leads/bulk-update/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ updates }),
+        })
     },
 
     /**
@@ -76,6 +77,84 @@ export const leadService = {
         })
     },
 
+    /**
+     * Commit a previewed upload of at most 1000 rows by its token (use enqueueImport for larger ones)
+     * @param {string} uploadToken - upload_token from the preview response
+     * @param {Object} options - skipEnquiryIds (Array) and remarks ({enquiry_id: text})
+     * @returns {Promise<Object>} Creation result
+     */
+    uploadCommit: async (uploadToken, { skipEnquiryIds = [], remarks = {} } = {}) => {
+        return apiRequest('leads/upload/commit/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ upload_token: uploadToken, skip_enquiry_ids: skipEnquiryIds, remarks }),
+        })
+    },
+
+    /**
+     * Queue a previewed upload for the background import worker
+     * @param {string} uploadToken - upload_token from the preview response
+     * @param {Object} options - skipEnquiryIds (Array) and remarks ({enquiry_id: text})
+     * @returns {Promise<Object>} The queued import job
+     */
+    enqueueImport: async (uploadToken, { skipEnquiryIds = [], remarks = {} } = {}) => {
+        return apiRequest('imports/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ upload_token: uploadToken, skip_enquiry_ids: skipEnquiryIds, remarks }),
+        })
+    },
+
+    /**
+     * Get the progress of an import job
+     * @param {number} jobId - id returned by enqueueImport
+     * @returns {Promise<Object>} Status, counts and rows_per_second
+     */
+    getImportJob: async (jobId) => {
+        return apiRequest(`imports/${jobId}/`)
+    },
+
+    /**
+     * Poll a background job until it succeeds, fails or stops making progress
+     * @param {Function} getJob - getImportJob or getDeleteJob
+     * @param {Object} job - The job returned when it was queued
+     * @param {Object} options - onProgress(job), intervalMs, queuedTimeoutMs and timeoutMs
+     * @returns {Promise<Object>} The finished job; throws if it failed or timed out
+     */
+    waitForJob: async (getJob, job, {
+        onProgress = () => {},
+        intervalMs = 1000,
+        queuedTimeoutMs = 60 * 1000,
+        timeoutMs = 30 * 60 * 1000,
+    } = {}) => {
+        const startedAt = Date.now()
+        while (job.status === 'queued' || job.status === 'running') {
+            const waited = Date.now() - startedAt
+            if (job.status === 'queued' && waited > queuedTimeoutMs) {
+                throw new Error('The background worker has not started this job. Is run_import_worker running?')
+            }
+            if (waited > timeoutMs) {
+                throw new Error('Timed out waiting for the background job. Check its progress again later.')
+            }
+            await new Promise((resolve) => setTimeout(resolve, intervalMs))
+            job = await getJob(job.id)
+            onProgress(job)
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.message || 'Background job failed')
+        }
+        return job
+    },
+
+    /**
+     * Get the progress of a background lead deletion (admin only)
+     * @param {number} jobId - job.id returned by the delete endpoints
+     * @returns {Promise<Object>} Status, deleted_count and progress
+     */
+    getDeleteJob: async (jobId) => {
+        return apiRequest(`admin/delete-jobs/${jobId}/`)
+    },
+
     /**
      * Get KPI data
      * @param {Object} params - Filter parameters
@@ -9,6 +9,10 @@ if systemctl list-units --type=service 2>/dev/null | grep -q "crm-backend"; then
     sudo systemctl restart crm-backend
     echo "✅ Backend service restarted"
     sudo systemctl status crm-backend
+    if systemctl list-units --type=service 2>/dev/null | grep -q "crm-import-worker"; then
+        sudo systemctl restart crm-import-worker
+        echo "✅ Import worker service restarted"
+    fi
     
 elif systemctl list-units --type=service 2>/dev/null | grep -q "gunicorn"; then
     echo "⚙️  Using Gunicorn systemd service..."
@@ -23,6 +27,7 @@ else
     # Find and kill existing Gunicorn process
     echo "Stopping existing Gunicorn process..."
     pkill -f "gunicorn.*sdpl_backend.wsgi" || echo "No existing process found"
+    pkill -f "manage.py run_import_worker" || echo "No existing worker found"
     sleep 2
     
     # Navigate to backend directory
@@ -44,6 +49,12 @@ else
         
         echo "✅ Gunicorn started (PID: $!)"
         echo "📋 Logs: tail -f /tmp/gunicorn.log"
+
+        # Queued imports and deletions only run while the worker is up
+        echo "Starting import worker..."
+        nohup python manage.py run_import_worker > /tmp/import-worker.log 2>&1 &
+        echo "✅ Import worker started (PID: $!)"
+        echo "📋 Logs: tail -f /tmp/import-worker.log"
         cd ..
     else
         echo "❌ Backend directory not found. Please run from project root."
@@ -56,3 +67,4 @@ echo "✅ Backend restart complete!"
 echo ""
 echo "📊 Check status:"
 ps aux | grep -E "gunicorn.*sdpl_backend" | grep -v grep || echo "No Gunicorn process found"
+ps aux | grep -E "manage.py run_import_worker" | grep -v grep || echo "No import worker process found"
@@ -55,6 +55,10 @@ Write-Host "💡 Tip: Create a superuser if needed with: python manage.py create
 Write-Host "🌐 Starting Django backend at http://localhost:8000..." -ForegroundColor Green
 Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$pwd'; .\venv\Scripts\Activate.ps1; python manage.py runserver 8000"
 
+# Start the worker that applies queued imports and deletions
+Write-Host "⚙️  Starting background import/delete worker..." -ForegroundColor Green
+Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$pwd'; .\venv\Scripts\Activate.ps1; python manage.py run_import_worker"
+
 cd ..
 
 # Setup Frontend
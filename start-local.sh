@@ -56,6 +56,11 @@ echo "🌐 Starting Django backend at http://localhost:8000..."
 python manage.py runserver 8000 &
 BACKEND_PID=$!
 
+# Start the worker that applies queued imports and deletions
+echo "⚙️  Starting background import/delete worker..."
+python manage.py run_import_worker &
+WORKER_PID=$!
+
 cd ..
 
 # Setup Frontend
@@ -73,7 +78,7 @@ elif [ -f ".env.example" ]; then
 else
     echo "❌ Error: .env.local or .env.example not found in frontend directory"
     echo "   Please create frontend/.env.local or frontend/.env.example"
-    kill $BACKEND_PID
+    kill $BACKEND_PID $WORKER_PID
     cd ..
     exit 1
 fi
@@ -97,6 +102,6 @@ echo ""
 
 npm run dev
 
-# Cleanup: Kill backend server when frontend stops
-kill $BACKEND_PID
+# Cleanup: Kill backend server and worker when frontend stops
+kill $BACKEND_PID $WORKER_PID
 cd ..